@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { prisma } from '@/lib/prisma'
 import { getServerSession } from '@/lib/auth'
+import { importCategories, MAX_CATEGORY_ROWS } from '@/lib/categoryImport'
 
 export async function GET() {
   try {
@@ -46,93 +47,21 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: 'Categories must be an array' }, { status: 400 })
     }
 
-    const results = {
-      created: 0,
-      updated: 0,
-      skipped: 0,
-      errors: [] as string[],
+    if (categoriesToAdd.length > MAX_CATEGORY_ROWS) {
+      return NextResponse.json(
+        { error: `Too many categories, send at most ${MAX_CATEGORY_ROWS} per request` },
+        { status: 413 }
+      )
     }
 
-    // Process categories in order (parents first)
-    const sortedCategories = [...categoriesToAdd].sort((a, b) => (a.level || 0) - (b.level || 0))
-
-    for (const catData of sortedCategories) {
-      try {
-        const { id, name, level, parentId, path, marktplaatsId } = catData
-
-        if (!name || !level) {
-          results.skipped++
-          results.errors.push(`Skipped category: missing name or level`)
-          continue
-        }
-
-        // Generate ID if not provided
-        const categoryId = id || name.toLowerCase().replace(/\s+/g, '-').replace(/[^a-z0-9-]/g, '')
-
-        // Find parent category if parentId is provided
-        let parentCategoryId: string | null = null
-        if (parentId) {
-          const parent = await prisma.category.findFirst({
-            where: {
-              OR: [
-                { id: parentId },
-                { name: parentId },
-              ],
-            },
-          })
-          if (parent) {
-            parentCategoryId = parent.id
-          }
-        }
-
-        // Check if category already exists
-        const existing = await prisma.category.findFirst({
-          where: {
-            OR: [
-              { id: categoryId },
-              { path: path || name },
-            ],
-          },
-        })
-
-        if (existing) {
-          // Update existing category
-          await prisma.category.update({
-            where: { id: existing.id },
-            data: {
-              name,
-              level,
-              parentId: parentCategoryId,
-              path: path || name,
-              marktplaatsId: marktplaatsId || existing.marktplaatsId,
-            },
-          })
-          results.updated++
-        } else {
-          // Create new category
-          await prisma.category.create({
-            data: {
-              id: categoryId,
-              name,
-              level,
-              parentId: parentCategoryId,
-              path: path || name,
-              marktplaatsId: marktplaatsId || null,
-            },
-          })
-          results.created++
-        }
-      } catch (error: any) {
-        results.skipped++
-        results.errors.push(`Error processing ${catData.name}: ${error.message}`)
-        console.error(`Error processing category ${catData.name}:`, error)
-      }
-    }
+    // Parents are resolved in memory and all rows are written in one transaction
+    const results = await importCategories(categoriesToAdd)
 
+    // A rolled back batch must stop the importer, or the next level loses its parents
     return NextResponse.json({
-      success: true,
+      success: !results.failed,
       ...results,
-    })
+    }, { status: results.failed ? 500 : 200 })
   } catch (error) {
     console.error('Error adding categories:', error)
     return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
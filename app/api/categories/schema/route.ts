@@ -0,0 +1,49 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { prisma } from '@/lib/prisma'
+
+const MAX_SCHEMAS = 500
+
+/**
+ * Store scraped form schemas per category (API key only, see scripts/category_schema.py)
+ * Body: { schemas: [{ id?, path, schema: { fields, scrapedAt } }] }
+ * Categories are matched by id, or by path when no id is given.
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    const schemas = Array.isArray(body.schemas) ? body.schemas : null
+    if (!schemas) {
+      return NextResponse.json({ error: 'schemas must be an array' }, { status: 400 })
+    }
+    if (schemas.length > MAX_SCHEMAS) {
+      return NextResponse.json({ error: `Too many schemas, send at most ${MAX_SCHEMAS} per request` }, { status: 413 })
+    }
+
+    const valid = schemas.filter((s: any) =>
+      (s?.id || s?.path) && s.schema && typeof s.schema.fields === 'object' && s.schema.fields !== null
+    )
+    const counts = await prisma.$transaction(valid.map((s: any) =>
+      prisma.category.updateMany({
+        where: s.id ? { id: String(s.id) } : { path: String(s.path) },
+        data: { attributeSchema: s.schema },
+      })
+    ))
+
+    const missing = valid.filter((_: any, i: number) => counts[i].count === 0).map((s: any) => s.id || s.path)
+    return NextResponse.json({
+      success: true,
+      updated: valid.length - missing.length,
+      skipped: schemas.length - valid.length,
+      missing,
+    })
+  } catch (error) {
+    console.error('Error storing category schemas:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
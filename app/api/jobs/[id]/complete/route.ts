@@ -0,0 +1,35 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { completePostJob } from '@/lib/postJobs'
+
+/**
+ * Report the result of a claimed post job (API key only)
+ * Body: { workerId, result: { ad_url, ad_id, views, saves, posted_at, status, error? } }
+ */
+export async function POST(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  const params = await context.params
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => null)
+    if (!body || typeof body.result !== 'object' || body.result === null) {
+      return NextResponse.json({ error: 'result is required' }, { status: 400 })
+    }
+
+    const job = await completePostJob(params.id, body.workerId || null, body.result)
+    if (!job) {
+      return NextResponse.json({ error: 'Job not found or not running for this worker' }, { status: 409 })
+    }
+
+    return NextResponse.json({ success: true, id: job.id, status: job.status })
+  } catch (error) {
+    console.error('Error completing post job:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
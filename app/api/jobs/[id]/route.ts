@@ -0,0 +1,53 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getServerSession } from '@/lib/auth'
+import { prisma } from '@/lib/prisma'
+
+/**
+ * Status of a post job (poll after POST /api/products/[id]/post)
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  const params = await context.params
+  try {
+    let session_user = null
+    try {
+      session_user = await getServerSession()
+    } catch {
+      // Session check failed, try API key
+    }
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    const isApiKeyValid = !!apiKey && apiKey.trim() === validApiKey.trim()
+
+    if (!session_user && !isApiKeyValid) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const job = await prisma.postJob.findUnique({
+      where: { id: params.id },
+      include: { product: { select: { userId: true, marktplaatsUrl: true } } },
+    })
+
+    if (!job || (session_user && !isApiKeyValid && job.product.userId !== session_user.user.id)) {
+      return NextResponse.json({ error: 'Job not found' }, { status: 404 })
+    }
+
+    return NextResponse.json({
+      id: job.id,
+      productId: job.productId,
+      status: job.status,
+      attempts: job.attempts,
+      result: job.result,
+      error: job.error,
+      adUrl: job.product.marktplaatsUrl,
+      createdAt: job.createdAt,
+      startedAt: job.startedAt,
+      finishedAt: job.finishedAt,
+    })
+  } catch (error) {
+    console.error('Error fetching post job:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
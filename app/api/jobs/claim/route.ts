@@ -0,0 +1,31 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { claimPostJobs } from '@/lib/postJobs'
+
+const MAX_CLAIM = 20
+
+/**
+ * Claim queued post jobs for a worker (API key only)
+ * Body: { workerId, limit? }  -> { jobs: [{ id, attempts, product }] }
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    const workerId = typeof body.workerId === 'string' && body.workerId ? body.workerId : null
+    if (!workerId) {
+      return NextResponse.json({ error: 'workerId is required' }, { status: 400 })
+    }
+    const limit = Math.min(Math.max(parseInt(body.limit, 10) || 1, 1), MAX_CLAIM)
+
+    const jobs = await claimPostJobs(workerId, limit)
+    return NextResponse.json({ jobs })
+  } catch (error) {
+    console.error('Error claiming post jobs:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
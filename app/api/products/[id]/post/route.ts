@@ -1,13 +1,13 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { getServerSession } from '@/lib/auth'
 import { prisma } from '@/lib/prisma'
-import { exec } from 'child_process'
-import { promisify } from 'util'
-import path from 'path'
-import fs from 'fs'
-
-const execAsync = promisify(exec)
+import { enqueuePostJob } from '@/lib/postJobs'
 
+/**
+ * Queue a product for posting to Marktplaats
+ * The job is picked up by a long-running worker (local_worker/job_worker.py);
+ * poll GET /api/jobs/[jobId] for the result.
+ */
 export async function POST(
   request: NextRequest,
   context: { params: Promise<{ id: string }> }
@@ -21,188 +21,34 @@ export async function POST(
 
     const product = await prisma.product.findUnique({
       where: { id: params.id },
+      select: { userId: true },
     })
 
     if (!product || product.userId !== session.user.id) {
       return NextResponse.json({ error: 'Product not found' }, { status: 404 })
     }
 
-    // Update status to processing
-    await prisma.product.update({
-      where: { id: params.id },
-      data: { status: 'processing' },
-    })
-
-    // Get paths from environment
-    // webapp/ is current working directory, so go up one level to project root
-    const projectRoot = path.join(process.cwd(), '..')
-    const scriptPath = process.env.PYTHON_SCRIPT_PATH || path.join(projectRoot, 'scripts', 'post_ads.py')
-    const pythonCmd = process.env.PYTHON_CMD || 'python'
-    
-    // Get base URL for API calls
-    // In production, use NEXTAUTH_URL or VERCEL_URL
-    // In development, default to localhost:3000
-    const baseUrl = process.env.NEXTAUTH_URL 
-      || (process.env.VERCEL_URL ? `https://${process.env.VERCEL_URL}` : null)
-      || 'http://localhost:3000'
-    
-    console.log(`[POST] Project root: ${projectRoot}`)
-    console.log(`[POST] Script path: ${scriptPath}`)
-    console.log(`[POST] Python command: ${pythonCmd}`)
-    console.log(`[POST] API base URL: ${baseUrl}`)
-
-    try {
-      // Verify script exists
-      if (!fs.existsSync(scriptPath)) {
-        throw new Error(`Python script not found at: ${scriptPath}`)
-      }
-
-      // Get API key for internal calls
-      const apiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
-      const apiUrl = `${baseUrl}/api/products/export/${params.id}?api_key=${apiKey}`
-      
-      console.log(`[POST] Executing: ${pythonCmd} "${scriptPath}" --api "${apiUrl}" --product-id "${params.id}"`)
-      console.log(`[POST] Working directory: ${path.dirname(scriptPath)}`)
-      
-      // Execute Python script with API endpoint instead of CSV
-      const { stdout, stderr } = await execAsync(
-        `${pythonCmd} "${scriptPath}" --api "${apiUrl}" --product-id "${params.id}"`,
-        { 
-          cwd: path.dirname(scriptPath),
-          maxBuffer: 10 * 1024 * 1024, // 10MB buffer
-          timeout: 300000, // 5 minutes timeout
-          env: {
-            ...process.env,
-            PRODUCT_API_URL: apiUrl,
-            PRODUCT_ID: params.id,
-            INTERNAL_API_KEY: apiKey,
-          }
-        }
-      )
-
-      console.log(`[POST] Script stdout (${stdout.length} chars): ${stdout.substring(0, 500)}${stdout.length > 500 ? '...' : ''}`)
-      if (stderr) {
-        console.log(`[POST] Script stderr (${stderr.length} chars): ${stderr.substring(0, 500)}${stderr.length > 500 ? '...' : ''}`)
-      }
-
-      // Check if script succeeded (look for success indicators in output)
-      const output = stdout + stderr
-      console.log(`[POST] Checking output for success/error indicators...`)
-      
-      // Check for definitive success indicators
-      const hasResultJson = output.includes('RESULT_JSON:')
-      const hasSuccessMessage = output.includes('[OK] Succesvol verwerkt') || output.includes('✔ Succesvol verwerkt')
-      
-      // Only flag as error if there's a clear error AND no success indicators
-      // Be more specific about error patterns to avoid false positives
-      const hasCriticalError = (
-        output.toLowerCase().includes('traceback') ||
-        output.toLowerCase().includes('exception:') ||
-        output.toLowerCase().includes('error:') ||
-        (output.toLowerCase().includes('failed') && !output.toLowerCase().includes('status') && !output.toLowerCase().includes('failed to'))
-      )
-
-      // If we have a critical error and no success indicators, mark as failed
-      if (hasCriticalError && !hasResultJson && !hasSuccessMessage) {
-        // Script ran but had errors
-        await prisma.product.update({
-          where: { id: params.id },
-          data: { status: 'failed' },
-        })
-
-        return NextResponse.json({ 
-          success: false,
-          error: 'Script execution had errors',
-          output: output,
-        }, { status: 500 })
-      }
-
-      // Try to extract result JSON from output
-      let adStats: any = null
-      // Match RESULT_JSON: followed by JSON (handles multiline JSON)
-      const resultMatch = output.match(/RESULT_JSON:(\{[\s\S]*\})/)
-      if (resultMatch) {
-        try {
-          adStats = JSON.parse(resultMatch[1])
-          console.log('[POST] Parsed RESULT_JSON:', adStats)
-        } catch (e) {
-          console.error('[POST] Failed to parse result JSON:', e)
-          console.error('[POST] JSON string:', resultMatch[1])
-        }
-      } else {
-        console.log('[POST] No RESULT_JSON found in output')
-      }
-
-      // Check if ad was actually posted successfully
-      const adUrl = adStats?.ad_url || null
-      const wasSuccessful = adUrl !== null && adUrl !== undefined
-
-      // Parse posted_at date if available
-      let postedAtDate: Date | null = null
-      if (adStats?.posted_at) {
-        // Try to parse Dutch date format like "6 nov '25"
-        // For now, we'll store the raw string and parse it properly later
-        // Or use current date as fallback
-        postedAtDate = new Date()
-      }
-
-      // Update product status based on whether ad was actually posted
-      const finalStatus = wasSuccessful ? 'completed' : 'failed'
-      await prisma.product.update({
-        where: { id: params.id },
-        data: { 
-          status: finalStatus,
-          marktplaatsUrl: adUrl,
-          marktplaatsAdId: adStats?.ad_id || null,
-          views: adStats?.views || 0,
-          saves: adStats?.saves || 0,
-          postedAt: postedAtDate,
-        },
-      })
-
-      if (wasSuccessful) {
-        return NextResponse.json({ 
-          success: true,
-          message: 'Product succesvol geplaatst',
-          output: output,
-          adUrl: adUrl,
-        })
-      } else {
-        return NextResponse.json({ 
-          success: false,
-          error: 'Advertentie kon niet worden geplaatst',
-          output: output,
-          details: adStats || { message: 'Geen RESULT_JSON gevonden in output' },
-        }, { status: 500 })
-      }
-    } catch (execError: any) {
-      console.error('[POST] Error executing script:', execError)
-
-      // Update product status
-      await prisma.product.update({
-        where: { id: params.id },
-        data: { status: 'failed' },
-      })
-
-      // Extract more detailed error info
-      const errorMessage = execError.message || 'Unknown error'
-      const errorStderr = execError.stderr || ''
-      const errorStdout = execError.stdout || ''
-
-      return NextResponse.json({ 
-        success: false,
-        error: errorMessage,
-        details: {
-          stderr: errorStderr,
-          stdout: errorStdout,
-          code: execError.code,
-          signal: execError.signal,
-        },
-      }, { status: 500 })
+    const result = await enqueuePostJob(params.id)
+    if (result.conflict !== undefined) {
+      return NextResponse.json({
+        error: result.conflict === 'completed'
+          ? 'Product is al geplaatst'
+          : 'Product wordt al door een worker geplaatst',
+        status: result.conflict,
+      }, { status: 409 })
     }
+    const { job, created } = result
+    console.log(`[POST] ${created ? 'Queued' : 'Already queued'} job ${job.id} for product ${params.id}`)
+
+    return NextResponse.json({
+      success: true,
+      message: created ? 'Product in wachtrij geplaatst' : 'Product staat al in de wachtrij',
+      jobId: job.id,
+      status: job.status,
+      statusUrl: `/api/jobs/${job.id}`,
+    }, { status: 202 })
   } catch (error: any) {
-    console.error('Error posting product:', error)
+    console.error('Error queueing product:', error)
     return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
   }
 }
-
@@ -1,10 +1,14 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { getServerSession } from '@/lib/auth'
 import { prisma } from '@/lib/prisma'
+import { applyProductUpdates, MAX_UPDATE_ROWS, ProductUpdateInput } from '@/lib/productUpdates'
 
 /**
  * Batch update products after posting
  * This endpoint allows the Python script to update multiple products at once
+ * (single UPDATE ... FROM unnest, see lib/productUpdates.ts)
+ * Body: { updates, workerId? }; a product leased via /api/products/claim is
+ * only updated when workerId is its lease owner
  */
 export async function POST(request: NextRequest) {
   try {
@@ -44,62 +48,36 @@ export async function POST(request: NextRequest) {
     }
 
     const body = await request.json()
-    const updates = body.updates as Array<{
-      productId: string
-      status?: string
-      ad_url?: string
-      ad_id?: string
-      views?: number
-      saves?: number
-      posted_at?: string
-    }>
+    const updates = body.updates as ProductUpdateInput[]
+    // Lease owner from /api/products/claim; leased products only accept their owner's result
+    const workerId = typeof body.workerId === 'string' && body.workerId ? body.workerId : null
 
     if (!Array.isArray(updates)) {
       return NextResponse.json({ error: 'Invalid request format' }, { status: 400 })
     }
+    if (updates.length > MAX_UPDATE_ROWS) {
+      return NextResponse.json({
+        error: `Too many updates (${updates.length}), send at most ${MAX_UPDATE_ROWS} per request`,
+      }, { status: 413 })
+    }
 
-    const results = []
-    for (const update of updates) {
-      try {
-        const product = await prisma.product.findUnique({
-          where: { id: update.productId },
-        })
-
-        if (!product) {
-          results.push({ productId: update.productId, success: false, error: 'Product not found' })
-          continue
-        }
-
-        // Check ownership if using session
-        if (session_user && product.userId !== session_user.user.id) {
-          results.push({ productId: update.productId, success: false, error: 'Unauthorized' })
-          continue
-        }
-
-        // Parse posted_at date
-        let postedAtDate: Date | null = null
-        if (update.posted_at) {
-          // Try to parse date, fallback to current date
-          postedAtDate = new Date()
-        }
-
-        await prisma.product.update({
-          where: { id: update.productId },
-          data: {
-            status: update.status || 'completed',
-            marktplaatsUrl: update.ad_url || null,
-            marktplaatsAdId: update.ad_id || null,
-            views: update.views || 0,
-            saves: update.saves || 0,
-            postedAt: postedAtDate,
-          },
-        })
+    // One set-based statement for the whole batch; with a session only own products match
+    const { updated, leaseConflicts } = await applyProductUpdates(
+      updates,
+      session_user ? session_user.user.id : null,
+      workerId
+    )
+    const updatedIds = new Set(updated)
+    const conflictIds = new Set(leaseConflicts)
 
-        results.push({ productId: update.productId, success: true })
-      } catch (error: any) {
-        results.push({ productId: update.productId, success: false, error: error.message })
+    const results = updates.map(update => {
+      const productId = String(update?.productId)
+      if (updatedIds.has(productId)) return { productId: update.productId, success: true }
+      if (conflictIds.has(productId)) {
+        return { productId: update.productId, success: false, error: 'Lease held by another worker' }
       }
-    }
+      return { productId: update?.productId, success: false, error: 'Product not found' }
+    })
 
     return NextResponse.json({ results })
   } catch (error) {
@@ -0,0 +1,27 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { releaseLeases } from '@/lib/productLeases'
+
+/**
+ * Return leased products to pending without posting them (API key only)
+ * Body: { workerId, productIds }
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    if (!body.workerId || !Array.isArray(body.productIds)) {
+      return NextResponse.json({ error: 'workerId and productIds are required' }, { status: 400 })
+    }
+
+    const released = await releaseLeases(body.workerId, body.productIds)
+    return NextResponse.json({ success: true, released })
+  } catch (error) {
+    console.error('Error releasing leases:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
@@ -0,0 +1,27 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { clampLeaseSeconds, renewLeases } from '@/lib/productLeases'
+
+/**
+ * Extend leases held by a worker (API key only)
+ * Body: { workerId, productIds, leaseSeconds? }
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    if (!body.workerId || !Array.isArray(body.productIds)) {
+      return NextResponse.json({ error: 'workerId and productIds are required' }, { status: 400 })
+    }
+
+    const renewed = await renewLeases(body.workerId, body.productIds, clampLeaseSeconds(body.leaseSeconds))
+    return NextResponse.json({ success: true, renewed })
+  } catch (error) {
+    console.error('Error renewing leases:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
@@ -0,0 +1,32 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { claimProducts, clampLeaseSeconds, MAX_CLAIM } from '@/lib/productLeases'
+
+/**
+ * Lease pending products to a worker (API key only)
+ * Body: { workerId, limit?, leaseSeconds?, userId? }
+ * Claimed products move to processing; if the lease is not renewed or the
+ * product is not reported via batch-update in time, it returns to pending.
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    if (!apiKey || apiKey.trim() !== validApiKey.trim()) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    const workerId = typeof body.workerId === 'string' && body.workerId ? body.workerId : null
+    if (!workerId) {
+      return NextResponse.json({ error: 'workerId is required' }, { status: 400 })
+    }
+    const limit = Math.min(Math.max(parseInt(body.limit, 10) || 1, 1), MAX_CLAIM)
+    const leaseSeconds = clampLeaseSeconds(body.leaseSeconds)
+
+    const products = await claimProducts(workerId, limit, leaseSeconds, body.userId || null)
+    return NextResponse.json({ workerId, leaseSeconds, products })
+  } catch (error) {
+    console.error('Error claiming products:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
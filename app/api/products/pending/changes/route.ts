@@ -0,0 +1,68 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getServerSession } from '@/lib/auth'
+import { prisma } from '@/lib/prisma'
+import { releaseExpiredLeases } from '@/lib/productLeases'
+
+export const dynamic = 'force-dynamic'
+export const maxDuration = 30
+
+const POLL_INTERVAL_MS = 1000
+const MAX_TIMEOUT_SECONDS = 25
+
+// Changes when products are created or move in/out of pending. Deliberately not based on
+// updatedAt: a worker handing back leases it cannot post must not wake itself up again.
+async function pendingCursor(userId: string | null) {
+  const result = await prisma.product.aggregate({
+    where: userId ? { userId, status: 'pending' } : { status: 'pending' },
+    _count: { _all: true },
+    _max: { createdAt: true },
+  })
+  const pending = result._count._all
+  return { pending, cursor: `${pending}:${result._max.createdAt?.getTime() ?? 0}` }
+}
+
+/**
+ * Long-poll for changes in the set of pending products
+ * ?since=<cursor>&timeout=25 -> { changed, cursor, pending }
+ * Returns as soon as the cursor differs from `since`, or after `timeout` seconds.
+ * Without `since` it answers immediately with the current cursor.
+ */
+export async function GET(request: NextRequest) {
+  try {
+    let session_user = null
+    try {
+      session_user = await getServerSession()
+    } catch {
+      // Session check failed, try API key
+    }
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    const isApiKeyValid = !!apiKey && apiKey.trim() === validApiKey.trim()
+
+    if (!session_user && !isApiKeyValid) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const userId = session_user && !isApiKeyValid ? session_user.user.id : null
+    const since = request.nextUrl.searchParams.get('since')
+    const timeoutSeconds = Math.min(
+      Math.max(parseInt(request.nextUrl.searchParams.get('timeout') || '25', 10) || 0, 0),
+      MAX_TIMEOUT_SECONDS
+    )
+    const deadline = Date.now() + timeoutSeconds * 1000
+
+    // Products from crashed workers become claimable again
+    await releaseExpiredLeases()
+
+    let state = await pendingCursor(userId)
+    while (since && state.cursor === since && Date.now() < deadline && !request.signal.aborted) {
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))
+      state = await pendingCursor(userId)
+    }
+
+    return NextResponse.json({ changed: state.cursor !== since, ...state })
+  } catch (error) {
+    console.error('Error waiting for pending changes:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
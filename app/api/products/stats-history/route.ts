@@ -0,0 +1,92 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getServerSession } from '@/lib/auth'
+import { prisma } from '@/lib/prisma'
+import {
+  downsampleStatSamples,
+  getAdVelocity,
+  getCategoryVelocity,
+  parseBucket,
+  DEFAULT_RETENTION,
+} from '@/lib/statsHistory'
+
+function isValidApiKey(request: NextRequest) {
+  const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+  const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+  return !!apiKey && apiKey.trim() === validApiKey.trim()
+}
+
+/**
+ * Views/saves history and velocity
+ * ?productId=...&days=30&bucket=hour|day|week  -> per-ad series
+ * ?categoryId=...&days=30                      -> per-category velocity
+ */
+export async function GET(request: NextRequest) {
+  try {
+    let session_user = null
+    try {
+      session_user = await getServerSession()
+    } catch {
+      // Session check failed
+    }
+
+    if (!session_user && !isValidApiKey(request)) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const params = request.nextUrl.searchParams
+    const productId = params.get('productId')
+    const categoryId = params.get('categoryId')
+    const days = Math.min(Math.max(parseInt(params.get('days') || '30', 10) || 30, 1), 730)
+    const userId = session_user ? session_user.user.id : null
+
+    if (productId) {
+      if (userId) {
+        const product = await prisma.product.findUnique({
+          where: { id: productId },
+          select: { userId: true },
+        })
+        if (!product || product.userId !== userId) {
+          return NextResponse.json({ error: 'Product not found' }, { status: 404 })
+        }
+      }
+      return NextResponse.json(await getAdVelocity(productId, days, parseBucket(params.get('bucket'))))
+    }
+
+    if (categoryId) {
+      return NextResponse.json(await getCategoryVelocity(categoryId, days, userId))
+    }
+
+    return NextResponse.json({ error: 'productId or categoryId is required' }, { status: 400 })
+  } catch (error) {
+    console.error('Error fetching stats history:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
+
+/**
+ * Downsampling and retention (API key only, intended for a scheduled job)
+ * Body (optional): { rawDays, hourlyDays, retentionDays }
+ */
+export async function POST(request: NextRequest) {
+  try {
+    if (!isValidApiKey(request)) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+    }
+
+    const body = await request.json().catch(() => ({}))
+    const policy = {
+      rawDays: Number(body.rawDays) || DEFAULT_RETENTION.rawDays,
+      hourlyDays: Number(body.hourlyDays) || DEFAULT_RETENTION.hourlyDays,
+      retentionDays: Number(body.retentionDays) || DEFAULT_RETENTION.retentionDays,
+    }
+    if (!(policy.rawDays <= policy.hourlyDays && policy.hourlyDays <= policy.retentionDays)) {
+      return NextResponse.json({ error: 'Expected rawDays <= hourlyDays <= retentionDays' }, { status: 400 })
+    }
+
+    const removed = await downsampleStatSamples(policy)
+    return NextResponse.json({ success: true, policy, removed })
+  } catch (error) {
+    console.error('Error downsampling stats history:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
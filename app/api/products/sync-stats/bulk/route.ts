@@ -0,0 +1,71 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getServerSession } from '@/lib/auth'
+import {
+  applyStatsRows,
+  dedupeStatsRows,
+  rowsFromColumns,
+  rowsFromNdjson,
+  MAX_STATS_ROWS,
+  StatsRow,
+} from '@/lib/productStats'
+
+/**
+ * Bulk stats ingestion for the Python scrapers
+ * Accepts columnar JSON ({ ad_id: [...], views: [...], saves: [...], posted_at: [...] })
+ * or NDJSON (Content-Type: application/x-ndjson, one row per line)
+ * and updates all matching products in a single statement
+ */
+export async function POST(request: NextRequest) {
+  try {
+    // Allow authentication via session or API key
+    const apiKey = request.headers.get('x-api-key') || request.nextUrl.searchParams.get('api_key')
+    const validApiKey = process.env.INTERNAL_API_KEY || 'internal-key-change-in-production'
+    const isApiKeyValid = !!apiKey && apiKey.trim() === validApiKey.trim()
+
+    let session_user = null
+    try {
+      session_user = await getServerSession()
+    } catch {
+      // Session check failed
+    }
+
+    if (!session_user && !isApiKeyValid) {
+      return NextResponse.json({
+        error: 'Unauthorized',
+        hint: !apiKey ? 'No API key provided.' : 'Invalid API key.'
+      }, { status: 401 })
+    }
+
+    const contentType = request.headers.get('content-type') || ''
+    let rows: StatsRow[]
+    try {
+      if (contentType.includes('ndjson')) {
+        rows = rowsFromNdjson(await request.text())
+      } else {
+        rows = rowsFromColumns(await request.json())
+      }
+    } catch (error: any) {
+      return NextResponse.json({ error: error.message || 'Invalid request format' }, { status: 400 })
+    }
+
+    if (rows.length > MAX_STATS_ROWS) {
+      return NextResponse.json({
+        error: `Too many rows (${rows.length}), maximum is ${MAX_STATS_ROWS} per request`
+      }, { status: 413 })
+    }
+
+    const uniqueRows = dedupeStatsRows(rows)
+    // With a session only the user's own products are updated; the API key covers all users
+    const matched = await applyStatsRows(uniqueRows, session_user ? session_user.user.id : null)
+
+    return NextResponse.json({
+      success: true,
+      received: rows.length,
+      updated: matched.length,
+      unmatched: uniqueRows.length - matched.length,
+    })
+  } catch (error) {
+    console.error('Error bulk syncing stats:', error)
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+  }
+}
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { getServerSession } from '@/lib/auth'
 import { prisma } from '@/lib/prisma'
+import { recordStatSamples, StatSampleInput } from '@/lib/statsHistory'
 import { exec } from 'child_process'
 import { promisify } from 'util'
 import path from 'path'
@@ -74,6 +75,7 @@ export async function POST(request: NextRequest) {
 
     const userAds = JSON.parse(jsonMatch[1])
     let updated = 0
+    const samples: StatSampleInput[] = []
 
     // Match and update products
     for (const product of products) {
@@ -115,9 +117,12 @@ export async function POST(request: NextRequest) {
         // Parse posted_at date
         let postedAtDate: Date | null = null
         if (matchingAd.posted_at) {
-          // Try to parse Dutch date format
+          // The scraper emits ISO timestamps; keep the Dutch fallbacks for older output
           const dateStr = matchingAd.posted_at
-          if (dateStr === 'Vandaag') {
+          const parsed = new Date(dateStr)
+          if (!isNaN(parsed.getTime())) {
+            postedAtDate = parsed
+          } else if (dateStr === 'Vandaag') {
             postedAtDate = new Date()
           } else if (dateStr === 'Gisteren') {
             const yesterday = new Date()
@@ -151,6 +156,7 @@ export async function POST(request: NextRequest) {
           where: { id: product.id },
           data: updateData,
         })
+        samples.push({ productId: product.id, views: updateData.views, saves: updateData.saves })
         updated++
         console.log(`Updated product ${product.id}: views=${updateData.views}, saves=${updateData.saves}`)
       } else {
@@ -158,6 +164,8 @@ export async function POST(request: NextRequest) {
       }
     }
 
+    await recordStatSamples(samples)
+
     return NextResponse.json({
       success: true,
       message: `Updated ${updated} of ${products.length} products`,
@@ -0,0 +1,152 @@
+import { prisma } from './prisma'
+
+// Upper bound per request; the Python importer sends 2000 categories per chunk
+export const MAX_CATEGORY_ROWS = 10000
+
+export interface CategoryInput {
+  id?: string
+  name?: string
+  level?: number
+  parentId?: string | null
+  path?: string
+  marktplaatsId?: string | null
+}
+
+export interface CategoryImportResult {
+  created: number
+  updated: number
+  unchanged: number
+  skipped: number
+  errors: string[]
+  // The bulk write rolled back: nothing of this batch was written
+  failed: boolean
+}
+
+interface CategoryRow {
+  id: string
+  name: string
+  level: number
+  parentId: string | null
+  path: string
+  marktplaatsId: string | null
+}
+
+function slugify(name: string) {
+  return name.toLowerCase().replace(/\s+/g, '-').replace(/[^a-z0-9-]/g, '')
+}
+
+function parentPath(path: string): string | null {
+  const index = path.lastIndexOf(' > ')
+  return index > 0 ? path.slice(0, index) : null
+}
+
+/**
+ * Upsert a (partial) category tree in bulk.
+ * Existing rows are loaded once and matched by id or path, parents are resolved
+ * in memory (by id, name or path, including parents earlier in the same batch),
+ * then new rows go in with one createMany and changed rows with one set-based
+ * UPDATE, both in a single transaction. If that transaction fails the whole
+ * batch is rolled back and `failed` is set.
+ */
+export async function importCategories(input: CategoryInput[]): Promise<CategoryImportResult> {
+  const result: CategoryImportResult = { created: 0, updated: 0, unchanged: 0, skipped: 0, errors: [], failed: false }
+
+  const existing = await prisma.category.findMany({
+    select: { id: true, name: true, level: true, parentId: true, path: true, marktplaatsId: true },
+  })
+  const byId = new Map<string, CategoryRow>()
+  const byPath = new Map<string, CategoryRow>()
+  const byName = new Map<string, CategoryRow>()
+  const remember = (row: CategoryRow) => {
+    byId.set(row.id, row)
+    byPath.set(row.path, row)
+    if (!byName.has(row.name)) byName.set(row.name, row)
+  }
+  existing.forEach(remember)
+  const existingIds = new Set(existing.map(c => c.id))
+
+  const creates = new Map<string, CategoryRow>()
+  const updates = new Map<string, CategoryRow>()
+
+  // Process categories in order (parents first)
+  const sorted = [...input].sort((a, b) => (a.level || 0) - (b.level || 0))
+  for (const cat of sorted) {
+    const { name, level } = cat
+    if (!name || !level) {
+      result.skipped++
+      result.errors.push(`Skipped category: missing name or level`)
+      continue
+    }
+
+    const path = cat.path || name
+    const categoryId = cat.id || slugify(name)
+
+    const parentRef = cat.parentId
+    const parent = parentRef
+      ? byId.get(parentRef) || byName.get(parentRef) || byPath.get(parentRef)
+      : (parentPath(path) ? byPath.get(parentPath(path)!) : undefined)
+    const current = byId.get(categoryId) || byPath.get(path)
+
+    const row: CategoryRow = {
+      id: current ? current.id : categoryId,
+      name,
+      level,
+      parentId: parent && parent.id !== (current?.id ?? categoryId) ? parent.id : null,
+      path,
+      marktplaatsId: cat.marktplaatsId || current?.marktplaatsId || null,
+    }
+
+    if (current && existingIds.has(current.id)) {
+      const changed = current.name !== row.name || current.level !== row.level ||
+        current.parentId !== row.parentId || current.path !== row.path ||
+        current.marktplaatsId !== row.marktplaatsId
+      if (changed) {
+        if (!updates.has(row.id)) result.updated++
+        updates.set(row.id, row)
+      } else if (!updates.has(row.id)) {
+        result.unchanged++
+      }
+    } else {
+      if (!creates.has(row.id)) result.created++
+      creates.set(row.id, row)
+    }
+    // Later rows (children) resolve against this one
+    if (current && current.path !== row.path) byPath.delete(current.path)
+    remember(row)
+  }
+
+  const updateRows = [...updates.values()]
+  try {
+    await prisma.$transaction([
+      // Sorted by level, so parents are inserted before (or with) their children
+      prisma.category.createMany({ data: [...creates.values()], skipDuplicates: true }),
+      prisma.$executeRaw`
+        UPDATE "Category" AS c
+        SET "name" = v.name,
+            "level" = v.level,
+            "parentId" = v.parent_id,
+            "path" = v.path,
+            "marktplaatsId" = v.marktplaats_id,
+            "updatedAt" = NOW()
+        FROM unnest(
+          ${updateRows.map(r => r.id)}::text[],
+          ${updateRows.map(r => r.name)}::text[],
+          ${updateRows.map(r => r.level)}::int[],
+          ${updateRows.map(r => r.parentId)}::text[],
+          ${updateRows.map(r => r.path)}::text[],
+          ${updateRows.map(r => r.marktplaatsId)}::text[]
+        ) AS v(id, name, level, parent_id, path, marktplaats_id)
+        WHERE c.id = v.id
+      `,
+    ])
+  } catch (error: any) {
+    console.error('Error writing categories:', error)
+    result.errors.push(`Bulk write failed: ${error.message}`)
+    result.failed = true
+    result.skipped += result.created + result.updated
+    result.created = 0
+    result.updated = 0
+  }
+
+  return result
+}
@@ -0,0 +1,191 @@
+import { PostJob, Prisma } from '@prisma/client'
+import { prisma } from './prisma'
+import { formatProductForWorker } from './productExport'
+import { recordStatSamples } from './statsHistory'
+
+export const MAX_ATTEMPTS = 3
+export const STALE_AFTER_MINUTES = 15
+
+const ACTIVE_STATUSES = ['queued', 'running']
+
+// Result dict as produced by post_product() in scripts/post_ads.py
+export interface PostResult {
+  ad_url?: string | null
+  ad_id?: string | null
+  views?: number
+  saves?: number
+  posted_at?: string | null
+  status?: string
+  error?: string
+}
+
+// Only these products may be queued; processing (leased or queued) and completed ones may not
+const ENQUEUEABLE_STATUSES = ['pending', 'failed']
+
+export type EnqueueResult =
+  | { job: PostJob; created: boolean; conflict?: undefined }
+  | { job?: undefined; created: false; conflict: string }
+
+/**
+ * Queue a product for posting. Re-posting a product that already has an
+ * active job returns that job instead of queueing a duplicate. The partial
+ * unique index on active jobs settles concurrent enqueues (double click, two
+ * tabs): the loser's insert fails with P2002 and gets the winner's job.
+ * A product that is leased to a worker (/api/products/claim) or already
+ * completed is not queued; `conflict` then holds its status.
+ */
+export async function enqueuePostJob(productId: string): Promise<EnqueueResult> {
+  try {
+    return await prisma.$transaction(async (tx): Promise<EnqueueResult> => {
+      const existing = await findActiveJob(tx, productId)
+      if (existing) return { job: existing, created: false }
+
+      // Conditional, so a concurrent claim or a finished post wins over this enqueue
+      const { count } = await tx.product.updateMany({
+        where: {
+          id: productId,
+          status: { in: ENQUEUEABLE_STATUSES },
+          OR: [{ leaseOwner: null }, { leaseExpiresAt: { lt: new Date() } }],
+        },
+        data: { status: 'processing', leaseOwner: null, leaseExpiresAt: null },
+      })
+      if (count === 0) {
+        const product = await tx.product.findUnique({ where: { id: productId }, select: { status: true } })
+        return { created: false, conflict: product?.status ?? 'unknown' }
+      }
+
+      const job = await tx.postJob.create({ data: { productId } })
+      return { job, created: true }
+    })
+  } catch (error) {
+    if (error instanceof Prisma.PrismaClientKnownRequestError && error.code === 'P2002') {
+      const existing = await findActiveJob(prisma, productId)
+      if (existing) return { job: existing, created: false }
+    }
+    throw error
+  }
+}
+
+function findActiveJob(client: Prisma.TransactionClient, productId: string) {
+  return client.postJob.findFirst({
+    where: { productId, status: { in: ACTIVE_STATUSES } },
+    orderBy: { createdAt: 'desc' },
+  })
+}
+
+/**
+ * Put jobs whose worker disappeared back in the queue, or fail them once
+ * they have used up their attempts.
+ */
+async function recoverStaleJobs(staleMinutes: number) {
+  const staleBefore = new Date(Date.now() - staleMinutes * 60 * 1000)
+
+  await prisma.postJob.updateMany({
+    where: { status: 'running', startedAt: { lt: staleBefore }, attempts: { lt: MAX_ATTEMPTS } },
+    data: { status: 'queued', workerId: null },
+  })
+
+  const exhausted = await prisma.postJob.findMany({
+    where: { status: 'running', startedAt: { lt: staleBefore } },
+    select: { id: true, productId: true },
+  })
+  if (exhausted.length === 0) return
+
+  await prisma.$transaction([
+    prisma.postJob.updateMany({
+      where: { id: { in: exhausted.map(j => j.id) } },
+      data: { status: 'failed', error: 'Worker timed out', finishedAt: new Date() },
+    }),
+    prisma.product.updateMany({
+      where: { id: { in: exhausted.map(j => j.productId) } },
+      data: { status: 'failed' },
+    }),
+  ])
+}
+
+/**
+ * Atomically hand up to `limit` queued jobs to a worker.
+ * FOR UPDATE SKIP LOCKED lets several workers claim concurrently without
+ * ever receiving the same job.
+ */
+export async function claimPostJobs(workerId: string, limit: number, staleMinutes = STALE_AFTER_MINUTES) {
+  await recoverStaleJobs(staleMinutes)
+
+  const claimed = await prisma.$queryRaw<Array<{ id: string; productId: string; attempts: number }>>`
+    UPDATE "PostJob" AS j
+    SET status = 'running', "workerId" = ${workerId}, "startedAt" = NOW(), attempts = j.attempts + 1
+    WHERE j.id IN (
+      SELECT id FROM "PostJob"
+      WHERE status = 'queued'
+      ORDER BY "createdAt"
+      LIMIT ${limit}
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.id, j."productId", j.attempts
+  `
+  if (claimed.length === 0) return []
+
+  const products = await prisma.product.findMany({
+    where: { id: { in: claimed.map(j => j.productId) } },
+    include: { category: true },
+  })
+  const byId = new Map(products.map(p => [p.id, p]))
+
+  return claimed
+    .filter(j => byId.has(j.productId))
+    .map(j => ({
+      id: j.id,
+      attempts: j.attempts,
+      product: formatProductForWorker(byId.get(j.productId)!),
+    }))
+}
+
+/**
+ * Store a worker's result on the job and its product.
+ * Returns null when the job is unknown or no longer owned by this worker.
+ */
+export async function completePostJob(jobId: string, workerId: string | null, result: PostResult) {
+  const job = await prisma.postJob.findUnique({ where: { id: jobId } })
+  if (!job || job.status !== 'running' || (workerId && job.workerId !== workerId)) {
+    return null
+  }
+
+  const adUrl = result.ad_url || null
+  const wasSuccessful = !!adUrl
+  let postedAt: Date | null = null
+  if (result.posted_at) {
+    // posted_at is an ISO timestamp from the scraper, fallback to current date
+    const parsed = new Date(result.posted_at)
+    postedAt = isNaN(parsed.getTime()) ? new Date() : parsed
+  }
+  const views = result.views || 0
+  const saves = result.saves || 0
+
+  const [updatedJob] = await prisma.$transaction([
+    prisma.postJob.update({
+      where: { id: jobId },
+      data: {
+        status: wasSuccessful ? 'completed' : 'failed',
+        result: result as any,
+        error: wasSuccessful ? null : (result.error || 'Advertentie kon niet worden geplaatst'),
+        finishedAt: new Date(),
+      },
+    }),
+    prisma.product.update({
+      where: { id: job.productId },
+      data: {
+        status: wasSuccessful ? 'completed' : 'failed',
+        marktplaatsUrl: adUrl,
+        marktplaatsAdId: result.ad_id || null,
+        views,
+        saves,
+        postedAt,
+      },
+    }),
+  ])
+
+  if (wasSuccessful) {
+    await recordStatSamples([{ productId: job.productId, views, saves }])
+  }
+  return updatedJob
+}
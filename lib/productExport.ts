@@ -0,0 +1,138 @@
+import fs from 'fs'
+import path from 'path'
+
+type ExportableProduct = {
+  id: string
+  title: string
+  description: string
+  price: number
+  location: string | null
+  articleNumber: string
+  condition: string | null
+  material: string | null
+  thickness: string | null
+  totalSurface: string | null
+  deliveryOption: string | null
+  categoryId: string | null
+  userId: string
+  marktplaatsAccount?: string | null
+  category?: { path: string; attributeSchema?: unknown } | null
+}
+
+let cachedCategories: Record<string, any> | null = null
+
+function loadCategoryFieldDefinitions(): Record<string, any> {
+  if (cachedCategories) return cachedCategories
+
+  const jsonPath = path.join(process.cwd(), 'category_fields_v2.json')
+  if (!fs.existsSync(jsonPath)) {
+    console.warn(`category_fields_v2.json not found at ${jsonPath}`)
+    return {}
+  }
+
+  const data = JSON.parse(fs.readFileSync(jsonPath, 'utf-8'))
+  cachedCategories = data?.categorySpecificFields?.categories || {}
+  return cachedCategories!
+}
+
+/**
+ * Category-specific fields for a product (same logic as /api/categories/[id]/fields)
+ */
+export function getCategoryFields(categoryId: string | null, categoryPath: string | null): Record<string, any> {
+  if (!categoryId) return {}
+
+  try {
+    const allCategories = loadCategoryFieldDefinitions()
+
+    // First, try direct match by category ID
+    let categoryFields = allCategories[categoryId]
+
+    // If not found and we have a category path, try matching by path
+    if (!categoryFields && categoryPath) {
+      // Try exact path match
+      const foundByPath = Object.values(allCategories).find((cat: any) =>
+        cat.categoryPath?.toLowerCase() === categoryPath.toLowerCase()
+      )
+
+      if (foundByPath) {
+        categoryFields = foundByPath
+      } else {
+        // Try fuzzy match on path
+        const normalizedDbPath = categoryPath.toLowerCase().replace(/\s*>\s*/g, ' > ').trim()
+        const foundByFuzzyPath = Object.values(allCategories).find((cat: any) => {
+          if (!cat.categoryPath) return false
+          const normalizedCatPath = cat.categoryPath.toLowerCase().replace(/\s*>\s*/g, ' > ').trim()
+          return normalizedCatPath === normalizedDbPath
+        })
+
+        if (foundByFuzzyPath) {
+          categoryFields = foundByFuzzyPath
+        } else {
+          // Try partial match
+          const dbPathParts = normalizedDbPath.split(' > ').map((p: string) => p.trim())
+          const foundByPartial = Object.values(allCategories).find((cat: any) => {
+            if (!cat.categoryPath) return false
+            const catPathParts = cat.categoryPath.toLowerCase().split(' > ').map((p: string) => p.trim())
+            if (dbPathParts.length > catPathParts.length) return false
+            let dbIndex = 0
+            for (let i = 0; i < catPathParts.length && dbIndex < dbPathParts.length; i++) {
+              if (catPathParts[i].includes(dbPathParts[dbIndex]) || dbPathParts[dbIndex].includes(catPathParts[i])) {
+                dbIndex++
+              }
+            }
+            return dbIndex === dbPathParts.length
+          })
+
+          if (foundByPartial) {
+            categoryFields = foundByPartial
+          }
+        }
+      }
+    }
+
+    if (categoryFields?.fields) {
+      // Convert fields array to object format expected by Python script
+      const fieldsObj: Record<string, any> = {}
+      categoryFields.fields.forEach((field: any) => {
+        const fieldKey = field.name || field.id
+        if (fieldKey) {
+          // For now, return empty values - the Python script will fill them from product data
+          fieldsObj[fieldKey] = ''
+        }
+      })
+      return fieldsObj
+    }
+  } catch (error) {
+    console.error(`Error loading category fields for ${categoryId}:`, error)
+  }
+
+  return {}
+}
+
+/**
+ * Format a product (with its category) for the Python posting scripts
+ */
+export function formatProductForWorker(product: ExportableProduct) {
+  return {
+    id: product.id,
+    title: product.title,
+    description: product.description,
+    price: product.price.toString(),
+    location: product.location || '',
+    photos: [], // Photos are found via article_number in media folder
+    article_number: product.articleNumber,
+    condition: product.condition || 'Gebruikt',
+    delivery_methods: [],
+    material: product.material || '',
+    thickness: product.thickness || '',
+    total_surface: product.totalSurface || '',
+    delivery_option: product.deliveryOption || 'Ophalen of Verzenden',
+    category_path: product.category?.path || null,
+    category_fields: getCategoryFields(product.categoryId, product.category?.path || null),
+    // Scraped form fields of the category, used to fill and validate category_fields
+    category_schema: product.category?.attributeSchema ?? null,
+    // Used by the worker to route the product to a Marktplaats account
+    user_id: product.userId,
+    marktplaats_account: product.marktplaatsAccount || null,
+  }
+}
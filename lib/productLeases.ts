@@ -0,0 +1,90 @@
+import { Prisma } from '@prisma/client'
+import { prisma } from './prisma'
+import { formatProductForWorker } from './productExport'
+
+export const DEFAULT_LEASE_SECONDS = 900
+export const MAX_LEASE_SECONDS = 3600
+export const MAX_CLAIM = 100
+
+export function clampLeaseSeconds(value: unknown): number {
+  const seconds = parseInt(String(value ?? ''), 10) || DEFAULT_LEASE_SECONDS
+  return Math.min(Math.max(seconds, 30), MAX_LEASE_SECONDS)
+}
+
+/**
+ * Return products whose lease ran out (crashed or stuck worker) to pending
+ */
+export async function releaseExpiredLeases(): Promise<number> {
+  return prisma.$executeRaw`
+    UPDATE "Product"
+    SET status = 'pending', "leaseOwner" = NULL, "leaseExpiresAt" = NULL, "updatedAt" = NOW()
+    WHERE status = 'processing' AND "leaseExpiresAt" < NOW()
+  `
+}
+
+/**
+ * Atomically lease up to `limit` pending products to a worker, moving them to
+ * processing. SKIP LOCKED keeps concurrent claims from ever overlapping.
+ */
+export async function claimProducts(
+  workerId: string,
+  limit: number,
+  leaseSeconds: number,
+  userId?: string | null
+) {
+  await releaseExpiredLeases()
+
+  const ownerFilter = userId ? Prisma.sql`AND "userId" = ${userId}` : Prisma.empty
+  const claimed = await prisma.$queryRaw<Array<{ id: string; leaseExpiresAt: Date }>>`
+    UPDATE "Product" AS p
+    SET status = 'processing',
+        "leaseOwner" = ${workerId},
+        "leaseExpiresAt" = NOW() + ${leaseSeconds}::int * INTERVAL '1 second',
+        "updatedAt" = NOW()
+    WHERE p.id IN (
+      SELECT id FROM "Product"
+      WHERE status = 'pending' ${ownerFilter}
+      ORDER BY "createdAt"
+      LIMIT ${limit}
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING p.id, p."leaseExpiresAt"
+  `
+  if (claimed.length === 0) return []
+
+  const products = await prisma.product.findMany({
+    where: { id: { in: claimed.map(c => c.id) } },
+    include: { category: true },
+    orderBy: { createdAt: 'asc' },
+  })
+  const expiresAt = new Map(claimed.map(c => [c.id, c.leaseExpiresAt]))
+
+  return products.map(product => ({
+    ...formatProductForWorker(product),
+    lease_expires_at: expiresAt.get(product.id),
+  }))
+}
+
+/**
+ * Extend the lease on products this worker still holds (heartbeat)
+ */
+export async function renewLeases(workerId: string, productIds: string[], leaseSeconds: number): Promise<number> {
+  if (productIds.length === 0) return 0
+  const result = await prisma.product.updateMany({
+    where: { id: { in: productIds }, leaseOwner: workerId, status: 'processing' },
+    data: { leaseExpiresAt: new Date(Date.now() + leaseSeconds * 1000) },
+  })
+  return result.count
+}
+
+/**
+ * Give unfinished products back to the queue (e.g. worker shutting down)
+ */
+export async function releaseLeases(workerId: string, productIds: string[]): Promise<number> {
+  if (productIds.length === 0) return 0
+  const result = await prisma.product.updateMany({
+    where: { id: { in: productIds }, leaseOwner: workerId, status: 'processing' },
+    data: { status: 'pending', leaseOwner: null, leaseExpiresAt: null },
+  })
+  return result.count
+}
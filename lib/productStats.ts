@@ -0,0 +1,132 @@
+import { Prisma } from '@prisma/client'
+import { prisma } from './prisma'
+
+// Upper bound per request; the Python batcher sends 5000 rows per flush
+export const MAX_STATS_ROWS = 20000
+
+export interface StatsRow {
+  ad_id: string
+  views: number
+  saves: number
+  posted_at: string | null
+}
+
+export interface StatsColumns {
+  ad_id: string[]
+  views?: number[]
+  saves?: number[]
+  posted_at?: (string | null)[]
+}
+
+function toCount(value: unknown): number {
+  const n = typeof value === 'number' ? value : parseInt(String(value ?? '0'), 10)
+  return Number.isFinite(n) && n > 0 ? Math.floor(n) : 0
+}
+
+function toTimestamp(value: unknown): string | null {
+  if (!value) return null
+  // Only ISO timestamps are accepted; raw Dutch strings like "6 nov '25" are ignored
+  const date = new Date(String(value))
+  return isNaN(date.getTime()) ? null : date.toISOString()
+}
+
+/**
+ * Convert a columnar payload ({ ad_id: [...], views: [...], ... }) into rows
+ */
+export function rowsFromColumns(columns: StatsColumns): StatsRow[] {
+  if (!Array.isArray(columns.ad_id)) {
+    throw new Error('Columnar payload requires an ad_id array')
+  }
+  const length = columns.ad_id.length
+  for (const key of ['views', 'saves', 'posted_at'] as const) {
+    const column = columns[key]
+    if (column !== undefined && (!Array.isArray(column) || column.length !== length)) {
+      throw new Error(`Column ${key} must be an array with ${length} entries`)
+    }
+  }
+
+  const rows: StatsRow[] = []
+  for (let i = 0; i < length; i++) {
+    rows.push({
+      ad_id: String(columns.ad_id[i] ?? ''),
+      views: toCount(columns.views?.[i]),
+      saves: toCount(columns.saves?.[i]),
+      posted_at: toTimestamp(columns.posted_at?.[i]),
+    })
+  }
+  return rows
+}
+
+/**
+ * Convert an NDJSON body (one { ad_id, views, saves, posted_at } object per line) into rows
+ */
+export function rowsFromNdjson(text: string): StatsRow[] {
+  const rows: StatsRow[] = []
+  const lines = text.split('\n')
+  for (let i = 0; i < lines.length; i++) {
+    const line = lines[i].trim()
+    if (!line) continue
+    let item: any
+    try {
+      item = JSON.parse(line)
+    } catch {
+      throw new Error(`Invalid JSON on line ${i + 1}`)
+    }
+    rows.push({
+      ad_id: String(item.ad_id ?? ''),
+      views: toCount(item.views),
+      saves: toCount(item.saves),
+      posted_at: toTimestamp(item.posted_at),
+    })
+  }
+  return rows
+}
+
+/**
+ * Drop rows without an ad id and keep the last row per ad id,
+ * so the set-based update never sees two source rows for one product
+ */
+export function dedupeStatsRows(rows: StatsRow[]): StatsRow[] {
+  const byAdId = new Map<string, StatsRow>()
+  for (const row of rows) {
+    if (row.ad_id) {
+      byAdId.set(row.ad_id, row)
+    }
+  }
+  return [...byAdId.values()]
+}
+
+/**
+ * Apply stats rows to products matched by marktplaatsAdId in a single statement:
+ * UPDATE ... FROM unnest(...) plus an append to ProductStatSample for the history
+ * Returns the ad ids that matched a product
+ */
+export async function applyStatsRows(rows: StatsRow[], userId?: string | null): Promise<string[]> {
+  if (rows.length === 0) return []
+
+  const adIds = rows.map(r => r.ad_id)
+  const views = rows.map(r => r.views)
+  const saves = rows.map(r => r.saves)
+  const postedAt = rows.map(r => r.posted_at)
+  const ownerFilter = userId ? Prisma.sql`AND p."userId" = ${userId}` : Prisma.empty
+
+  const matched = await prisma.$queryRaw<{ ad_id: string }[]>`
+    WITH updated AS (
+      UPDATE "Product" AS p
+      SET "views" = v.views,
+          "saves" = v.saves,
+          "postedAt" = COALESCE(v.posted_at::timestamptz AT TIME ZONE 'UTC', p."postedAt"),
+          "updatedAt" = NOW()
+      FROM unnest(${adIds}::text[], ${views}::int[], ${saves}::int[], ${postedAt}::text[])
+        AS v(ad_id, views, saves, posted_at)
+      WHERE p."marktplaatsAdId" = v.ad_id ${ownerFilter}
+      RETURNING p.id, p."marktplaatsAdId", p.views, p.saves
+    ), samples AS (
+      INSERT INTO "ProductStatSample" ("productId", "sampledAt", "views", "saves")
+      SELECT id, NOW(), views, saves FROM updated
+      ON CONFLICT DO NOTHING
+    )
+    SELECT "marktplaatsAdId" AS ad_id FROM updated
+  `
+  return matched.map(m => m.ad_id)
+}
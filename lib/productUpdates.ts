@@ -0,0 +1,122 @@
+import { Prisma } from '@prisma/client'
+import { prisma } from './prisma'
+
+// Upper bound per request; the Python client sends 2000 updates per chunk
+export const MAX_UPDATE_ROWS = 10000
+
+export interface ProductUpdateInput {
+  productId: string
+  status?: string
+  ad_url?: string | null
+  ad_id?: string | null
+  views?: number
+  saves?: number
+  posted_at?: string | null
+}
+
+interface ProductUpdateRow {
+  id: string
+  workerId: string | null
+  status: string
+  adUrl: string | null
+  adId: string | null
+  views: number
+  saves: number
+  postedAt: string | null
+}
+
+function toRow(update: ProductUpdateInput, workerId: string | null, now: Date): ProductUpdateRow {
+  // posted_at is an ISO timestamp from the scraper, fallback to current date
+  let postedAt: string | null = null
+  if (update.posted_at) {
+    const parsed = new Date(update.posted_at)
+    postedAt = (isNaN(parsed.getTime()) ? now : parsed).toISOString()
+  }
+  return {
+    id: String(update.productId),
+    workerId,
+    status: update.status || 'completed',
+    adUrl: update.ad_url || null,
+    adId: update.ad_id || null,
+    views: Math.max(Math.floor(Number(update.views) || 0), 0),
+    saves: Math.max(Math.floor(Number(update.saves) || 0), 0),
+    postedAt,
+  }
+}
+
+export interface ProductUpdateOutcome {
+  updated: string[]
+  // Leased to another worker (or to a worker while none was given): left untouched
+  leaseConflicts: string[]
+}
+
+/**
+ * Apply posting results to many products in one statement:
+ * UPDATE ... FROM unnest(...) for status/URL/ad id/stats, clearing any claim lease,
+ * plus a ProductStatSample row for every product that was actually posted.
+ * A product leased through /api/products/claim is only updated by its lease owner
+ * (`workerId`), so a worker whose lease expired cannot overwrite the new owner's result.
+ * Missing or not owned ids are skipped.
+ */
+export async function applyProductUpdates(
+  updates: ProductUpdateInput[],
+  userId?: string | null,
+  workerId?: string | null
+): Promise<ProductUpdateOutcome> {
+  const now = new Date()
+  // Last update wins, so the set-based update never sees two source rows for one product
+  const byId = new Map<string, ProductUpdateRow>()
+  for (const update of updates) {
+    if (update && update.productId) {
+      byId.set(String(update.productId), toRow(update, workerId || null, now))
+    }
+  }
+  const rows = [...byId.values()]
+  if (rows.length === 0) return { updated: [], leaseConflicts: [] }
+
+  const ownerFilter = userId ? Prisma.sql`AND p."userId" = ${userId}` : Prisma.empty
+
+  const outcome = await prisma.$queryRaw<{ id: string; updated: boolean }[]>`
+    WITH v AS (
+      SELECT * FROM unnest(
+        ${rows.map(r => r.id)}::text[],
+        ${rows.map(r => r.workerId)}::text[],
+        ${rows.map(r => r.status)}::text[],
+        ${rows.map(r => r.adUrl)}::text[],
+        ${rows.map(r => r.adId)}::text[],
+        ${rows.map(r => r.views)}::int[],
+        ${rows.map(r => r.saves)}::int[],
+        ${rows.map(r => r.postedAt)}::text[]
+      ) AS v(id, worker_id, status, ad_url, ad_id, views, saves, posted_at)
+    ), updated AS (
+      UPDATE "Product" AS p
+      SET "status" = v.status,
+          "marktplaatsUrl" = v.ad_url,
+          "marktplaatsAdId" = v.ad_id,
+          "views" = v.views,
+          "saves" = v.saves,
+          "postedAt" = v.posted_at::timestamptz AT TIME ZONE 'UTC',
+          "leaseOwner" = NULL,
+          "leaseExpiresAt" = NULL,
+          "updatedAt" = NOW()
+      FROM v
+      WHERE p.id = v.id ${ownerFilter}
+        AND (p."leaseOwner" IS NULL OR p."leaseOwner" = v.worker_id)
+      RETURNING p.id, p."marktplaatsUrl", p.views, p.saves
+    ), samples AS (
+      INSERT INTO "ProductStatSample" ("productId", "sampledAt", "views", "saves")
+      SELECT id, NOW(), views, saves FROM updated
+      WHERE "marktplaatsUrl" IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    SELECT id, TRUE AS updated FROM updated
+    UNION ALL
+    -- Same snapshot as the update: these rows were held by someone else's lease
+    SELECT p.id, FALSE FROM "Product" AS p JOIN v ON p.id = v.id
+    WHERE p."leaseOwner" IS NOT NULL AND p."leaseOwner" IS DISTINCT FROM v.worker_id ${ownerFilter}
+  `
+  return {
+    updated: outcome.filter(o => o.updated).map(o => o.id),
+    leaseConflicts: outcome.filter(o => !o.updated).map(o => o.id),
+  }
+}
@@ -0,0 +1,181 @@
+import { Prisma } from '@prisma/client'
+import { prisma } from './prisma'
+
+export type Bucket = 'hour' | 'day' | 'week'
+
+export interface StatSampleInput {
+  productId: string
+  views: number
+  saves: number
+}
+
+export interface RetentionPolicy {
+  rawDays: number      // keep every sample this long
+  hourlyDays: number   // then one sample per product per hour
+  retentionDays: number // then one per product per day, deleted after this
+}
+
+export const DEFAULT_RETENTION: RetentionPolicy = {
+  rawDays: 7,
+  hourlyDays: 90,
+  retentionDays: 730,
+}
+
+const BUCKETS: Bucket[] = ['hour', 'day', 'week']
+
+export function parseBucket(value: string | null): Bucket {
+  return BUCKETS.includes(value as Bucket) ? (value as Bucket) : 'day'
+}
+
+// Inlined (not bound) so DISTINCT ON / GROUP BY see identical expressions; only whitelisted values reach here
+function truncUnit(bucket: Bucket) {
+  return Prisma.raw(`'${bucket}'`)
+}
+
+/**
+ * Append samples for products whose stats were just refreshed
+ */
+export async function recordStatSamples(samples: StatSampleInput[]): Promise<number> {
+  if (samples.length === 0) return 0
+  const sampledAt = new Date()
+  const result = await prisma.productStatSample.createMany({
+    data: samples.map(s => ({
+      productId: s.productId,
+      sampledAt,
+      views: s.views,
+      saves: s.saves,
+    })),
+    skipDuplicates: true,
+  })
+  return result.count
+}
+
+/**
+ * Collapse old samples into one per bucket and drop samples past retention.
+ * views/saves are cumulative counters, so keeping the last sample of each
+ * bucket loses nothing at that bucket's resolution.
+ */
+export async function downsampleStatSamples(policy: RetentionPolicy = DEFAULT_RETENTION) {
+  const day = 24 * 60 * 60 * 1000
+  const now = Date.now()
+  const rawCutoff = new Date(now - policy.rawDays * day)
+  const hourlyCutoff = new Date(now - policy.hourlyDays * day)
+  const retentionCutoff = new Date(now - policy.retentionDays * day)
+
+  const collapse = (bucket: 'hour' | 'day', from: Date, to: Date) => {
+    const unit = truncUnit(bucket)
+    return prisma.$executeRaw`
+      DELETE FROM "ProductStatSample" AS s
+      USING (
+        SELECT "productId", date_trunc(${unit}, "sampledAt") AS bucket, MAX("sampledAt") AS keep
+        FROM "ProductStatSample"
+        WHERE "sampledAt" >= ${from} AND "sampledAt" < ${to}
+        GROUP BY 1, 2
+      ) AS k
+      WHERE s."productId" = k."productId"
+        AND s."sampledAt" >= ${from} AND s."sampledAt" < ${to}
+        AND date_trunc(${unit}, s."sampledAt") = k.bucket
+        AND s."sampledAt" < k.keep
+    `
+  }
+
+  const hourly = await collapse('hour', hourlyCutoff, rawCutoff)
+  const daily = await collapse('day', retentionCutoff, hourlyCutoff)
+  const expired = await prisma.$executeRaw`
+    DELETE FROM "ProductStatSample" WHERE "sampledAt" < ${retentionCutoff}
+  `
+
+  return { hourly, daily, expired }
+}
+
+/**
+ * Per-ad history: last sample per bucket plus the gain since the previous bucket
+ */
+export async function getAdVelocity(productId: string, days: number, bucket: Bucket) {
+  const since = new Date(Date.now() - days * 24 * 60 * 60 * 1000)
+  const unit = truncUnit(bucket)
+  const series = await prisma.$queryRaw<{
+    bucket: Date
+    views: number
+    saves: number
+    views_gained: number | null
+    saves_gained: number | null
+  }[]>`
+    SELECT bucket, views, saves,
+           views - LAG(views) OVER (ORDER BY bucket) AS views_gained,
+           saves - LAG(saves) OVER (ORDER BY bucket) AS saves_gained
+    FROM (
+      SELECT DISTINCT ON (date_trunc(${unit}, "sampledAt"))
+             date_trunc(${unit}, "sampledAt") AS bucket, views, saves
+      FROM "ProductStatSample"
+      WHERE "productId" = ${productId} AND "sampledAt" >= ${since}
+      ORDER BY date_trunc(${unit}, "sampledAt"), "sampledAt" DESC
+    ) AS b
+    ORDER BY bucket
+  `
+
+  let viewsPerDay = 0
+  let savesPerDay = 0
+  if (series.length > 1) {
+    const first = series[0]
+    const last = series[series.length - 1]
+    const elapsedDays = (last.bucket.getTime() - first.bucket.getTime()) / (24 * 60 * 60 * 1000)
+    if (elapsedDays > 0) {
+      viewsPerDay = (last.views - first.views) / elapsedDays
+      savesPerDay = (last.saves - first.saves) / elapsedDays
+    }
+  }
+
+  return { productId, bucket, days, viewsPerDay, savesPerDay, series }
+}
+
+/**
+ * Per-category velocity: views/saves gained per day for each ad in the window, aggregated
+ */
+export async function getCategoryVelocity(categoryId: string, days: number, userId?: string | null) {
+  const since = new Date(Date.now() - days * 24 * 60 * 60 * 1000)
+  const ownerFilter = userId ? Prisma.sql`AND p."userId" = ${userId}` : Prisma.empty
+
+  const ads = await prisma.$queryRaw<{
+    product_id: string
+    title: string
+    views_per_day: number
+    saves_per_day: number
+  }[]>`
+    SELECT p.id AS product_id, p.title,
+           (w.last_views - w.first_views) / GREATEST(w.elapsed_days, 1.0 / 24) AS views_per_day,
+           (w.last_saves - w.first_saves) / GREATEST(w.elapsed_days, 1.0 / 24) AS saves_per_day
+    FROM "Product" AS p
+    JOIN LATERAL (
+      SELECT (array_agg(s.views ORDER BY s."sampledAt"))[1] AS first_views,
+             (array_agg(s.views ORDER BY s."sampledAt" DESC))[1] AS last_views,
+             (array_agg(s.saves ORDER BY s."sampledAt"))[1] AS first_saves,
+             (array_agg(s.saves ORDER BY s."sampledAt" DESC))[1] AS last_saves,
+             EXTRACT(EPOCH FROM MAX(s."sampledAt") - MIN(s."sampledAt")) / 86400.0 AS elapsed_days
+      FROM "ProductStatSample" AS s
+      WHERE s."productId" = p.id AND s."sampledAt" >= ${since}
+      HAVING COUNT(*) > 1
+    ) AS w ON TRUE
+    WHERE p."categoryId" = ${categoryId} ${ownerFilter}
+    ORDER BY views_per_day DESC
+  `
+
+  const rows = ads.map(a => ({
+    productId: a.product_id,
+    title: a.title,
+    viewsPerDay: Number(a.views_per_day),
+    savesPerDay: Number(a.saves_per_day),
+  }))
+  const total = rows.reduce(
+    (acc, r) => ({ views: acc.views + r.viewsPerDay, saves: acc.saves + r.savesPerDay }),
+    { views: 0, saves: 0 }
+  )
+
+  return {
+    categoryId,
+    days,
+    ads: rows,
+    avgViewsPerDay: rows.length ? total.views / rows.length : 0,
+    avgSavesPerDay: rows.length ? total.saves / rows.length : 0,
+  }
+}
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Langlopende worker voor de plaatsingswachtrij (PostJob).
+Start één browser, logt één keer in en verwerkt daarna jobs die via
+POST /api/products/<id>/post in de wachtrij zijn gezet. Er wordt dus geen
+Python proces of browser meer per plaatsing opgestart. Met een opgeslagen
+storage_state krijgt elke lane een eigen context op diezelfde browser.
+
+Gebruik:
+    python job_worker.py
+    python job_worker.py --concurrency 2 --poll-interval 5
+    python job_worker.py --once    # stop zodra de wachtrij leeg is
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add parent scripts directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+scripts_dir = os.path.join(parent_dir, 'scripts')
+sys.path.insert(0, scripts_dir)
+
+from playwright.async_api import async_playwright
+
+from api_client import AsyncApiClient, resolve_api_base_url
+from browser_session import save_storage_state, uses_storage_state
+from browser_watchdog import BrowserWatchdog
+from post_ads import (
+    ensure_logged_in, failed_item_result, launch_browser, new_worker_page, post_product,
+)
+from preflight import preflight_item
+from rate_limiter import get_limiter
+from stats_queue import DeferredStats
+
+
+def log(message: str, level: str = "INFO"):
+    """Log message with timestamp."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+def load_environment():
+    # Same lookup order as post_pending_local.py; existing environment variables win
+    preserved = {key: os.environ[key] for key in ('API_BASE_URL', 'INTERNAL_API_KEY') if key in os.environ}
+    for env_path in (
+        os.path.join(os.path.dirname(__file__), '.env'),
+        os.path.join(parent_dir, '.env.local'),
+        os.path.join(parent_dir, '.env'),
+    ):
+        if os.path.exists(env_path):
+            load_dotenv(env_path, override=True)
+            log(f"Loaded environment from: {env_path}")
+            break
+    os.environ.update(preserved)
+
+
+async def sleep_unless_stopped(stop: asyncio.Event, seconds: float):
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def lane(index: int, browser, limiter, api, args, worker_id: str, stop: asyncio.Event, stats: dict, reopen=None, user_data_dir=None):
+    """
+    One tab that claims and posts jobs one at a time until stopped. With reopen the lane
+    owns its context and the watchdog may replace it; otherwise only its page is recycled.
+    """
+    base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+    media_root = os.getenv('MEDIA_ROOT', os.path.join(parent_dir, 'public', 'media'))
+    action_delay_ms = int(os.getenv('ACTION_DELAY_MS', '200'))
+    page = await new_worker_page(browser)
+    name = f"lane {index}"
+
+    # Jobs are completed right after publishing; an ad id that publishing did not yield
+    # is scraped on a second tab and sent afterwards as a product update
+    deferred_products = {}
+
+    async def send_deferred(result):
+        product_id = deferred_products.pop(result.get('article_number'), None)
+        if product_id and result.get('ad_id'):
+            update = {'productId': product_id, **{k: result.get(k) for k in ('status', 'ad_url', 'ad_id', 'views', 'saves', 'posted_at')}}
+            await api.send_batch_updates([update])
+            log(f"[{name}] Ad id nagestuurd: {result.get('ad_id')} ({result.get('title')})")
+
+    watchdog = BrowserWatchdog(browser, page, new_worker_page, reopen, user_data_dir, label=name)
+    ad_stats = DeferredStats(lambda: new_worker_page(watchdog.context), limiter, on_done=send_deferred)
+
+    try:
+        while not stop.is_set():
+            try:
+                data = await api.post_json('/api/jobs/claim', {'workerId': worker_id, 'limit': 1})
+            except Exception as e:
+                log(f"[{name}] Jobs ophalen mislukt: {e}", "WARNING")
+                await sleep_unless_stopped(stop, args.poll_interval)
+                continue
+
+            jobs = data.get('jobs') or []
+            if not jobs:
+                if args.once:
+                    break
+                await sleep_unless_stopped(stop, args.poll_interval)
+                continue
+
+            for job in jobs:
+                # Pre-flight: unpostable products fail without touching the page
+                product, issues = preflight_item(job['product'], media_root)
+                errors = '; '.join(issue.message for issue in issues if issue.fatal)
+                if product is None or errors:
+                    log(f"[{name}] Job {job['id']} afgekeurd door de pre-flight: {errors}", "ERROR")
+                    result = failed_item_result(job['product'], f"Pre-flight: {errors}")
+                else:
+                    log(f"[{name}] Job {job['id']} (poging {job.get('attempts', 1)}): {product.title}")
+                    result = await post_product(page, product, base_url, media_root, limiter, ad_stats)
+                    if result.get('ad_url') and not result.get('ad_id'):
+                        deferred_products[product.article_number] = job['product'].get('id')
+                    page = await watchdog.after_ad(ad_stats.drain)
+                stats[result.get('status', 'failed')] = stats.get(result.get('status', 'failed'), 0) + 1
+                try:
+                    await api.post_json(
+                        f"/api/jobs/{job['id']}/complete",
+                        {'workerId': worker_id, 'result': result},
+                    )
+                    log(f"[{name}] Job {job['id']} afgerond: {result.get('status')} {result.get('ad_url') or result.get('error') or ''}")
+                except Exception as e:
+                    # The server re-queues the job once it goes stale
+                    log(f"[{name}] Resultaat van job {job['id']} niet opgeslagen: {e}", "ERROR")
+                if not limiter.enabled:
+                    await page.wait_for_timeout(action_delay_ms)
+    finally:
+        await ad_stats.drain()
+        await watchdog.page.close()
+        if watchdog.ads:
+            log(f"[{name}] Geheugen en recycling: {watchdog.snapshot()}")
+        # A context the watchdog opened is not known to main()
+        if watchdog.context is not browser:
+            await watchdog.context.close()
+
+
+async def main(args):
+    load_environment()
+    base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+    user_data_dir = os.getenv('USER_DATA_DIR', os.path.join(os.path.expanduser('~'), '.marktplaats_browser'))
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    log("=" * 70)
+    log("Marktplaats job worker")
+    log("=" * 70)
+    log(f"Worker ID: {worker_id}")
+    log(f"API Base URL: {resolve_api_base_url()}")
+    log(f"Parallelle tabs: {args.concurrency}")
+
+    stop = asyncio.Event()
+    stats: dict = {}
+    # All lanes post through one account, so they share its limiter
+    limiter = get_limiter(os.path.abspath(user_data_dir))
+    # One pooled API client for all lanes; its calls run off the event loop
+    api = AsyncApiClient(timeout=30)
+    async with async_playwright() as p:
+        browser = await launch_browser(p, user_data_dir)
+        contexts = [browser]
+        try:
+            # Log in once and save the session; the other lanes start from it
+            login_page = await new_worker_page(browser)
+            await ensure_logged_in(login_page, base_url, user_data_dir)
+            await save_storage_state(browser, user_data_dir)
+            await login_page.close()
+
+            # A fresh context per lane is cheap on the shared browser; a persistent
+            # profile can only be opened once, so then the lanes share it
+            own_contexts = uses_storage_state(user_data_dir)
+            for _ in range(1, args.concurrency):
+                contexts.append(await launch_browser(p, user_data_dir) if own_contexts else browser)
+            reopen = (lambda: launch_browser(p, user_data_dir)) if own_contexts else None
+
+            lanes = [
+                asyncio.create_task(lane(i + 1, contexts[i], limiter, api, args, worker_id, stop, stats, reopen, user_data_dir))
+                for i in range(args.concurrency)
+            ]
+            try:
+                await asyncio.gather(*lanes)
+            except asyncio.CancelledError:
+                stop.set()
+                await asyncio.gather(*lanes, return_exceptions=True)
+                raise
+        finally:
+            for context in {id(c): c for c in contexts}.values():
+                await context.close()
+            await api.aclose()
+
+    log(f"Worker gestopt. Resultaten: {stats or 'geen jobs verwerkt'}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verwerk de Marktplaats plaatsingswachtrij met een blijvende browser")
+    parser.add_argument("--concurrency", type=int, default=1, help="Aantal parallelle tabs (default 1)")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconden wachten als de wachtrij leeg is")
+    parser.add_argument("--worker-id", type=str, default=None, help="Naam van deze worker (default host-pid)")
+    parser.add_argument("--once", action="store_true", help="Stop zodra er geen jobs meer zijn")
+    args = parser.parse_args()
+    args.concurrency = max(1, args.concurrency)
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        log("Gestopt door gebruiker")
@@ -5,10 +5,23 @@ Dit script draait op je Mac en gebruikt de lokale API of productie API.
 
 Gebruik:
     python post_pending_local.py
+    python post_pending_local.py --daemon   # blijf draaien en plaats nieuwe producten direct
     
 Of met custom API URL:
     API_BASE_URL=https://marktplaats-eight.vercel.app python post_pending_local.py
+
+Producten worden per ronde geclaimd (CLAIM_BATCH_SIZE, default 10) met een lease
+(LEASE_SECONDS, default 900), zodat meerdere workers tegelijk kunnen draaien
+zonder dubbel te plaatsen.
+
+Met MP_ACCOUNTS_FILE worden de producten over meerdere Marktplaats accounts
+verdeeld (MP_ACCOUNT_POLICY=owner|round_robin|least_loaded), elk met een eigen
+browserprofiel en dagbudget; zie scripts/accounts.py.
+
+In --daemon modus blijven de browsers open en wacht de worker via long-polling
+op /api/products/pending/changes tot er nieuwe pending producten zijn.
 """
+import argparse
 import asyncio
 import os
 import sys
@@ -21,14 +34,243 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 scripts_dir = os.path.join(parent_dir, 'scripts')
 sys.path.insert(0, scripts_dir)
 
-from post_ads import run
+from playwright.async_api import async_playwright
+
+from accounts import AccountPool, load_accounts
+from api_client import AsyncApiClient, ProductLeaseClient
+from browser_session import save_storage_state
+from browser_watchdog import BrowserWatchdog
+from post_ads import (
+    ensure_logged_in, failed_item_result, launch_browser, new_worker_page, post_product, product_from_api_item,
+)
+from preflight import preflight_item
+from product_model import ProductParseError
+from rate_limiter import get_limiter
+from stats_queue import DeferredStats
+
+RETRY_DELAY_S = 10
 
 def log(message: str, level: str = "INFO"):
     """Log message with timestamp."""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[{timestamp}] [{level}] {message}")
 
-async def main():
+class AccountBrowser:
+    """
+    Logged-in browser context for one account; opened on first use and kept warm.
+    With a saved storage_state all accounts share one browser process, each in its own context.
+    """
+
+    def __init__(self, playwright, account, base_url: str, media_root: str):
+        self.playwright = playwright
+        self.account = account
+        self.base_url = base_url
+        self.media_root = media_root
+        self.limiter = get_limiter(os.path.abspath(account.user_data_dir))
+        self.action_delay_ms = int(os.getenv('ACTION_DELAY_MS', '200'))
+        self.browser = None
+        self.page = None
+        self.watchdog = None
+
+    async def ensure_open(self):
+        if self.page is not None and not self.page.is_closed():
+            return self.page
+        if self.browser is None:
+            log(f"[{self.account.name}] Browser starten ({self.account.user_data_dir})")
+            self.browser = await launch_browser(self.playwright, self.account.user_data_dir)
+        self.page = await new_worker_page(self.browser)
+        # Kept across rounds, so a daemon recycles its page/context as ads add up
+        if self.watchdog is None:
+            self.watchdog = BrowserWatchdog(
+                self.browser, self.page, new_worker_page,
+                lambda: launch_browser(self.playwright, self.account.user_data_dir),
+                self.account.user_data_dir, label=self.account.name,
+            )
+        self.watchdog.page = self.page
+        await ensure_logged_in(self.page, self.base_url, self.account.user_data_dir)
+        await save_storage_state(self.browser, self.account.user_data_dir)
+        return self.page
+
+    async def post(self, items):
+        """Post this account's share of the claimed products; one result per item, in order."""
+        try:
+            page = await self.ensure_open()
+        except Exception as e:
+            # Leases of this lane are released at the end of the round
+            log(f"❌ [{self.account.name}] Browser fout: {e}", "ERROR")
+            await self.close()
+            return self.account.name, items, []
+        # Missing ad ids are scraped on a second tab while this lane keeps posting;
+        # the results are complete once the queue is drained, before they are reported
+        stats = DeferredStats(lambda: new_worker_page(self.browser), self.limiter)
+        results = []
+        try:
+            for item in items:
+                try:
+                    product = product_from_api_item(item)
+                except ProductParseError as e:
+                    log(f"❌ [{self.account.name}] Ongeldig product {item.get('id')}: {e}", "ERROR")
+                    results.append(failed_item_result(item, f"Ongeldig product: {e}"))
+                    continue
+                log(f"[{self.account.name}] Plaatsen: {product.title}")
+                results.append(await post_product(page, product, self.base_url, self.media_root, self.limiter, stats))
+                if not self.limiter.enabled:
+                    await page.wait_for_timeout(self.action_delay_ms)
+                page = self.page = await self.watchdog.after_ad(stats.drain)
+                self.browser = self.watchdog.context
+        finally:
+            await stats.drain()
+        return self.account.name, items, results
+
+    async def close(self):
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.page = None
+        self.watchdog = None
+
+
+def preflight_failures(pending_products, media_root: str):
+    """Split the claimed batch into postable items and failed updates for the rest (no browser needed)."""
+    postable = []
+    updates = []
+    for item in pending_products:
+        product, issues = preflight_item(item, media_root)
+        errors = [issue.message for issue in issues if issue.fatal]
+        if product is not None and not errors:
+            postable.append(item)
+            continue
+        log(f"❌ Pre-flight afgekeurd: {item.get('title', 'Product')}: {'; '.join(errors)}", "ERROR")
+        updates.append({
+            'productId': item.get('id'),
+            'status': 'failed',
+            'ad_url': None,
+            'ad_id': None,
+            'views': 0,
+            'saves': 0,
+            'posted_at': None,
+        })
+    return postable, updates
+
+
+async def post_round(client, leases, pool, browsers, claim_limit: int, media_root: str):
+    """
+    Claim one batch, post it across the account lanes and report the results.
+    Returns (completed, failed), or None when there was nothing to claim or post.
+    """
+    # Never claim more than the accounts may still post today
+    budget = min(claim_limit, pool.remaining)
+    if budget == 0:
+        log("⚠️  Dagbudget van alle accounts is op", "WARNING")
+        return None
+    
+    # Lease a batch; other workers skip these until they are reported or the lease expires
+    pending_products = await client.call(leases.claim, budget)
+    if not pending_products:
+        return None
+    
+    log(f"✅ {len(pending_products)} pending product(en) geclaimd")
+    log("")
+    
+    # Show products
+    for i, product in enumerate(pending_products, 1):
+        log(f"   {i}. {product.get('title', 'Geen titel')} (#{product.get('article_number', 'N/A')})")
+    log("")
+    
+    # Products that can never be posted are failed here, before they take an account's budget
+    pending_products, rejected = preflight_failures(pending_products, media_root)
+    if rejected:
+        log(f"⚠️  {len(rejected)} product(en) afgekeurd door de pre-flight", "WARNING")
+    
+    assignments, unassigned = pool.assign(pending_products)
+    if unassigned:
+        log(f"⚠️  {len(unassigned)} product(en) zonder beschikbaar account, terug naar pending", "WARNING")
+    if not assignments and not rejected:
+        await client.call(leases.release)
+        return None
+    
+    log("Starten met plaatsen op Marktplaats...")
+    for name, items in assignments.items():
+        log(f"   {name}: {len(items)} product(en)")
+    log("")
+    
+    # One lane (own browser profile) per account, all accounts in parallel,
+    # while the heartbeat keeps the leases alive
+    with leases.heartbeat():
+        lanes = await asyncio.gather(*(
+            browsers[name].post(items)
+            for name, items in assignments.items()
+        ))
+    
+    updates = list(rejected)
+    for name, items, results in lanes:
+        completed = 0
+        for product, result in zip(items, results):
+            status = 'completed' if result.get('ad_url') else 'failed'
+            completed += status == 'completed'
+            updates.append({
+                'productId': product.get('id'),
+                'status': status,
+                'ad_url': result.get('ad_url'),
+                'ad_id': result.get('ad_id'),
+                'views': result.get('views', 0),
+                'saves': result.get('saves', 0),
+                'posted_at': result.get('posted_at'),
+            })
+            
+            # Log result
+            if result.get('ad_url'):
+                log(f"✅ [{name}] {result.get('title', 'Product')}: Geplaatst")
+                log(f"   URL: {result.get('ad_url')}")
+            else:
+                log(f"❌ [{name}] {result.get('title', 'Product')}: Mislukt")
+                if result.get('error'):
+                    log(f"   Fout: {result.get('error')}")
+        pool.complete(name, len(items), completed)
+    
+    # Anything claimed but not posted goes straight back to pending
+    if not updates:
+        log("⚠️  Geen resultaten van plaatsing", "WARNING")
+        await client.call(leases.release)
+        return None
+    
+    log("")
+    log(f"✅ {len(updates)} product(en) verwerkt")
+    
+    # Send batch update (this also ends the leases). If it fails the leases stay
+    # held and expire back to pending rather than being lost.
+    log("")
+    log(f"Bijwerken van {len(updates)} product(en) in database...")
+    results = await client.send_batch_updates(updates, leases.worker_id)
+    leases.finished(u['productId'] for u in updates)
+    # A lease that expired and was claimed by another worker keeps that worker's result
+    lost = [r['productId'] for r in results if r.get('error') == 'Lease held by another worker']
+    if lost:
+        log(f"⚠️  {len(lost)} product(en) niet bijgewerkt, lease verlopen en door een andere worker geclaimd: {', '.join(map(str, lost))}", "WARNING")
+    await client.call(leases.release)
+    completed = sum(1 for u in updates if u.get('status') == 'completed')
+    failed = len(updates) - completed
+    log("")
+    log(f"✅ {len(updates)} product(en) bijgewerkt in database")
+    log(f"   Geplaatst: {completed}")
+    log(f"   Mislukt: {failed}")
+    log("")
+    return completed, failed
+
+
+async def wait_for_pending(client, cursor, timeout: int):
+    """Long-poll until the set of pending products changes; returns the new cursor."""
+    data = await client.get_json(
+        '/api/products/pending/changes',
+        {'since': cursor, 'timeout': timeout} if cursor else {'timeout': 0},
+    )
+    return data.get('cursor'), data.get('changed', False), data.get('pending', 0)
+
+
+async def main(daemon: bool = False):
     """Main function to process pending products."""
     # Save environment variables before loading .env (they take priority)
     env_api_url = os.environ.get('API_BASE_URL')
@@ -82,196 +324,104 @@ async def main():
     log("=" * 70)
     log("")
     
-    # Use the pending products endpoint
-    api_url = f"{base_url}/api/products/pending"
-    
-    # Headers with API key
-    headers = {
-        'x-api-key': api_key,
-        'Content-Type': 'application/json'
-    }
+    claim_limit = int(os.getenv('CLAIM_BATCH_SIZE', '10'))
+    lease_seconds = int(os.getenv('LEASE_SECONDS', '900'))
+    poll_timeout = int(os.getenv('LONG_POLL_TIMEOUT', '25'))
+    # Long-poll requests must outlive the server-side wait. All API calls run on the
+    # client's thread pool, so they never stall the account lanes' browsers
+    client = AsyncApiClient(base_url, api_key, timeout=max(30, poll_timeout + 10))
+    leases = ProductLeaseClient(client.sync, lease_seconds=lease_seconds)
     
-    # Query parameter as backup
-    api_url_with_key = f"{api_url}?api_key={api_key}"
+    policy = os.getenv('MP_ACCOUNT_POLICY', 'least_loaded')
+    pool = AccountPool(load_accounts(default_user_data_dir=os.getenv('USER_DATA_DIR')), policy)
     
-    log(f"Ophalen pending producten van: {api_url}")
+    log(f"Worker ID: {leases.worker_id}")
+    log(f"Claimen per ronde: {claim_limit} product(en), lease {lease_seconds}s")
+    log(f"Accounts ({policy}): " + ", ".join(f"{a.name} ({a.remaining} over vandaag)" for a in pool.accounts))
+    if daemon:
+        log("Daemon modus: browsers blijven open, wachten op nieuwe producten via long-polling")
     log("")
     
-    try:
-        # Fetch pending products
-        response = requests.get(
-            api_url_with_key,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 401:
-            error_data = response.json() if response.content else {}
-            error_msg = error_data.get('error', 'Unauthorized')
-            hint = error_data.get('hint', '')
-            log(f"❌ Authenticatie fout: {error_msg}", "ERROR")
-            if hint:
-                log(f"   Hint: {hint}", "ERROR")
-            log("")
-            log("Controleer:")
-            log("   1. Of INTERNAL_API_KEY overeenkomt met de API key in je .env")
-            log("   2. Of de API_BASE_URL correct is ingesteld")
-            log("   3. Of de API server draait (localhost:3000 of productie URL)")
-            return
-        
-        if response.status_code != 200:
-            log(f"❌ Fout bij ophalen producten: {response.status_code}", "ERROR")
-            log(f"   Response: {response.text[:200]}", "ERROR")
-            return
-        
-        # Parse response
-        response_data = response.json()
-        
-        # Check if response is array (products) or object (with debug info)
-        if isinstance(response_data, dict) and 'products' in response_data:
-            # Response contains debug info
-            pending_products = response_data.get('products', [])
-            debug_info = response_data.get('debug', {})
+    total_completed = 0
+    total_failed = 0
+    cursor = None
+    async with async_playwright() as p:
+        marktplaats_base = marktplaats_url.rstrip('/')
+        browsers = {a.name: AccountBrowser(p, a, marktplaats_base, media_root) for a in pool.accounts}
+        try:
+            while True:
+                try:
+                    outcome = await post_round(client, leases, pool, browsers, claim_limit, media_root)
+                    if outcome:
+                        total_completed += outcome[0]
+                        total_failed += outcome[1]
+                        # There may be more waiting; claim again straight away
+                        continue
+                    if not daemon:
+                        if total_completed + total_failed == 0:
+                            log("✅ Geen pending producten gevonden. Alles is up-to-date!")
+                        break
+                    
+                    # Nothing claimable (or no budget left): wait for the pending set to change
+                    pool.refresh()
+                    cursor, changed, pending = await wait_for_pending(client, cursor, poll_timeout)
+                    if changed:
+                        log(f"🔔 Wijziging in pending producten ({pending} pending)")
+                except requests.exceptions.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 401:
+                        log("❌ Authenticatie fout: Unauthorized", "ERROR")
+                        log("")
+                        log("Controleer:")
+                        log("   1. Of INTERNAL_API_KEY overeenkomt met de API key in je .env")
+                        log("   2. Of de API_BASE_URL correct is ingesteld")
+                        log("   3. Of de API server draait (localhost:3000 of productie URL)")
+                        return
+                    if not daemon:
+                        raise
+                    log(f"⚠️  API fout: {e}, opnieuw proberen over {RETRY_DELAY_S}s", "WARNING")
+                    await asyncio.sleep(RETRY_DELAY_S)
+                except requests.exceptions.RequestException as e:
+                    if not daemon:
+                        raise
+                    log(f"⚠️  Netwerk fout: {e}, opnieuw proberen over {RETRY_DELAY_S}s", "WARNING")
+                    await asyncio.sleep(RETRY_DELAY_S)
             
-            if len(pending_products) == 0:
-                log("⚠️  Geen pending producten gevonden, maar debug info beschikbaar:", "WARNING")
-                log("")
-                log(f"   Totaal producten in database: {debug_info.get('totalInDb', 'N/A')}")
-                log(f"   Unieke statussen: {debug_info.get('uniqueStatuses', [])}")
-                log(f"   Aantal gebruikers: {debug_info.get('uniqueUserIds', 'N/A')}")
-                log("")
-                if debug_info.get('sampleProducts'):
-                    log("   Voorbeeld producten:")
-                    for p in debug_info.get('sampleProducts', [])[:5]:
-                        log(f"      - {p.get('title', 'N/A')} (status: {p.get('status', 'N/A')})")
-                log("")
-                log("💡 Mogelijke oorzaken:")
-                log("   1. Producten hebben een andere status dan 'pending'")
-                log("   2. Producten zijn van een andere gebruiker")
-                log("   3. Database is leeg")
-                return
-        else:
-            # Response is array of products
-            pending_products = response_data if isinstance(response_data, list) else []
-        
-        if not pending_products or len(pending_products) == 0:
-            log("✅ Geen pending producten gevonden. Alles is up-to-date!")
-            return
-        
-        log(f"✅ Gevonden {len(pending_products)} pending product(en)")
-        log("")
-        
-        # Show products
-        for i, product in enumerate(pending_products, 1):
-            log(f"   {i}. {product.get('title', 'Geen titel')} (#{product.get('article_number', 'N/A')})")
-        log("")
-        
-        log("Starten met plaatsen op Marktplaats...")
-        log("")
-        
-        # Process all pending products
-        results = await run(
-            csv_path=None,
-            api_url=api_url_with_key,
-            product_id=None,  # None means batch mode
-            login_only=False,
-            keep_open=False
-        )
-        
-        if not results or len(results) == 0:
-            log("⚠️  Geen resultaten van plaatsing", "WARNING")
-            return
-        
-        log("")
-        log(f"✅ {len(results)} product(en) verwerkt")
-        log("")
-        
-        # Update products via batch endpoint
-        update_url = f"{base_url}/api/products/batch-update"
-        updates = []
-        
-        for result in results:
-            # Match result to product by article_number or title
-            matching_product = None
-            for product in pending_products:
-                # Match by article number (most reliable)
-                if (result.get('article_number') and 
-                    product.get('article_number') == result.get('article_number')):
-                    matching_product = product
-                    break
-                # Match by title
-                elif (result.get('title') and 
-                      product.get('title') == result.get('title')):
-                    matching_product = product
-                    break
+            log("")
+            log("=" * 70)
+            log(f"✅ Klaar! Geplaatst: {total_completed}, mislukt: {total_failed}")
+            log("=" * 70)
             
-            if matching_product:
-                status = 'completed' if result.get('ad_url') else 'failed'
-                updates.append({
-                    'productId': matching_product.get('id'),
-                    'status': status,
-                    'ad_url': result.get('ad_url'),
-                    'ad_id': result.get('ad_id'),
-                    'views': result.get('views', 0),
-                    'saves': result.get('saves', 0),
-                    'posted_at': result.get('posted_at'),
-                })
-                
-                # Log result
-                if result.get('ad_url'):
-                    log(f"✅ {result.get('title', 'Product')}: Geplaatst")
-                    log(f"   URL: {result.get('ad_url')}")
-                else:
-                    log(f"❌ {result.get('title', 'Product')}: Mislukt")
-                    if result.get('error'):
-                        log(f"   Fout: {result.get('error')}")
-        
-        # Send batch update
-        if updates:
+        except requests.exceptions.RequestException as e:
+            log(f"❌ Netwerk fout: {e}", "ERROR")
             log("")
-            log(f"Bijwerken van {len(updates)} product(en) in database...")
+            log("Controleer:")
+            log("   1. Of de API server draait")
+            log("   2. Of de API_BASE_URL correct is")
+            log("   3. Of je internet verbinding werkt")
+        except Exception as e:
+            log(f"❌ Onverwachte fout: {e}", "ERROR")
+            import traceback
+            log(traceback.format_exc(), "ERROR")
+        finally:
             try:
-                update_response = requests.post(
-                    update_url,
-                    json={'updates': updates},
-                    headers=headers,
-                    timeout=30
-                )
-                if update_response.ok:
-                    completed = sum(1 for u in updates if u.get('status') == 'completed')
-                    failed = sum(1 for u in updates if u.get('status') == 'failed')
-                    log("")
-                    log(f"✅ {len(updates)} product(en) bijgewerkt in database")
-                    log(f"   Geplaatst: {completed}")
-                    log(f"   Mislukt: {failed}")
-                else:
-                    log(f"⚠️  Fout bij bijwerken producten: {update_response.status_code}", "WARNING")
-                    log(f"   Response: {update_response.text[:200]}", "WARNING")
-            except Exception as e:
-                log(f"⚠️  Fout bij bijwerken producten: {e}", "WARNING")
-        else:
-            log("⚠️  Geen producten gevonden om bij te werken", "WARNING")
-        
-        log("")
-        log("=" * 70)
-        log("✅ Klaar!")
-        log("=" * 70)
-        
-    except requests.exceptions.RequestException as e:
-        log(f"❌ Netwerk fout: {e}", "ERROR")
-        log("")
-        log("Controleer:")
-        log("   1. Of de API server draait")
-        log("   2. Of de API_BASE_URL correct is")
-        log("   3. Of je internet verbinding werkt")
-    except Exception as e:
-        log(f"❌ Onverwachte fout: {e}", "ERROR")
-        import traceback
-        log(traceback.format_exc(), "ERROR")
+                released = await client.call(leases.release)
+                if released:
+                    log(f"{released} niet verwerkte product(en) teruggezet naar pending")
+            except Exception:
+                pass
+            for account_browser in browsers.values():
+                await account_browser.close()
+            await client.aclose()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Plaats pending producten op Marktplaats")
+    parser.add_argument("--daemon", action="store_true", help="Blijf draaien en plaats nieuwe pending producten direct")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(daemon=args.daemon))
     except KeyboardInterrupt:
         log("")
         log("⚠️  Gestopt door gebruiker", "WARNING")
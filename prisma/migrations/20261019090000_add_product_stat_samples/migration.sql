@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "ProductStatSample" (
+    "productId" TEXT NOT NULL,
+    "sampledAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "views" INTEGER NOT NULL,
+    "saves" INTEGER NOT NULL,
+
+    CONSTRAINT "ProductStatSample_pkey" PRIMARY KEY ("productId","sampledAt")
+);
+
+-- CreateIndex
+CREATE INDEX "ProductStatSample_sampledAt_idx" ON "ProductStatSample" USING BRIN ("sampledAt");
+
+-- AddForeignKey
+ALTER TABLE "ProductStatSample" ADD CONSTRAINT "ProductStatSample_productId_fkey" FOREIGN KEY ("productId") REFERENCES "Product"("id") ON DELETE CASCADE ON UPDATE CASCADE;
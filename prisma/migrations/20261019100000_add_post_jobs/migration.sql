@@ -0,0 +1,24 @@
+-- CreateTable
+CREATE TABLE "PostJob" (
+    "id" TEXT NOT NULL,
+    "productId" TEXT NOT NULL,
+    "status" TEXT NOT NULL DEFAULT 'queued',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "workerId" TEXT,
+    "result" JSONB,
+    "error" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "startedAt" TIMESTAMP(3),
+    "finishedAt" TIMESTAMP(3),
+
+    CONSTRAINT "PostJob_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "PostJob_status_createdAt_idx" ON "PostJob"("status", "createdAt");
+
+-- CreateIndex
+CREATE INDEX "PostJob_productId_idx" ON "PostJob"("productId");
+
+-- AddForeignKey
+ALTER TABLE "PostJob" ADD CONSTRAINT "PostJob_productId_fkey" FOREIGN KEY ("productId") REFERENCES "Product"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,6 @@
+-- AlterTable
+ALTER TABLE "Product" ADD COLUMN     "leaseExpiresAt" TIMESTAMP(3),
+ADD COLUMN     "leaseOwner" TEXT;
+
+-- CreateIndex
+CREATE INDEX "Product_status_leaseExpiresAt_idx" ON "Product"("status", "leaseExpiresAt");
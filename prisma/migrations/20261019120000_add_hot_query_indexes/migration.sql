@@ -0,0 +1,20 @@
+-- CreateIndex
+CREATE INDEX "Category_path_idx" ON "Category"("path");
+
+-- CreateIndex
+CREATE INDEX "Category_parentId_idx" ON "Category"("parentId");
+
+-- CreateIndex
+CREATE INDEX "Product_status_createdAt_idx" ON "Product"("status", "createdAt");
+
+-- CreateIndex
+CREATE INDEX "Product_userId_status_createdAt_idx" ON "Product"("userId", "status", "createdAt");
+
+-- CreateIndex
+CREATE INDEX "Product_userId_createdAt_idx" ON "Product"("userId", "createdAt");
+
+-- CreateIndex
+CREATE INDEX "Product_marktplaatsAdId_idx" ON "Product"("marktplaatsAdId");
+
+-- CreateIndex
+CREATE INDEX "Product_categoryId_idx" ON "Product"("categoryId");
@@ -0,0 +1,13 @@
+-- Keep only the newest active job per product before the index can be created
+UPDATE "PostJob" AS j
+SET status = 'failed', error = 'Dubbele job', "finishedAt" = CURRENT_TIMESTAMP
+WHERE j.status IN ('queued', 'running')
+  AND EXISTS (
+    SELECT 1 FROM "PostJob" AS newer
+    WHERE newer."productId" = j."productId"
+      AND newer.status IN ('queued', 'running')
+      AND (newer."createdAt", newer.id) > (j."createdAt", j.id)
+  );
+
+-- CreateIndex: at most one queued/running job per product (not expressible in schema.prisma)
+CREATE UNIQUE INDEX "PostJob_productId_active_key" ON "PostJob"("productId") WHERE status IN ('queued', 'running');
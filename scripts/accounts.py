@@ -0,0 +1,296 @@
+"""
+Pool van Marktplaats accounts voor de lokale worker.
+Elk account heeft een eigen browserprofiel (user_data_dir) en een dagbudget;
+producten worden per beleid over de accounts verdeeld:
+	owner         - op product.marktplaats_account of de eigenaar (user_id) van het product
+	round_robin   - om de beurt
+	least_loaded  - naar het account met de meeste resterende ruimte
+
+Configuratie via MP_ACCOUNTS_FILE (JSON), bijvoorbeeld:
+	[
+		{"name": "winkel", "user_data_dir": "./profiles/winkel", "user_ids": ["clx..."], "daily_budget": 40},
+		{"name": "privé", "user_data_dir": "./profiles/prive", "daily_budget": 20}
+	]
+Zonder bestand is er één account op USER_DATA_DIR (zelfde gedrag als voorheen).
+
+Inloggen per account (de login wordt als storage_state in het profiel bewaard):
+	python scripts/accounts.py login winkel
+	python scripts/accounts.py refresh            # storage_state van alle accounts vernieuwen
+"""
+import argparse
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+
+POLICIES = ('owner', 'round_robin', 'least_loaded')
+BUDGET_FILE = 'mp_posting_budget.json'
+
+
+@dataclass
+class Account:
+	name: str
+	user_data_dir: str
+	user_ids: List[str] = field(default_factory=list)
+	daily_budget: int = 50
+	posted_today: int = 0
+	assigned: int = 0
+
+	@property
+	def remaining(self) -> int:
+		return max(self.daily_budget - self.posted_today - self.assigned, 0)
+
+	def _budget_path(self) -> str:
+		return os.path.join(self.user_data_dir, BUDGET_FILE)
+
+	def load_usage(self) -> None:
+		"""Read today's post count from the profile dir so budgets survive restarts."""
+		try:
+			with open(self._budget_path(), encoding='utf-8') as f:
+				data = json.load(f)
+			self.posted_today = int(data.get(date.today().isoformat(), 0))
+		except (OSError, ValueError):
+			self.posted_today = 0
+
+	def record_posts(self, count: int) -> None:
+		if count <= 0:
+			return
+		self.load_usage()
+		self.posted_today += count
+		os.makedirs(self.user_data_dir, exist_ok=True)
+		with open(self._budget_path(), 'w', encoding='utf-8') as f:
+			# Only today's count matters; older days are dropped
+			json.dump({date.today().isoformat(): self.posted_today}, f)
+
+
+def load_accounts(path: Optional[str] = None, default_user_data_dir: Optional[str] = None) -> List[Account]:
+	path = path or os.getenv('MP_ACCOUNTS_FILE')
+	if not path:
+		return [Account(
+			name='default',
+			user_data_dir=default_user_data_dir or os.getenv('USER_DATA_DIR', './user_data'),
+			daily_budget=int(os.getenv('MP_DAILY_BUDGET', '1000')),
+		)]
+	with open(path, encoding='utf-8') as f:
+		entries = json.load(f)
+	base_dir = os.path.dirname(os.path.abspath(path))
+	accounts = []
+	for entry in entries:
+		user_data_dir = entry.get('user_data_dir') or os.path.join('profiles', entry['name'])
+		accounts.append(Account(
+			name=entry['name'],
+			# Relative profile dirs are relative to the accounts file
+			user_data_dir=os.path.join(base_dir, user_data_dir) if not os.path.isabs(user_data_dir) else user_data_dir,
+			user_ids=list(entry.get('user_ids') or []),
+			daily_budget=int(entry.get('daily_budget', 50)),
+		))
+	if not accounts:
+		raise ValueError(f"Geen accounts gevonden in {path}")
+	return accounts
+
+
+class AccountPool:
+	"""Route products (in the pending/claim API format) to accounts within their budgets."""
+
+	def __init__(self, accounts: List[Account], policy: str = 'least_loaded'):
+		if policy not in POLICIES:
+			raise ValueError(f"Onbekend beleid '{policy}', kies uit {', '.join(POLICIES)}")
+		self.accounts = accounts
+		self.policy = policy
+		self._by_name = {a.name: a for a in accounts}
+		self._by_user = {uid: a for a in accounts for uid in a.user_ids}
+		self._next = 0
+		for account in accounts:
+			account.load_usage()
+
+	@property
+	def remaining(self) -> int:
+		return sum(a.remaining for a in self.accounts)
+
+	def refresh(self) -> None:
+		"""Re-read today's usage, so long-running workers pick up a new day's budget."""
+		for account in self.accounts:
+			account.load_usage()
+
+	def _pick(self, item: Dict) -> Optional[Account]:
+		if self.policy == 'owner':
+			account = self._by_name.get(item.get('marktplaats_account') or '') or self._by_user.get(item.get('user_id') or '')
+			if account is None and len(self.accounts) == 1:
+				account = self.accounts[0]
+			return account if account and account.remaining > 0 else None
+
+		available = [a for a in self.accounts if a.remaining > 0]
+		if not available:
+			return None
+		if self.policy == 'least_loaded':
+			return max(available, key=lambda a: a.remaining / max(a.daily_budget, 1))
+		# round_robin
+		for _ in range(len(self.accounts)):
+			account = self.accounts[self._next % len(self.accounts)]
+			self._next += 1
+			if account.remaining > 0:
+				return account
+		return None
+
+	def assign(self, items: List[Dict]) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+		"""Returns ({account name: items}, unassigned items)."""
+		assignments: Dict[str, List[Dict]] = {}
+		unassigned: List[Dict] = []
+		for item in items:
+			account = self._pick(item)
+			if account is None:
+				unassigned.append(item)
+				continue
+			account.assigned += 1
+			assignments.setdefault(account.name, []).append(item)
+		return assignments, unassigned
+
+	def complete(self, name: str, assigned: int, posted: int) -> None:
+		account = self._by_name[name]
+		account.assigned = max(account.assigned - assigned, 0)
+		account.record_posts(posted)
+
+	def account(self, name: str) -> Account:
+		return self._by_name[name]
+
+
+def _base_url() -> str:
+	return os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+
+
+def has_profile(user_data_dir: str) -> bool:
+	"""True when a persistent Chromium profile (from before storage_state) exists in the directory."""
+	return os.path.isdir(os.path.join(user_data_dir, 'Default'))
+
+
+def _login_hint(account: Account) -> str:
+	return f"log opnieuw in: python scripts/accounts.py login {account.name}"
+
+
+async def export_profile_session(p, account: Account) -> Optional[str]:
+	"""
+	Export the login of the account's persistent profile as its storage_state. None when the
+	profile is not logged in; the stored state is then left as it was.
+	"""
+	from browser_session import save_storage_state
+	from post_ads import ensure_logged_in, launch_profile, new_worker_page
+
+	browser = await launch_profile(p, account.user_data_dir)
+	try:
+		session = await ensure_logged_in(await new_worker_page(browser), _base_url(), account.user_data_dir, fast=False)
+		if not session.logged_in:
+			return None
+		return await save_storage_state(browser, account.user_data_dir)
+	finally:
+		await browser.close()
+
+
+async def open_profile(account: Account) -> bool:
+	"""
+	Open an account in a visible browser so the user can log in by hand, then save its
+	storage_state. False (and nothing saved) when the session is not logged in afterwards.
+	"""
+	import sys
+	sys.path.insert(0, os.path.dirname(__file__))
+	from playwright.async_api import async_playwright
+	from browser_session import save_storage_state
+	from post_ads import ensure_logged_in, launch_browser
+	from session_health import get_session_health
+
+	os.environ['HEADLESS'] = 'false'
+	async with async_playwright() as p:
+		browser = await launch_browser(p, account.user_data_dir)
+		closed = asyncio.Event()
+		browser.on("close", lambda _: closed.set())
+		page = await browser.new_page()
+		page.on("close", lambda _: closed.set())
+		await ensure_logged_in(page, _base_url(), account.user_data_dir, fast=False)
+		print(f"Log in met account '{account.name}' en sluit daarna de browser.")
+		await closed.wait()
+		try:
+			session = await get_session_health(account.user_data_dir).check(_base_url(), browser)
+			path = await save_storage_state(browser, account.user_data_dir) if session.logged_in else None
+		except Exception:
+			# A persistent profile is gone with its window; read the login back from disk
+			path = await export_profile_session(p, account)
+		if path is None:
+			print(f"[ERROR] '{account.name}' is niet ingelogd, sessie niet opgeslagen; {_login_hint(account)}")
+			return False
+		print(f"[OK] Sessie van '{account.name}' opgeslagen in {path}")
+		return True
+
+
+async def refresh_sessions(accounts: List[Account]) -> int:
+	"""
+	Regenerate the storage_state of each account headless: from the saved state (rolling its
+	cookies) or, the first time, from the persistent profile. Returns the number of failures.
+	"""
+	import sys
+	sys.path.insert(0, os.path.dirname(__file__))
+	from playwright.async_api import async_playwright
+	from browser_session import save_storage_state, storage_state_path
+	from post_ads import ensure_logged_in, launch_browser, new_worker_page
+
+	os.environ.setdefault('HEADLESS', 'true')
+	failed = 0
+	async with async_playwright() as p:
+		for account in accounts:
+			try:
+				if os.path.exists(storage_state_path(account.user_data_dir)):
+					browser = await launch_browser(p, account.user_data_dir)
+					try:
+						session = await ensure_logged_in(await new_worker_page(browser), _base_url(), account.user_data_dir, fast=False)
+						# An expired session must not overwrite the stored state (or pass as refreshed)
+						path = await save_storage_state(browser, account.user_data_dir) if session.logged_in else None
+					finally:
+						await browser.close()
+				elif has_profile(account.user_data_dir):
+					path = await export_profile_session(p, account)
+				else:
+					print(f"[WARNING] '{account.name}' heeft nog geen login, gebruik: python scripts/accounts.py login {account.name}")
+					failed += 1
+					continue
+				if path is None:
+					print(f"[ERROR] {account.name}: sessie verlopen, niet opgeslagen; {_login_hint(account)}")
+					failed += 1
+					continue
+				print(f"[OK] {account.name}: {path}")
+			except Exception as e:
+				print(f"[ERROR] {account.name}: sessie niet vernieuwd: {e}")
+				failed += 1
+	return failed
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Beheer de Marktplaats accounts van de worker")
+	sub = parser.add_subparsers(dest="command", required=True)
+	sub.add_parser("list", help="Toon accounts en resterend dagbudget")
+	login = sub.add_parser("login", help="Open het profiel van een account om in te loggen")
+	login.add_argument("name")
+	refresh = sub.add_parser("refresh", help="Vernieuw de opgeslagen storage_state (alle accounts of een)")
+	refresh.add_argument("name", nargs="?")
+	args = parser.parse_args()
+
+	accounts = load_accounts()
+	if args.command == "list":
+		for account in accounts:
+			account.load_usage()
+			print(f"{account.name:<20} {account.posted_today:>4}/{account.daily_budget:<4} {account.user_data_dir}")
+		return
+	if args.command == "refresh":
+		selected = [a for a in accounts if args.name in (None, a.name)]
+		if not selected:
+			raise SystemExit(f"Account '{args.name}' niet gevonden")
+		raise SystemExit(1 if asyncio.run(refresh_sessions(selected)) else 0)
+
+	account = next((a for a in accounts if a.name == args.name), None)
+	if account is None:
+		raise SystemExit(f"Account '{args.name}' niet gevonden")
+	raise SystemExit(0 if asyncio.run(open_profile(account)) else 1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,132 @@
+"""
+Advertentie-id en URL vastleggen direct bij het plaatsen.
+Tijdens de klik op "Plaats je advertentie" luistert AdCapture naar het antwoord van
+de place-ad API en naar de redirect naar de advertentiepagina; wat als eerste binnen
+is levert het id en de URL. Zo is er geen vaste wachttijd en geen extra navigatie
+naar de advertentie meer nodig om het id te lezen.
+
+MP_PLACE_AD_API (regex) bepaalt welke POST responses als place-ad antwoord gelden.
+"""
+import asyncio
+import os
+import re
+from typing import Any, NamedTuple, Optional
+from urllib.parse import parse_qs, urljoin, urlparse
+
+
+PLACE_AD_API_RE = re.compile(os.getenv("MP_PLACE_AD_API", r"/plaats/.*place-?ad"), re.IGNORECASE)
+
+# Marktplaats ad ids: "m2101234567" on the live site, "a123" in older URLs and the mock
+_AD_ID_IN_PATH = re.compile(r"/([am]\d+)(?:-|/|$)")
+_AD_ID_PARAMS = ('adId', 'itemId', 'ad_id')
+_AD_ID_KEYS = ('adId', 'ad_id', 'itemId')
+# A bare 'id' only counts at the top level or in the ad object itself; elsewhere it is
+# the id of a category, user or image
+_AD_OBJECT_KEYS = ('ad', 'advert', 'listing')
+_AD_URL_KEYS = ('adUrl', 'ad_url', 'vipUrl', 'url')
+
+
+class PublishedAd(NamedTuple):
+	ad_url: Optional[str]
+	ad_id: Optional[str]
+	source: str  # 'response', 'redirect' or 'page'
+
+
+def ad_id_from_url(url: Optional[str]) -> Optional[str]:
+	"""'/v/huis/banken/m2101234567-bank' -> 'm2101234567'; also ?adId=... on a confirmation page."""
+	if not url:
+		return None
+	parsed = urlparse(url)
+	params = parse_qs(parsed.query)
+	for key in _AD_ID_PARAMS:
+		if params.get(key):
+			return params[key][0]
+	match = _AD_ID_IN_PATH.search(parsed.path)
+	return match.group(1) if match else None
+
+
+def ad_from_payload(data: Any, page_url: str) -> Optional[PublishedAd]:
+	"""
+	Find the ad id/URL in a place-ad JSON body, at the top level or one object down.
+	The id in the ad URL wins over an id field, which may belong to something else.
+	"""
+	if not isinstance(data, dict):
+		return None
+	candidates = [(data, True)] + [
+		(value, key in _AD_OBJECT_KEYS) for key, value in data.items() if isinstance(value, dict)
+	]
+	for item, bare_id in candidates:
+		keys = _AD_ID_KEYS + ('id',) if bare_id else _AD_ID_KEYS
+		ad_id = next((str(item[key]) for key in keys if item.get(key)), None)
+		ad_url = next((item[key] for key in _AD_URL_KEYS if isinstance(item.get(key), str) and item[key]), None)
+		if ad_url:
+			ad_url = urljoin(page_url, ad_url)
+			ad_id = ad_id_from_url(ad_url) or ad_id
+		if ad_id or ad_url:
+			return PublishedAd(ad_url, ad_id, 'response')
+	return None
+
+
+class AdCapture:
+	"""
+	Context manager around the publish click: collects the first place-ad response or
+	ad page redirect of the page. A failed place-ad response (4xx/5xx) ends the wait early,
+	and so does settle_ms after a navigation to a page without an ad id.
+	"""
+
+	def __init__(self, page, settle_ms: int = 3000):
+		self.page = page
+		self.settle_ms = settle_ms
+		self.error: Optional[str] = None
+		self._done: Optional[asyncio.Future] = None
+		self._start_url = ''
+		self._settle = None
+
+	async def __aenter__(self) -> 'AdCapture':
+		self._done = asyncio.get_running_loop().create_future()
+		self._start_url = self.page.url
+		self.page.on('response', self._on_response)
+		self.page.on('framenavigated', self._on_navigated)
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		self.page.remove_listener('response', self._on_response)
+		self.page.remove_listener('framenavigated', self._on_navigated)
+		if self._settle is not None:
+			self._settle.cancel()
+
+	def _resolve(self, ad: Optional[PublishedAd]) -> None:
+		if not self._done.done():
+			self._done.set_result(ad)
+
+	async def _on_response(self, response) -> None:
+		if response.request.method != 'POST' or not PLACE_AD_API_RE.search(response.url):
+			return
+		if response.status >= 400:
+			self.error = f"place-ad antwoordde {response.status}"
+			self._resolve(None)
+			return
+		try:
+			data = await response.json()
+		except Exception:
+			return
+		ad = ad_from_payload(data, self.page.url)
+		if ad:
+			self._resolve(ad)
+
+	def _on_navigated(self, frame) -> None:
+		if frame != self.page.main_frame:
+			return
+		ad_id = ad_id_from_url(frame.url)
+		if ad_id:
+			self._resolve(PublishedAd(frame.url, ad_id, 'redirect'))
+		elif frame.url != self._start_url and self._settle is None:
+			# A confirmation page without an id: give the place-ad response a moment, then stop waiting
+			self._settle = asyncio.get_running_loop().call_later(self.settle_ms / 1000, self._resolve, None)
+
+	async def wait(self, timeout_ms: int) -> Optional[PublishedAd]:
+		"""The captured ad, or None when nothing arrived within timeout_ms (or place-ad failed)."""
+		try:
+			return await asyncio.wait_for(asyncio.shield(self._done), timeout_ms / 1000)
+		except asyncio.TimeoutError:
+			return None
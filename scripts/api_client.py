@@ -0,0 +1,390 @@
+"""
+Gedeelde HTTP client voor de webapp API.
+Hergebruikt één requests.Session (keep-alive, gzip) en stuurt de API key als header mee,
+alleen naar de API zelf. Verbindingsfouten, 429 en 502/503/504 worden opnieuw geprobeerd
+met exponentiële backoff en jitter (MP_API_RETRIES, default 3); een POST alleen als die
+idempotent is of de request de server aantoonbaar niet bereikte.
+
+AsyncApiClient is dezelfde client voor async code: elke call draait op een eigen thread
+pool (MP_API_THREADS, default 8), dus HTTP blokkeert de event loop nooit en lanes kunnen
+één client delen.
+"""
+import asyncio
+import functools
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+	import requests
+	from urllib3.exceptions import NewConnectionError
+except ImportError:
+	requests = None
+
+
+DEFAULT_API_KEY = 'internal-key-change-in-production'
+DEFAULT_BASE_URL = 'http://localhost:3000'
+RETRY_STATUSES = {429, 502, 503, 504}
+BACKOFF_BASE_S = 0.5
+BACKOFF_CAP_S = 10.0
+
+
+def resolve_api_base_url() -> str:
+	return (os.getenv('API_BASE_URL') or os.getenv('NEXTAUTH_URL') or DEFAULT_BASE_URL).rstrip('/')
+
+
+def resolve_api_key() -> str:
+	return os.getenv('INTERNAL_API_KEY') or DEFAULT_API_KEY
+
+
+def default_retries() -> int:
+	return int(os.getenv('MP_API_RETRIES', '3'))
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+	"""Seconds before retry attempt (0-based): full jitter backoff, or the server's Retry-After."""
+	if retry_after:
+		try:
+			return min(BACKOFF_CAP_S, max(0.0, float(retry_after)))
+		except ValueError:
+			pass
+	return random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt))
+
+
+def _never_sent(error: Exception) -> bool:
+	"""True when the request failed before reaching the server, so even a POST is safe to repeat."""
+	if isinstance(error, requests.exceptions.ConnectTimeout):
+		return True
+	reason = getattr(error.args[0], 'reason', None) if error.args else None
+	return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class ApiClient:
+	"""Thin wrapper around a pooled requests.Session for the internal API endpoints."""
+
+	def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, timeout: int = 60, retries: Optional[int] = None):
+		if not requests:
+			raise ImportError("requests library is required for API mode. Install with: pip install requests")
+		self.base_url = (base_url or resolve_api_base_url()).rstrip('/')
+		self.api_key = api_key or resolve_api_key()
+		self.timeout = timeout
+		self.retries = default_retries() if retries is None else retries
+		self.session = requests.Session()
+
+	def url(self, path: str) -> str:
+		if path.startswith(('http://', 'https://')):
+			return path
+		return f"{self.base_url}/{path.lstrip('/')}"
+
+	def request(self, method: str, path: str, idempotent: Optional[bool] = None, **kwargs) -> 'requests.Response':
+		"""
+		Send one request with retries; raises for HTTP errors. The API key header only goes to
+		the API's own origin, never to photo hosts. idempotent defaults to True for GET.
+		"""
+		url = self.url(path)
+		headers = dict(kwargs.pop('headers', None) or {})
+		if url.startswith(self.base_url + '/') or url == self.base_url:
+			headers.setdefault('x-api-key', self.api_key)
+		kwargs.setdefault('timeout', self.timeout)
+		if idempotent is None:
+			idempotent = method.upper() in ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+		for attempt in range(self.retries + 1):
+			try:
+				response = self.session.request(method, url, headers=headers, **kwargs)
+			except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+				if attempt == self.retries or not (idempotent or _never_sent(e)):
+					raise
+				time.sleep(retry_delay(attempt))
+				continue
+			if response.status_code in RETRY_STATUSES and attempt < self.retries and (idempotent or response.status_code == 429):
+				time.sleep(retry_delay(attempt, response.headers.get('Retry-After')))
+				continue
+			response.raise_for_status()
+			return response
+
+	def get_json(self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None):
+		return self.request('GET', path, params=params, headers=headers).json()
+
+	def get_bytes(self, url: str, headers: Optional[Dict] = None) -> Tuple[bytes, str]:
+		"""Body and content type of a (photo) URL."""
+		response = self.request('GET', url, headers=headers)
+		return response.content, response.headers.get('content-type', '')
+
+	def post_json(self, path: str, payload, idempotent: bool = False) -> Dict:
+		return self.request('POST', path, idempotent=idempotent, json=payload).json()
+
+	def post_ndjson(self, path: str, rows: Iterable[Dict], idempotent: bool = False) -> Dict:
+		body = '\n'.join(json.dumps(row, separators=(',', ':')) for row in rows)
+		return self.request(
+			'POST',
+			path,
+			idempotent=idempotent,
+			data=body.encode('utf-8'),
+			headers={'Content-Type': 'application/x-ndjson'},
+		).json()
+
+	def close(self) -> None:
+		self.session.close()
+
+
+class _ThreadClient:
+	"""ApiClient facade that resolves to the calling thread's own client of an AsyncApiClient."""
+
+	def __init__(self, owner: 'AsyncApiClient'):
+		self._owner = owner
+		self.base_url = owner.base_url
+		self.api_key = owner.api_key
+
+	def __getattr__(self, name: str):
+		return getattr(self._owner._thread_client(), name)
+
+
+class AsyncApiClient:
+	"""
+	ApiClient for async code. Calls run on the client's own thread pool, where every thread
+	keeps its own pooled session (requests.Session is not safe to share across threads), so
+	HTTP never blocks the event loop and any number of lanes can share one AsyncApiClient.
+	Sync helpers that take an ApiClient (send_batch_updates, StatsBatcher, ProductLeaseClient)
+	run on the pool with call() and the .sync facade.
+	"""
+
+	def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, timeout: int = 60, retries: Optional[int] = None, max_workers: Optional[int] = None):
+		self.base_url = (base_url or resolve_api_base_url()).rstrip('/')
+		self.api_key = api_key or resolve_api_key()
+		self.timeout = timeout
+		self.retries = retries
+		self.sync = _ThreadClient(self)
+		self._executor = ThreadPoolExecutor(
+			max_workers=max_workers or int(os.getenv('MP_API_THREADS', '8')),
+			thread_name_prefix='api',
+		)
+		self._local = threading.local()
+		self._clients: List[ApiClient] = []
+		self._lock = threading.Lock()
+
+	def _thread_client(self) -> ApiClient:
+		client = getattr(self._local, 'client', None)
+		if client is None:
+			client = self._local.client = ApiClient(self.base_url, self.api_key, self.timeout, self.retries)
+			with self._lock:
+				self._clients.append(client)
+		return client
+
+	async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+		"""Run a blocking function on the pool; pass self.sync where it expects an ApiClient."""
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+	def _invoke(self, method: str, *args):
+		# Resolved here, on the pool thread, so it is that thread's client
+		return getattr(self._thread_client(), method)(*args)
+
+	async def get_json(self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None):
+		return await self.call(self._invoke, 'get_json', path, params, headers)
+
+	async def get_bytes(self, url: str, headers: Optional[Dict] = None) -> Tuple[bytes, str]:
+		return await self.call(self._invoke, 'get_bytes', url, headers)
+
+	async def post_json(self, path: str, payload, idempotent: bool = False) -> Dict:
+		return await self.call(self._invoke, 'post_json', path, payload, idempotent)
+
+	async def post_ndjson(self, path: str, rows: Iterable[Dict], idempotent: bool = False) -> Dict:
+		return await self.call(self._invoke, 'post_ndjson', path, list(rows), idempotent)
+
+	async def send_batch_updates(self, updates: List[Dict], worker_id: Optional[str] = None) -> List[Dict]:
+		return await self.call(send_batch_updates, self.sync, updates, worker_id=worker_id)
+
+	def close(self) -> None:
+		self._executor.shutdown(wait=True)
+		with self._lock:
+			clients, self._clients = self._clients, []
+		for client in clients:
+			client.close()
+
+	async def aclose(self) -> None:
+		await asyncio.to_thread(self.close)
+
+	async def __aenter__(self) -> 'AsyncApiClient':
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		await self.aclose()
+
+
+BATCH_UPDATE_ENDPOINT = '/api/products/batch-update'
+
+
+def send_batch_updates(client: ApiClient, updates: List[Dict], chunk_size: int = 2000, worker_id: Optional[str] = None) -> List[Dict]:
+	"""
+	Report posting results ({productId, status, ad_url, ad_id, views, saves, posted_at})
+	in chunks of chunk_size; returns the combined per-product results. Products leased
+	through /api/products/claim only accept results sent with their lease owner's worker_id.
+	"""
+	results: List[Dict] = []
+	for start in range(0, len(updates), chunk_size):
+		payload = {'updates': updates[start:start + chunk_size]}
+		if worker_id:
+			payload['workerId'] = worker_id
+		# Setting the final state twice is harmless, so a lost response may be retried
+		results.extend(client.post_json(BATCH_UPDATE_ENDPOINT, payload, idempotent=True).get('results', []))
+	return results
+
+
+class StatsBatcher:
+	"""
+	Buffer (ad_id, views, saves, posted_at) rows and send them to
+	/api/products/sync-stats/bulk as columnar JSON, batch_size rows per request.
+
+	Gebruik:
+		with StatsBatcher(ApiClient()) as batcher:
+			for ad in ads:
+				batcher.add(ad['ad_id'], ad['views'], ad['saves'], ad.get('posted_at'))
+	"""
+
+	ENDPOINT = '/api/products/sync-stats/bulk'
+
+	def __init__(self, client: ApiClient, batch_size: int = 5000):
+		self.client = client
+		self.batch_size = batch_size
+		self._ad_ids: List[str] = []
+		self._views: List[int] = []
+		self._saves: List[int] = []
+		self._posted_at: List[Optional[str]] = []
+		self.sent = 0
+		self.updated = 0
+		self.unmatched = 0
+
+	def add(self, ad_id: Optional[str], views: int = 0, saves: int = 0, posted_at: Optional[str] = None) -> None:
+		if not ad_id:
+			return
+		self._ad_ids.append(ad_id)
+		self._views.append(int(views or 0))
+		self._saves.append(int(saves or 0))
+		self._posted_at.append(posted_at or None)
+		if len(self._ad_ids) >= self.batch_size:
+			self.flush()
+
+	def add_many(self, rows: Iterable[Dict]) -> None:
+		for row in rows:
+			self.add(row.get('ad_id'), row.get('views', 0), row.get('saves', 0), row.get('posted_at'))
+
+	def flush(self) -> None:
+		if not self._ad_ids:
+			return
+		payload = {
+			'ad_id': self._ad_ids,
+			'views': self._views,
+			'saves': self._saves,
+			'posted_at': self._posted_at,
+		}
+		count = len(self._ad_ids)
+		self._ad_ids, self._views, self._saves, self._posted_at = [], [], [], []
+		result = self.client.post_json(self.ENDPOINT, payload, idempotent=True)
+		self.sent += count
+		self.updated += result.get('updated', 0)
+		self.unmatched += result.get('unmatched', 0)
+
+	def __enter__(self) -> 'StatsBatcher':
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		if exc_type is None:
+			self.flush()
+
+
+class ProductLeaseClient:
+	"""
+	Claim pending products with a visibility timeout via /api/products/claim.
+	While products are being posted, a heartbeat thread renews their lease;
+	products reported through batch-update are finished, anything else held
+	at release() goes back to pending.
+
+	Gebruik:
+		leases = ProductLeaseClient(ApiClient())
+		products = leases.claim(10)
+		with leases.heartbeat():
+			... post products ...
+	"""
+
+	ENDPOINT = '/api/products/claim'
+
+	def __init__(self, client: ApiClient, worker_id: Optional[str] = None, lease_seconds: int = 900):
+		self.client = client
+		self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+		self.lease_seconds = lease_seconds
+		self.held: List[str] = []
+		self._lock = threading.Lock()
+
+	def claim(self, limit: int, user_id: Optional[str] = None) -> List[Dict]:
+		payload = {'workerId': self.worker_id, 'limit': limit, 'leaseSeconds': self.lease_seconds}
+		if user_id:
+			payload['userId'] = user_id
+		products = self.client.post_json(self.ENDPOINT, payload).get('products', [])
+		with self._lock:
+			self.held.extend(p['id'] for p in products)
+		return products
+
+	def renew(self) -> int:
+		with self._lock:
+			held = list(self.held)
+		if not held:
+			return 0
+		result = self.client.post_json(f"{self.ENDPOINT}/renew", {
+			'workerId': self.worker_id,
+			'productIds': held,
+			'leaseSeconds': self.lease_seconds,
+		}, idempotent=True)
+		return result.get('renewed', 0)
+
+	def finished(self, product_ids: Iterable[str]) -> None:
+		"""Forget products whose result has been reported (batch-update clears the lease)."""
+		done = set(product_ids)
+		with self._lock:
+			self.held = [pid for pid in self.held if pid not in done]
+
+	def release(self) -> int:
+		with self._lock:
+			held, self.held = self.held, []
+		if not held:
+			return 0
+		result = self.client.post_json(f"{self.ENDPOINT}/release", {'workerId': self.worker_id, 'productIds': held}, idempotent=True)
+		return result.get('released', 0)
+
+	def heartbeat(self, interval: Optional[float] = None) -> '_LeaseHeartbeat':
+		return _LeaseHeartbeat(self, interval or max(self.lease_seconds / 3, 10))
+
+
+class _LeaseHeartbeat:
+	"""Background thread that renews the held leases every interval seconds."""
+
+	def __init__(self, leases: ProductLeaseClient, interval: float):
+		self.leases = leases
+		self.interval = interval
+		self._stop = threading.Event()
+		# Own client so the heartbeat never shares a requests.Session with the caller's thread
+		self._client = ApiClient(leases.client.base_url, leases.client.api_key, timeout=30)
+		self._thread = threading.Thread(target=self._loop, daemon=True)
+
+	def _loop(self) -> None:
+		renewer = ProductLeaseClient(self._client, self.leases.worker_id, self.leases.lease_seconds)
+		while not self._stop.wait(self.interval):
+			with self.leases._lock:
+				renewer.held = list(self.leases.held)
+			try:
+				renewer.renew()
+			except Exception as e:
+				print(f"[WARNING] Lease verlengen mislukt: {e}")
+
+	def __enter__(self) -> '_LeaseHeartbeat':
+		self._thread.start()
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		self._stop.set()
+		self._thread.join(timeout=5)
+		self._client.close()
@@ -0,0 +1,176 @@
+"""
+Persistente lokale cache voor de statische bestanden van de site.
+Scripts, stylesheets, fonts en afbeeldingen die de server als langlevend markeert
+(Cache-Control immutable of een max-age van minstens een uur) worden op schijf bewaard
+en bij de volgende advertentie, of de volgende run, lokaal geserveerd in plaats van
+opnieuw gedownload. Per browserprofiel één map, zodat elk account zijn eigen cache heeft.
+
+Let op: Playwright zet de HTTP cache van Chromium uit zodra er een route actief is;
+deze cache neemt die rol voor de statische bestanden daarom volledig over.
+
+Instellen:
+	MP_ASSET_CACHE=false      # uit, terug naar de gewone browsercache
+	MP_ASSET_CACHE_MB=200     # maximale grootte op schijf
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+CACHEABLE_TYPES = {'script', 'stylesheet', 'font', 'image'}
+MIN_MAX_AGE_S = 3600
+IMMUTABLE_TTL_S = 365 * 24 * 3600
+# Describe the transfer, not the (decoded) body that is stored
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie', 'date', 'age'}
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def asset_cache_enabled() -> bool:
+	return os.getenv('MP_ASSET_CACHE', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+def cache_lifetime(headers: Dict[str, str]) -> Optional[int]:
+	"""Seconds a response may be reused without asking the server, or None if it should not be stored."""
+	cache_control = (headers.get('cache-control') or '').lower()
+	if any(word in cache_control for word in ('no-store', 'no-cache', 'private')):
+		return None
+	if 'immutable' in cache_control:
+		return IMMUTABLE_TTL_S
+	match = _MAX_AGE_RE.search(cache_control)
+	if match and int(match.group(1)) >= MIN_MAX_AGE_S:
+		return int(match.group(1))
+	return None
+
+
+class AssetCache:
+	"""Disk cache behind context.route(); one .json (status, headers, expiry) plus one .body file per URL."""
+
+	def __init__(self, directory: str, max_bytes: Optional[int] = None):
+		self.directory = directory
+		self.max_bytes = max_bytes or int(os.getenv('MP_ASSET_CACHE_MB', '200')) * 1024 * 1024
+		self.hits = 0
+		self.misses = 0
+		self._meta: Dict[str, Dict] = {}
+		# Body size per key and their sum, so a store does not have to scan the directory
+		self._sizes: Dict[str, int] = {}
+		self.total_bytes = 0
+		os.makedirs(directory, exist_ok=True)
+		self._scan()
+
+	@staticmethod
+	def key(url: str) -> str:
+		return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+	def _path(self, key: str, suffix: str) -> str:
+		return os.path.join(self.directory, key + suffix)
+
+	def lookup(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+		key = self.key(url)
+		meta = self._meta.get(key)
+		try:
+			if meta is None:
+				with open(self._path(key, '.json'), encoding='utf-8') as f:
+					meta = self._meta[key] = json.load(f)
+			if meta['expires'] < time.time():
+				return None
+			with open(self._path(key, '.body'), 'rb') as f:
+				return meta, f.read()
+		except (OSError, ValueError, KeyError):
+			self._meta.pop(key, None)
+			return None
+
+	def _write(self, path: str, data: bytes) -> None:
+		# Atomic, so a crashed run or a second worker never sees half a file
+		fd, tmp = tempfile.mkstemp(dir=self.directory)
+		with os.fdopen(fd, 'wb') as f:
+			f.write(data)
+		os.replace(tmp, path)
+
+	def store(self, url: str, status: int, headers: Dict[str, str], body: bytes, lifetime: int) -> None:
+		key = self.key(url)
+		meta = {
+			'url': url,
+			'status': status,
+			'headers': {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+			'expires': time.time() + lifetime,
+		}
+		try:
+			self._write(self._path(key, '.body'), body)
+			self._write(self._path(key, '.json'), json.dumps(meta).encode('utf-8'))
+			self._meta[key] = meta
+		except OSError:
+			return
+		self.total_bytes += len(body) - self._sizes.get(key, 0)
+		self._sizes[key] = len(body)
+		if self.total_bytes > self.max_bytes:
+			self._evict()
+
+	def _scan(self) -> List[Tuple[float, int, str]]:
+		"""(mtime, size, key) of every body on disk; resets the running total to match."""
+		entries = []
+		for name in os.listdir(self.directory):
+			if not name.endswith('.body'):
+				continue
+			try:
+				stat = os.stat(os.path.join(self.directory, name))
+			except OSError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, name[:-5]))
+		self._sizes = {key: size for _, size, key in entries}
+		self.total_bytes = sum(self._sizes.values())
+		return entries
+
+	def _evict(self) -> None:
+		"""Drop the least recently written entries once the cache is over max_bytes."""
+		# Only here is the directory listed again: it also picks up other workers' writes
+		entries = self._scan()
+		total = self.total_bytes
+		if total <= self.max_bytes:
+			return
+		for _, size, key in sorted(entries):
+			for suffix in ('.body', '.json'):
+				try:
+					os.remove(self._path(key, suffix))
+				except OSError:
+					pass
+			self._meta.pop(key, None)
+			self._sizes.pop(key, None)
+			total -= size
+			if total <= self.max_bytes * 0.8:
+				break
+		self.total_bytes = total
+
+	async def handle(self, route) -> None:
+		request = route.request
+		if request.method != 'GET' or request.resource_type not in CACHEABLE_TYPES or not request.url.startswith('http'):
+			await route.continue_()
+			return
+		cached = self.lookup(request.url)
+		if cached is not None:
+			meta, body = cached
+			self.hits += 1
+			await route.fulfill(status=meta['status'], headers=meta['headers'], body=body)
+			return
+		self.misses += 1
+		try:
+			response = await route.fetch()
+			body = await response.body()
+		except Exception:
+			await route.continue_()
+			return
+		lifetime = cache_lifetime(response.headers)
+		if response.status == 200 and lifetime:
+			self.store(request.url, response.status, response.headers, body, lifetime)
+		await route.fulfill(response=response, body=body)
+
+	async def attach(self, context) -> 'AssetCache':
+		await context.route('**/*', self.handle)
+		return self
+
+	def snapshot(self) -> Dict[str, int]:
+		return {'hits': self.hits, 'misses': self.misses}
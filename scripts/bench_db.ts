@@ -0,0 +1,227 @@
+/**
+ * Benchmark for the worker's hot database paths on a seeded data set.
+ *
+ * Seeds a bench user with N products (default 100k) and a category tree, then times
+ * the pending fetch, batch-update, sync-stats and category import paths using the
+ * same lib functions as the API routes. With --compare the hot-query indexes are
+ * dropped first, measured, recreated and measured again.
+ *
+ *   npx tsx scripts/bench_db.ts --products 100000 --compare
+ *
+ * Only touches rows of bench@marktplaats.local and categories with a "bench-" id,
+ * which are removed afterwards unless --keep is passed. --compare drops indexes on
+ * the shared tables for a moment, so don't run it against production.
+ */
+import { performance } from 'perf_hooks'
+import { prisma } from '../lib/prisma'
+import { applyProductUpdates } from '../lib/productUpdates'
+import { applyStatsRows } from '../lib/productStats'
+import { importCategories, CategoryInput } from '../lib/categoryImport'
+
+const BENCH_EMAIL = 'bench@marktplaats.local'
+const RUNS = 5
+
+// Keep in sync with prisma/migrations/20261019120000_add_hot_query_indexes
+const HOT_INDEXES: [string, string, string[]][] = [
+  ['Category_path_idx', 'Category', ['path']],
+  ['Category_parentId_idx', 'Category', ['parentId']],
+  ['Product_status_createdAt_idx', 'Product', ['status', 'createdAt']],
+  ['Product_userId_status_createdAt_idx', 'Product', ['userId', 'status', 'createdAt']],
+  ['Product_userId_createdAt_idx', 'Product', ['userId', 'createdAt']],
+  ['Product_marktplaatsAdId_idx', 'Product', ['marktplaatsAdId']],
+  ['Product_categoryId_idx', 'Product', ['categoryId']],
+]
+
+function arg(name: string, fallback: number): number {
+  const index = process.argv.indexOf(name)
+  return index >= 0 ? parseInt(process.argv[index + 1], 10) : fallback
+}
+
+function buildCategoryTree(): CategoryInput[] {
+  const categories: CategoryInput[] = []
+  for (let a = 0; a < 20; a++) {
+    const rootPath = `Bench ${a}`
+    categories.push({ id: `bench-${a}`, name: rootPath, level: 1, path: rootPath })
+    for (let b = 0; b < 10; b++) {
+      const subPath = `${rootPath} > Sub ${b}`
+      categories.push({ id: `bench-${a}-${b}`, name: `Sub ${b}`, level: 2, parentId: `bench-${a}`, path: subPath })
+      for (let c = 0; c < 5; c++) {
+        // No parentId: resolved by path
+        categories.push({ id: `bench-${a}-${b}-${c}`, name: `Leaf ${c}`, level: 3, path: `${subPath} > Leaf ${c}` })
+      }
+    }
+  }
+  return categories
+}
+
+// 10% pending, 5% processing, 80% completed (with ad id), 5% failed
+function statusFor(i: number): string {
+  const bucket = i % 20
+  if (bucket < 2) return 'pending'
+  if (bucket === 2) return 'processing'
+  if (bucket === 3) return 'failed'
+  return 'completed'
+}
+
+async function seed(userId: string, count: number, categoryIds: string[]) {
+  const chunk = 5000
+  for (let start = 0; start < count; start += chunk) {
+    const data = []
+    for (let i = start; i < Math.min(start + chunk, count); i++) {
+      const status = statusFor(i)
+      data.push({
+        title: `Bench product ${i}`,
+        description: 'Benchmark product',
+        price: 10 + (i % 500),
+        articleNumber: `BENCH-${i}`,
+        status,
+        marktplaatsAdId: status === 'completed' ? `mBENCH${i}` : null,
+        marktplaatsUrl: status === 'completed' ? `https://www.marktplaats.nl/v/bench/mBENCH${i}` : null,
+        categoryId: categoryIds[i % categoryIds.length],
+        userId,
+        createdAt: new Date(Date.UTC(2025, 0, 1) + i * 1000),
+      })
+    }
+    await prisma.product.createMany({ data, skipDuplicates: true })
+    process.stdout.write(`\rSeeded ${Math.min(start + chunk, count)}/${count} products`)
+  }
+  process.stdout.write('\n')
+}
+
+async function cleanup(userId: string) {
+  await prisma.product.deleteMany({ where: { userId } })
+  await prisma.category.deleteMany({ where: { id: { startsWith: 'bench-' } } })
+  await prisma.user.delete({ where: { id: userId } })
+}
+
+async function time(fn: () => Promise<unknown>): Promise<number> {
+  const timings: number[] = []
+  for (let i = 0; i < RUNS; i++) {
+    const start = performance.now()
+    await fn()
+    timings.push(performance.now() - start)
+  }
+  timings.sort((a, b) => a - b)
+  return timings[Math.floor(timings.length / 2)]
+}
+
+async function measure(userId: string, count: number, categories: CategoryInput[]) {
+  const results: Record<string, number> = {}
+
+  results['pending fetch (all users)'] = await time(() => prisma.product.findMany({
+    where: { status: 'pending' },
+    include: { category: true },
+    orderBy: { createdAt: 'asc' },
+  }))
+  results['pending fetch (one user)'] = await time(() => prisma.product.findMany({
+    where: { userId, status: 'pending' },
+    include: { category: true },
+    orderBy: { createdAt: 'asc' },
+  }))
+  results['claim candidates (10 oldest)'] = await time(() => prisma.$queryRaw`
+    SELECT id FROM "Product" WHERE status = 'pending' ORDER BY "createdAt" LIMIT 10
+  `)
+
+  // Re-apply the results of 2000 completed products (same values, so runs are repeatable)
+  const completed = await prisma.product.findMany({
+    where: { userId, status: 'completed' },
+    select: { id: true, marktplaatsUrl: true, marktplaatsAdId: true, views: true, saves: true },
+    take: 2000,
+  })
+  results['batch-update (2000 rows)'] = await time(() => applyProductUpdates(completed.map(p => ({
+    productId: p.id,
+    status: 'completed',
+    ad_url: p.marktplaatsUrl,
+    ad_id: p.marktplaatsAdId,
+    views: p.views,
+    saves: p.saves,
+  }))))
+
+  const statsRows = []
+  for (let i = 4; i < count && statsRows.length < 5000; i += 20) {
+    statsRows.push({ ad_id: `mBENCH${i}`, views: i % 300, saves: i % 30, posted_at: null })
+  }
+  results[`sync-stats (${statsRows.length} rows)`] = await time(() => applyStatsRows(statsRows))
+
+  results[`category import (${categories.length} rows)`] = await time(() => importCategories(categories))
+
+  return results
+}
+
+async function explainPending() {
+  const plan = await prisma.$queryRawUnsafe<{ 'QUERY PLAN': string }[]>(
+    `EXPLAIN ANALYZE SELECT * FROM "Product" WHERE status = 'pending' ORDER BY "createdAt"`
+  )
+  return plan.map(row => '    ' + row['QUERY PLAN']).join('\n')
+}
+
+async function setIndexes(enabled: boolean) {
+  for (const [name, table, columns] of HOT_INDEXES) {
+    const sql = enabled
+      ? `CREATE INDEX IF NOT EXISTS "${name}" ON "${table}"(${columns.map(c => `"${c}"`).join(', ')})`
+      : `DROP INDEX IF EXISTS "${name}"`
+    await prisma.$executeRawUnsafe(sql)
+  }
+  await prisma.$executeRawUnsafe('ANALYZE "Product"')
+  await prisma.$executeRawUnsafe('ANALYZE "Category"')
+}
+
+function printResults(label: string, results: Record<string, number>, baseline?: Record<string, number>) {
+  console.log(`\n${label}`)
+  for (const [name, ms] of Object.entries(results)) {
+    const speedup = baseline?.[name] ? `  (${(baseline[name] / ms).toFixed(1)}x)` : ''
+    console.log(`  ${name.padEnd(34)} ${ms.toFixed(1).padStart(9)} ms${speedup}`)
+  }
+}
+
+async function main() {
+  const count = arg('--products', 100000)
+  const compare = process.argv.includes('--compare')
+  const keep = process.argv.includes('--keep')
+
+  const user = await prisma.user.upsert({
+    where: { email: BENCH_EMAIL },
+    update: {},
+    create: { email: BENCH_EMAIL, name: 'Benchmark', password: '!' },
+  })
+
+  const categories = buildCategoryTree()
+  const start = performance.now()
+  const imported = await importCategories(categories)
+  if (imported.failed) throw new Error(`Category import failed: ${imported.errors.join('; ')}`)
+  console.log(`Imported ${categories.length} categories in ${(performance.now() - start).toFixed(0)} ms (${imported.created} created)`)
+
+  const leafIds = categories.filter(c => c.level === 3).map(c => c.id!)
+  await seed(user.id, count, leafIds)
+
+  try {
+    let baseline: Record<string, number> | undefined
+    if (compare) {
+      await setIndexes(false)
+      baseline = await measure(user.id, count, categories)
+      printResults('Without hot-query indexes (median of 5 runs)', baseline)
+      console.log(`\n  Plan for the pending fetch:\n${await explainPending()}`)
+      await setIndexes(true)
+    } else {
+      await prisma.$executeRawUnsafe('ANALYZE "Product"')
+    }
+    const results = await measure(user.id, count, categories)
+    printResults('With hot-query indexes (median of 5 runs)', results, baseline)
+    console.log(`\n  Plan for the pending fetch:\n${await explainPending()}`)
+  } finally {
+    if (compare) await setIndexes(true)
+    if (!keep) {
+      await cleanup(user.id)
+      console.log('\nBench data removed')
+    }
+  }
+}
+
+main()
+  .catch((e) => {
+    console.error('Error:', e)
+    process.exit(1)
+  })
+  .finally(async () => {
+    await prisma.$disconnect()
+  })
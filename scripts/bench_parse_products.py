@@ -0,0 +1,142 @@
+"""
+Benchmark voor het inlezen van producten: parse-snelheid en geheugen per product
+van het gedeelde productmodel (product_model.py) tegen de oude @dataclass versie.
+
+Gebruik:
+	python scripts/bench_parse_products.py --rows 100000
+	python scripts/bench_parse_products.py --csv mijn_export.csv
+"""
+import argparse
+import csv
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault("MP_VERBOSE", "false")
+
+from post_ads import read_products
+
+
+CSV_COLUMNS = [
+	"title", "description", "price", "location", "photos", "article_number",
+	"condition", "delivery_methods", "material", "thickness", "total_surface", "delivery_option",
+]
+
+
+@dataclass
+class LegacyProduct:
+	title: str
+	description: str
+	price: str
+	category_path: Optional[str]
+	location: Optional[str]
+	photos: List[str]
+	article_number: Optional[str] = None
+	condition: Optional[str] = None
+	delivery_methods: List[str] = None
+	material: Optional[str] = None
+	thickness: Optional[str] = None
+	total_surface: Optional[str] = None
+	delivery_option: Optional[str] = None
+	category_fields: Optional[Dict] = None
+
+
+def legacy_read_products(csv_path: str) -> List[LegacyProduct]:
+	"""read_products() as it was before product_model.py, as the baseline."""
+	products: List[LegacyProduct] = []
+	with open(csv_path, newline='', encoding='utf-8') as f:
+		for row in csv.DictReader(f):
+			products.append(LegacyProduct(
+				title=(row.get('title') or '').strip(),
+				description=(row.get('description') or '').strip(),
+				price=str(row.get('price', '')).strip(),
+				category_path=(row.get('category_path') or '').strip() or None,
+				location=(row.get('location') or '').strip() or None,
+				photos=[p.strip() for p in (row.get('photos') or '').split(';') if p.strip()],
+				article_number=(row.get('article_number') or '').strip() or None,
+				condition=(row.get('condition') or '').strip() or None,
+				delivery_methods=[m.strip() for m in (row.get('delivery_methods') or '').split(',') if m.strip()],
+				material=(row.get('material') or '').strip() or None,
+				thickness=(row.get('thickness') or '').strip() or None,
+				total_surface=(row.get('total_surface') or '').strip() or None,
+				delivery_option=(row.get('delivery_option') or '').strip() or None,
+			))
+	return products
+
+
+def write_csv(path: str, rows: int) -> None:
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(CSV_COLUMNS)
+		for i in range(rows):
+			writer.writerow([
+				f"Isolatieplaat {i}",
+				"Restpartij isolatieplaten, ophalen in Utrecht of verzenden.",
+				str(10 + i % 490),
+				["Utrecht", "Amsterdam", "Rotterdam", "Eindhoven"][i % 4],
+				"",
+				f"ART{i:07d}",
+				"Gebruikt" if i % 3 else "Nieuw",
+				"",
+				"Hardschuim (Pir)",
+				"4 tot 8 cm",
+				"5 tot 10 m²",
+				"Ophalen of Verzenden",
+			])
+
+
+def measure(label: str, reader: Callable[[str], list], csv_path: str) -> Dict:
+	gc.collect()
+	start = time.perf_counter()
+	products = reader(csv_path)
+	elapsed = time.perf_counter() - start
+	del products
+
+	# Memory in a separate pass, tracemalloc slows parsing down
+	gc.collect()
+	tracemalloc.start()
+	products = reader(csv_path)
+	retained, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	count = len(products)
+	del products
+
+	result = {
+		"label": label,
+		"rows": count,
+		"seconds": round(elapsed, 3),
+		"rows_per_s": round(count / elapsed) if elapsed else 0,
+		"bytes_per_product": round(retained / count) if count else 0,
+	}
+	print(f"{label:<28} {count:>8} rijen  {elapsed:6.2f}s  {result['rows_per_s']:>8} rijen/s  {result['bytes_per_product']:>6} B/product")
+	return result
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark product parsing (CSV)")
+	parser.add_argument("--rows", type=int, default=100000)
+	parser.add_argument("--csv", help="Bestaand CSV bestand in plaats van gegenereerde rijen")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as workdir:
+		csv_path = args.csv
+		if not csv_path:
+			csv_path = os.path.join(workdir, "products.csv")
+			write_csv(csv_path, args.rows)
+		legacy = measure("dataclass (oud)", legacy_read_products, csv_path)
+		current = measure("product_model (__slots__)", read_products, csv_path)
+
+	if legacy["bytes_per_product"]:
+		saved = 100 * (1 - current["bytes_per_product"] / legacy["bytes_per_product"])
+		print(f"\nGeheugen per product: {saved:.0f}% minder")
+
+
+if __name__ == "__main__":
+	main()
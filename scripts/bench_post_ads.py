@@ -0,0 +1,248 @@
+"""
+Benchmark voor post_ads.run() tegen de lokale Marktplaats stand-in (mock_marktplaats.py).
+Meet advertenties per minuut, tijd per stap en geheugengebruik, zonder de live site te raken.
+
+Gebruik:
+	python scripts/bench_post_ads.py --ads 20 --latency-ms 50
+	python scripts/bench_post_ads.py --ads 50 --photos 3 --json bench_output.json
+	python scripts/bench_post_ads.py --ads 20 --form-fill evaluate   # invullen in één evaluate ter vergelijking
+	python scripts/bench_post_ads.py --ads 20 --no-form-reuse --no-asset-cache   # elke advertentie volledig laden
+	python scripts/bench_post_ads.py --ads 1000 --no-watchdog   # geheugen zonder recycling
+"""
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# post_ads reads these at import time
+os.environ.setdefault("MP_VERBOSE", "false")
+os.environ.setdefault("MP_FAST", "true")
+# Measure the automation itself, not the adaptive pacing (use --adaptive-rate to include it)
+os.environ.setdefault("MP_ADAPTIVE_RATE", "false")
+
+from mock_marktplaats import start_mock_server
+
+
+TIMED_STEPS = [
+	"click_place_ad",
+	"auto_suggest_category",
+	"choose_category",
+	"fill_basic_fields",
+	"upload_photos",
+	"select_free_bundle",
+	"publish_ad",
+]
+
+
+def _tiny_png(path: str) -> None:
+	def chunk(kind: bytes, data: bytes) -> bytes:
+		return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+	raw = b"\x00\xff\x00\x00"  # one red pixel
+	png = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+	png += chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+	with open(path, "wb") as f:
+		f.write(png)
+
+
+def write_fixture(workdir: str, ads: int, photos: int, category_path: str) -> str:
+	"""Write a products CSV plus photo folders under workdir/media; returns the CSV path."""
+	media_root = os.path.join(workdir, "media")
+	csv_path = os.path.join(workdir, "products.csv")
+	with open(csv_path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow([
+			"title", "description", "price", "category_path", "location", "photos", "article_number",
+			"condition", "delivery_methods", "material", "thickness", "total_surface", "delivery_option",
+		])
+		for i in range(ads):
+			article = f"bench-{i:05d}"
+			folder = os.path.join(media_root, article)
+			os.makedirs(folder, exist_ok=True)
+			for j in range(photos):
+				_tiny_png(os.path.join(folder, f"{j + 1}.png"))
+			writer.writerow([
+				f"Benchmark product {i}", "Testproduct voor de benchmark.", "99", category_path, "Utrecht", "",
+				article, "Gebruikt", "", "Hardschuim (Pir)", "4 tot 8 cm", "5 tot 10 m²", "Ophalen of Verzenden",
+			])
+	return csv_path
+
+
+def process_tree_rss_mb(root_pid: int) -> float:
+	"""Sum RSS of root_pid and all its descendants (Linux /proc); 0.0 elsewhere."""
+	if not os.path.isdir("/proc"):
+		return 0.0
+	children: Dict[int, List[int]] = defaultdict(list)
+	rss_pages: Dict[int, int] = {}
+	for entry in os.listdir("/proc"):
+		if not entry.isdigit():
+			continue
+		try:
+			with open(f"/proc/{entry}/stat") as f:
+				fields = f.read().rsplit(")", 1)[1].split()
+			children[int(fields[1])].append(int(entry))
+			rss_pages[int(entry)] = int(fields[21])
+		except (OSError, IndexError, ValueError):
+			continue
+	total, stack = 0, [root_pid]
+	while stack:
+		pid = stack.pop()
+		total += rss_pages.get(pid, 0)
+		stack.extend(children.get(pid, []))
+	return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def instrument(module, name: str, timings: Dict[str, List[float]]) -> None:
+	original = getattr(module, name)
+
+	@functools.wraps(original)
+	async def timed(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return await original(*args, **kwargs)
+		finally:
+			timings[name].append(time.perf_counter() - start)
+
+	setattr(module, name, timed)
+
+
+async def sample_memory(samples: List[float], interval: float, stop: asyncio.Event) -> None:
+	while not stop.is_set():
+		samples.append(process_tree_rss_mb(os.getpid()))
+		try:
+			await asyncio.wait_for(stop.wait(), timeout=interval)
+		except asyncio.TimeoutError:
+			pass
+
+
+async def bench(args) -> Dict:
+	# Read by post_ads at import time
+	os.environ["MP_FORM_FILL"] = args.form_fill
+	os.environ["MP_FORM_REUSE"] = "false" if args.no_form_reuse else "true"
+	os.environ["MP_ASSET_CACHE"] = "false" if args.no_asset_cache else "true"
+	os.environ["MP_WATCHDOG"] = "false" if args.no_watchdog else "true"
+	import post_ads
+	import scrape_ad_stats
+
+	server, base_url, state = start_mock_server(latency_ms=args.latency_ms, asset_kb=args.asset_kb)
+	workdir = tempfile.mkdtemp(prefix="mp_bench_")
+	csv_path = write_fixture(workdir, args.ads, args.photos, args.category_path)
+
+	os.environ.update({
+		"MARKTPLAATS_BASE_URL": base_url,
+		"USER_DATA_DIR": os.path.join(workdir, "user_data"),
+		"MEDIA_ROOT": os.path.join(workdir, "media"),
+		"ACTION_DELAY_MS": str(args.action_delay_ms),
+		"HEADLESS": "false" if args.headed else "true",
+		"MP_ADAPTIVE_RATE": "true" if args.adaptive_rate else "false",
+	})
+	# run() reloads .env with override=True, which would point it back at the live site
+	post_ads.load_dotenv = lambda *a, **k: None
+
+	timings: Dict[str, List[float]] = defaultdict(list)
+	for name in TIMED_STEPS:
+		instrument(post_ads, name, timings)
+	instrument(scrape_ad_stats, "scrape_ad_stats", timings)
+
+	memory: List[float] = []
+	stop = asyncio.Event()
+	sampler = asyncio.create_task(sample_memory(memory, 0.5, stop))
+	tracemalloc.start()
+	start = time.perf_counter()
+	try:
+		results = await post_ads.run(csv_path, None, None, False, False) or []
+	finally:
+		elapsed = time.perf_counter() - start
+		_, python_peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		stop.set()
+		await sampler
+		server.shutdown()
+
+	posted = sum(1 for r in results if r.get("status") == "completed")
+	steps = {}
+	for name, values in timings.items():
+		ordered = sorted(values)
+		steps[name] = {
+			"count": len(values),
+			"total_s": round(sum(values), 3),
+			"mean_ms": round(statistics.mean(values) * 1000, 1),
+			"p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 1),
+		}
+
+	return {
+		"ads": args.ads,
+		"posted": posted,
+		"latency_ms": args.latency_ms,
+		"form_fill": args.form_fill,
+		"form_reuse": not args.no_form_reuse,
+		"asset_cache": not args.no_asset_cache,
+		"watchdog": not args.no_watchdog,
+		"elapsed_s": round(elapsed, 2),
+		"ads_per_minute": round(posted / elapsed * 60, 2) if elapsed else 0,
+		"requests": state.requests,
+		"steps": steps,
+		"memory": {
+			"rss_first_mb": round(memory[0], 1) if memory else None,
+			"rss_peak_mb": round(max(memory), 1) if memory else None,
+			"rss_last_mb": round(memory[-1], 1) if memory else None,
+			"python_peak_mb": round(python_peak / (1024 * 1024), 2),
+		},
+	}
+
+
+def print_report(report: Dict) -> None:
+	print("=" * 70)
+	print(f"Advertenties: {report['posted']}/{report['ads']} geplaatst in {report['elapsed_s']}s "
+		  f"({report['ads_per_minute']} per minuut, latency {report['latency_ms']} ms, {report['requests']} requests, "
+		  f"invullen via {report['form_fill']}, formulier hergebruiken {'aan' if report['form_reuse'] else 'uit'}, "
+		  f"asset cache {'aan' if report['asset_cache'] else 'uit'}, watchdog {'aan' if report['watchdog'] else 'uit'})")
+	print("-" * 70)
+	print(f"{'stap':<24}{'n':>6}{'totaal s':>12}{'gem. ms':>12}{'p95 ms':>12}")
+	for name, step in sorted(report["steps"].items(), key=lambda kv: -kv[1]["total_s"]):
+		print(f"{name:<24}{step['count']:>6}{step['total_s']:>12}{step['mean_ms']:>12}{step['p95_ms']:>12}")
+	print("-" * 70)
+	memory = report["memory"]
+	print(f"Geheugen: RSS begin {memory['rss_first_mb']} MB, piek {memory['rss_peak_mb']} MB, laatste {memory['rss_last_mb']} MB, "
+		  f"Python piek {memory['python_peak_mb']} MB")
+	print("=" * 70)
+
+
+def parse_args():
+	parser = argparse.ArgumentParser(description="Benchmark post_ads.run() tegen een lokale Marktplaats stand-in")
+	parser.add_argument("--ads", type=int, default=10, help="Aantal advertenties om te plaatsen")
+	parser.add_argument("--photos", type=int, default=2, help="Foto's per advertentie")
+	parser.add_argument("--latency-ms", type=int, default=0, help="Vertraging per request van de mock server")
+	parser.add_argument("--asset-kb", type=int, default=256, help="Grootte van de nep JS bundle")
+	parser.add_argument("--action-delay-ms", type=int, default=0, help="ACTION_DELAY_MS voor de run")
+	parser.add_argument("--category-path", type=str, default="Huis en Inrichting > Banken")
+	parser.add_argument("--headed", action="store_true", help="Browser zichtbaar draaien")
+	parser.add_argument("--adaptive-rate", action="store_true", help="Adaptieve rate limiter aan laten (default uit)")
+	parser.add_argument("--form-fill", choices=("evaluate", "locators"), default="locators",
+						help="Formulier in één evaluate of per locator invullen (vergelijk fill_basic_fields)")
+	parser.add_argument("--no-form-reuse", action="store_true", help="Elk formulier met een volledige page.goto() openen")
+	parser.add_argument("--no-asset-cache", action="store_true", help="Statische bestanden niet uit de lokale cache serveren")
+	parser.add_argument("--no-watchdog", action="store_true", help="Pagina en context niet recyclen")
+	parser.add_argument("--json", type=str, default=None, help="Schrijf het rapport ook als JSON")
+	return parser.parse_args()
+
+
+if __name__ == "__main__":
+	args = parse_args()
+	report = asyncio.run(bench(args))
+	print_report(report)
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent=2)
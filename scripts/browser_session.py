@@ -0,0 +1,80 @@
+"""
+Inlogsessies als storage_state per account.
+In plaats van een zwaar persistent Chromium profiel per proces wordt de login van een
+account bewaard als storage_state JSON (cookies + localStorage) in zijn profielmap.
+Elk proces start één Chromium; elke lane of elk account krijgt daarop een eigen, goedkope
+browser.new_context(storage_state=...). N lanes starten kost zo één browserlaunch.
+
+Sessie vernieuwen of opnieuw inloggen:
+	python scripts/accounts.py refresh          # alle accounts, headless
+	python scripts/accounts.py login winkel     # zichtbaar inloggen, daarna opgeslagen
+
+MP_BROWSER_MODE=profile gebruikt weer het persistente profiel (launch_persistent_context).
+"""
+import asyncio
+import json
+import os
+import tempfile
+from typing import Dict
+
+from playwright.async_api import Browser, BrowserContext
+
+
+STORAGE_STATE_FILE = 'storage_state.json'
+VIEWPORT = {"width": 1280, "height": 900}
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+_browsers: Dict[int, Browser] = {}
+_launch_lock = asyncio.Lock()
+
+
+def browser_mode() -> str:
+	return os.getenv('MP_BROWSER_MODE', 'storage_state').lower()
+
+
+def storage_state_path(user_data_dir: str) -> str:
+	return os.path.join(user_data_dir, STORAGE_STATE_FILE)
+
+
+def uses_storage_state(user_data_dir: str) -> bool:
+	"""True when contexts for this profile come from its saved storage_state (and can be opened many times)."""
+	return browser_mode() != 'profile' and os.path.exists(storage_state_path(user_data_dir))
+
+
+async def shared_browser(p, headless: bool) -> Browser:
+	"""The process's one Chromium (per Playwright instance), launched on first use."""
+	async with _launch_lock:
+		browser = _browsers.get(id(p))
+		if browser is not None and browser.is_connected():
+			return browser
+		try:
+			browser = await p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+		except Exception as e:
+			if headless:
+				raise
+			print(f"[ERROR] Failed to launch browser: {e}")
+			print("[ERROR] Trying with headless=True as fallback...")
+			browser = await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+			print("[OK] Browser launched in headless mode (fallback)")
+		_browsers[id(p)] = browser
+		return browser
+
+
+async def new_session_context(p, user_data_dir: str, headless: bool) -> BrowserContext:
+	"""A fresh context on the shared browser, logged in through the account's storage_state."""
+	browser = await shared_browser(p, headless)
+	return await browser.new_context(storage_state=storage_state_path(user_data_dir), viewport=VIEWPORT)
+
+
+async def save_storage_state(context: BrowserContext, user_data_dir: str) -> str:
+	"""Write the context's cookies/localStorage as the account's storage_state (atomic, owner-only)."""
+	os.makedirs(user_data_dir, exist_ok=True)
+	path = storage_state_path(user_data_dir)
+	state = await context.storage_state()
+	fd, tmp = tempfile.mkstemp(dir=user_data_dir, prefix='.storage_state')
+	with os.fdopen(fd, 'w', encoding='utf-8') as f:
+		json.dump(state, f)
+	# The file holds session cookies
+	os.chmod(tmp, 0o600)
+	os.replace(tmp, path)
+	return path
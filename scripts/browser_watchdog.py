@@ -0,0 +1,242 @@
+"""
+Geheugenbewaking en recycling van pagina en browsercontext tijdens lange batches.
+Een pagina die honderden advertenties plaatst houdt geschiedenis, blob previews van
+uploads en service workers vast. De watchdog telt de advertenties en meet regelmatig de
+JS heap van de pagina (CDP) en het RSS geheugen van de browserprocessen. Na N advertenties,
+of boven een drempel, komt er een nieuwe pagina of een nieuwe context; de sessie gaat mee
+via storage_state, zodat ook een run van duizenden advertenties vlak blijft in geheugen.
+
+Instellen (0 zet een grens uit):
+	MP_WATCHDOG=false               # geen recycling
+	MP_RECYCLE_PAGE_ADS=50          # nieuwe pagina na zoveel advertenties
+	MP_RECYCLE_CONTEXT_ADS=500      # nieuwe context na zoveel advertenties
+	MP_RECYCLE_HEAP_MB=256          # nieuwe pagina boven deze JS heap
+	MP_RECYCLE_RSS_MB=2048          # nieuwe context boven dit RSS van de browser
+	MP_WATCHDOG_SAMPLE_EVERY=5      # meet het geheugen elke zoveel advertenties
+
+RSS komt van psutil als dat geïnstalleerd is, anders uit /proc (Linux); op macOS zonder
+psutil wordt alleen de JS heap gemeten.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from playwright.async_api import BrowserContext, Page
+
+try:
+	import psutil
+except ImportError:
+	psutil = None
+
+from browser_session import save_storage_state
+
+
+MB = 1024 * 1024
+# A threshold only triggers again after this many ads, so a browser whose baseline is
+# above the limit does not recycle on every ad
+MIN_ADS_BETWEEN_RECYCLES = 5
+
+
+def watchdog_enabled() -> bool:
+	return os.getenv('MP_WATCHDOG', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+@dataclass
+class WatchdogSettings:
+	page_ads: int = 50
+	context_ads: int = 500
+	heap_mb: float = 256
+	rss_mb: float = 2048
+	sample_every: int = 5
+
+	@classmethod
+	def from_env(cls) -> 'WatchdogSettings':
+		return cls(
+			page_ads=int(os.getenv('MP_RECYCLE_PAGE_ADS', '50')),
+			context_ads=int(os.getenv('MP_RECYCLE_CONTEXT_ADS', '500')),
+			heap_mb=float(os.getenv('MP_RECYCLE_HEAP_MB', '256')),
+			rss_mb=float(os.getenv('MP_RECYCLE_RSS_MB', '2048')),
+			sample_every=int(os.getenv('MP_WATCHDOG_SAMPLE_EVERY', '5')),
+		)
+
+
+def _proc_children() -> Dict[int, List[int]]:
+	children: Dict[int, List[int]] = {}
+	for name in os.listdir('/proc'):
+		if not name.isdigit():
+			continue
+		try:
+			with open(f'/proc/{name}/stat') as f:
+				# "pid (comm) state ppid ..."; comm may contain spaces
+				ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+		except (OSError, IndexError, ValueError):
+			continue
+		children.setdefault(ppid, []).append(int(name))
+	return children
+
+
+def browser_rss_mb() -> Optional[float]:
+	"""Resident memory of every process started under this one (Playwright driver and browser), in MB."""
+	if psutil is not None:
+		try:
+			return sum(child.memory_info().rss for child in psutil.Process().children(recursive=True)) / MB
+		except psutil.Error:
+			return None
+	if not os.path.isdir('/proc'):
+		return None
+	children = _proc_children()
+	page_size = os.sysconf('SC_PAGE_SIZE')
+	total = 0
+	stack = list(children.get(os.getpid(), []))
+	while stack:
+		pid = stack.pop()
+		stack.extend(children.get(pid, []))
+		try:
+			with open(f'/proc/{pid}/statm') as f:
+				total += int(f.read().split()[1]) * page_size
+		except (OSError, IndexError, ValueError):
+			continue
+	return total / MB
+
+
+async def js_heap_mb(page: Page) -> Optional[float]:
+	"""Used JS heap of the page through a short-lived CDP session (Chromium only)."""
+	try:
+		cdp = await page.context.new_cdp_session(page)
+		try:
+			heap = await cdp.send('Runtime.getHeapUsage')
+			return heap['usedSize'] / MB
+		finally:
+			await cdp.detach()
+	except Exception:
+		return None
+
+
+class BrowserWatchdog:
+	"""
+	Owns the posting page (and, with reopen, its context) of one lane. Call after_ad() after
+	every ad and keep posting on the page it returns. Without reopen the context is shared
+	with other lanes and only the page is recycled.
+	"""
+
+	def __init__(
+		self,
+		context: BrowserContext,
+		page: Page,
+		new_page: Callable[[BrowserContext], Awaitable[Page]],
+		reopen: Optional[Callable[[], Awaitable[BrowserContext]]] = None,
+		user_data_dir: Optional[str] = None,
+		settings: Optional[WatchdogSettings] = None,
+		label: str = '',
+	):
+		self.context = context
+		self.page = page
+		self.new_page = new_page
+		self.reopen = reopen
+		self.user_data_dir = user_data_dir
+		self.settings = settings or WatchdogSettings.from_env()
+		self.enabled = watchdog_enabled()
+		self.label = f"[{label}] " if label else ''
+		self.ads = 0
+		self.ads_on_page = 0
+		self.ads_on_context = 0
+		self.page_recycles = 0
+		self.context_recycles = 0
+		self.last_heap_mb: Optional[float] = None
+		self.last_rss_mb: Optional[float] = None
+		self.peak_heap_mb = 0.0
+		self.peak_rss_mb = 0.0
+		self.recycle_seconds = 0.0
+
+	async def sample(self) -> None:
+		self.last_heap_mb = await js_heap_mb(self.page)
+		self.last_rss_mb = browser_rss_mb()
+		self.peak_heap_mb = max(self.peak_heap_mb, self.last_heap_mb or 0)
+		self.peak_rss_mb = max(self.peak_rss_mb, self.last_rss_mb or 0)
+
+	def _over(self, value: Optional[float], limit: float, ads_since: int) -> bool:
+		return bool(limit) and value is not None and value > limit and ads_since >= MIN_ADS_BETWEEN_RECYCLES
+
+	async def after_ad(self, before_context_recycle: Optional[Callable[[], Awaitable[None]]] = None) -> Page:
+		"""
+		Count one ad, sample memory when due and recycle when a limit is hit. Returns the page to
+		post on next. before_context_recycle runs before the old context closes (drain its stats tab).
+		"""
+		self.ads += 1
+		self.ads_on_page += 1
+		self.ads_on_context += 1
+		if not self.enabled:
+			return self.page
+		settings = self.settings
+		if settings.sample_every and self.ads % settings.sample_every == 0:
+			await self.sample()
+
+		reason = None
+		if self.reopen is not None:
+			if settings.context_ads and self.ads_on_context >= settings.context_ads:
+				reason = f"{self.ads_on_context} advertenties op deze context"
+			elif self._over(self.last_rss_mb, settings.rss_mb, self.ads_on_context):
+				reason = f"browser RSS {self.last_rss_mb:.0f} MB"
+			if reason:
+				await self.recycle_context(reason, before_context_recycle)
+				return self.page
+		if settings.page_ads and self.ads_on_page >= settings.page_ads:
+			reason = f"{self.ads_on_page} advertenties op deze pagina"
+		elif self._over(self.last_heap_mb, settings.heap_mb, self.ads_on_page):
+			reason = f"JS heap {self.last_heap_mb:.0f} MB"
+		elif self.reopen is None and self._over(self.last_rss_mb, settings.rss_mb, self.ads_on_page):
+			reason = f"browser RSS {self.last_rss_mb:.0f} MB"
+		if reason:
+			await self.recycle_page(reason)
+		return self.page
+
+	async def recycle_page(self, reason: str) -> None:
+		started = time.perf_counter()
+		old = self.page
+		self.page = await self.new_page(self.context)
+		try:
+			await old.close()
+		except Exception:
+			pass
+		self.ads_on_page = 0
+		self.page_recycles += 1
+		self.last_heap_mb = None
+		self.recycle_seconds += time.perf_counter() - started
+		print(f"{self.label}Nieuwe pagina ({reason})")
+
+	async def recycle_context(self, reason: str, before: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+		started = time.perf_counter()
+		if before is not None:
+			await before()
+		# Carry the session over: the next context starts from the current cookies
+		if self.user_data_dir:
+			try:
+				await save_storage_state(self.context, self.user_data_dir)
+			except Exception as e:
+				print(f"[WARNING] {self.label}Sessie niet opgeslagen voor recycling: {e}")
+		try:
+			await self.context.close()
+		except Exception:
+			pass
+		self.context = await self.reopen()
+		self.page = await self.new_page(self.context)
+		self.ads_on_page = 0
+		self.ads_on_context = 0
+		self.context_recycles += 1
+		self.last_heap_mb = None
+		self.last_rss_mb = None
+		self.recycle_seconds += time.perf_counter() - started
+		print(f"{self.label}Nieuwe browsercontext ({reason})")
+
+	def snapshot(self) -> Dict:
+		return {
+			'ads': self.ads,
+			'page_recycles': self.page_recycles,
+			'context_recycles': self.context_recycles,
+			'heap_mb': round(self.last_heap_mb, 1) if self.last_heap_mb is not None else None,
+			'rss_mb': round(self.last_rss_mb, 1) if self.last_rss_mb is not None else None,
+			'peak_heap_mb': round(self.peak_heap_mb, 1),
+			'peak_rss_mb': round(self.peak_rss_mb, 1),
+			'recycle_seconds': round(self.recycle_seconds, 2),
+		}
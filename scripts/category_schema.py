@@ -0,0 +1,243 @@
+"""
+Attribuutschema per Marktplaats categorie.
+De scraper opent per categorie het plaats-formulier en legt alle attribuutvelden vast
+(exacte name, type, toegestane opties met label en value). Het schema wordt bij de
+categorie in de database opgeslagen en komt via de pending/claim API mee met elk
+product, zodat fill_category_fields() direct het juiste veld vult en foute
+category_fields al bij het inlezen worden afgewezen.
+
+Gebruik:
+	python scripts/category_schema.py scrape                      # alle categorieën zonder schema
+	python scripts/category_schema.py scrape --category "Huis en Inrichting > Banken"
+	python scripts/category_schema.py scrape --all --limit 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Controls that are filled by fill_basic_fields(), not category attributes
+BASIC_FIELD_NAMES = {'title', 'description', 'price.value', 'location', 'category', 'postcode', 'deliveryMethod'}
+
+SCRAPE_FORM_JS = """
+(basicNames) => {
+	const labelFor = (el) => {
+		if (el.id) {
+			const label = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+			if (label) return label.textContent.trim();
+		}
+		const wrapping = el.closest('label');
+		if (wrapping) return wrapping.textContent.trim();
+		const fieldset = el.closest('fieldset');
+		const legend = fieldset && fieldset.querySelector('legend');
+		return legend ? legend.textContent.trim() : null;
+	};
+	const fields = {};
+	for (const el of document.querySelectorAll('select[name], input[name], textarea[name]')) {
+		const name = el.getAttribute('name');
+		const inputType = (el.getAttribute('type') || '').toLowerCase();
+		if (basicNames.includes(name) || ['hidden', 'file', 'submit', 'button', 'search'].includes(inputType)) continue;
+		if (el.tagName === 'SELECT') {
+			fields[name] = {
+				type: 'select',
+				label: labelFor(el),
+				options: [...el.options].filter(o => o.value !== '').map(o => ({ label: o.textContent.trim(), value: o.value })),
+			};
+		} else if (inputType === 'radio' || inputType === 'checkbox') {
+			const field = fields[name] || (fields[name] = { type: inputType, label: null, options: [] });
+			const own = labelFor(el);
+			field.options.push({ label: own || el.value, value: el.value });
+			const fieldset = el.closest('fieldset');
+			const legend = fieldset && fieldset.querySelector('legend');
+			if (!field.label && legend) field.label = legend.textContent.trim();
+		} else {
+			fields[name] = { type: el.tagName === 'TEXTAREA' ? 'textarea' : (inputType || 'text'), label: labelFor(el) };
+		}
+	}
+	return fields;
+}
+"""
+
+
+def attribute_key(name: str) -> str:
+	"""'singleSelectAttribute[material]' / 'SINGLESELECTATTRIBUTE[MATERIAL]' / 'material' -> 'material'"""
+	start, end = name.find('['), name.find(']')
+	if 0 <= start < end:
+		name = name[start + 1:end]
+	return name.strip().lower()
+
+
+class CategorySchemaError(ValueError):
+	pass
+
+
+class CategorySchema:
+	"""The attribute fields of one category's form, with lookups by exact name and by attribute key."""
+
+	__slots__ = ('fields', '_by_lower', '_by_attribute')
+
+	def __init__(self, fields: Dict[str, Dict]):
+		self.fields = fields
+		self._by_lower = {name.lower(): name for name in fields}
+		self._by_attribute: Dict[str, str] = {}
+		for name in fields:
+			self._by_attribute.setdefault(attribute_key(name), name)
+
+	def field_name(self, key: str) -> Optional[str]:
+		if key in self.fields:
+			return key
+		return self._by_lower.get(key.lower()) or self._by_attribute.get(attribute_key(key))
+
+	@staticmethod
+	def _option_value(spec: Dict, value: str) -> Optional[str]:
+		options = spec.get('options') or []
+		lowered = value.lower()
+		for option in options:
+			if option.get('value') == value or option.get('label') == value:
+				return option.get('value')
+		for option in options:
+			if str(option.get('value', '')).lower() == lowered or str(option.get('label', '')).lower() == lowered:
+				return option.get('value')
+		return None
+
+	def resolve(self, category_fields: Dict[str, Any]) -> Tuple[List[Tuple[str, str, Any]], Dict[str, Any]]:
+		"""
+		Map category_fields onto the form: returns ([(control name, type, value)], unknown fields).
+		Select/radio values become the option value; raises CategorySchemaError for a value
+		the control does not offer. Fields the schema does not know are returned as-is.
+		"""
+		resolved: List[Tuple[str, str, Any]] = []
+		unknown: Dict[str, Any] = {}
+		errors: List[str] = []
+		for key, value in category_fields.items():
+			if value is None or value == '':
+				continue
+			name = self.field_name(key)
+			if name is None:
+				unknown[key] = value
+				continue
+			spec = self.fields[name]
+			kind = spec.get('type', 'text')
+			if kind in ('select', 'radio'):
+				option = self._option_value(spec, str(value).strip())
+				if option is None:
+					allowed = ', '.join(o.get('label') or o.get('value') for o in (spec.get('options') or [])[:10])
+					errors.append(f"{key}: '{value}' is geen optie ({allowed})")
+					continue
+				resolved.append((name, kind, option))
+			elif kind == 'checkbox':
+				if isinstance(value, str):
+					value = value.strip().lower() in ('1', 'true', 'ja', 'yes', 'on')
+				resolved.append((name, kind, bool(value)))
+			else:
+				resolved.append((name, kind, str(value).strip()))
+		if errors:
+			raise CategorySchemaError('; '.join(errors))
+		return resolved, unknown
+
+
+_schema_cache: Dict[Tuple[Optional[str], str], CategorySchema] = {}
+
+
+def schema_for(category_path: Optional[str], raw: Any) -> Optional[CategorySchema]:
+	"""
+	Parsed schema for a category, cached so all products of one category share it.
+	raw is the stored schema ({'fields': {...}, 'scrapedAt': ...}) as sent by the API.
+	"""
+	if not isinstance(raw, dict) or not isinstance(raw.get('fields'), dict) or not raw['fields']:
+		return None
+	# A re-scraped schema has a new timestamp, so it replaces the cached one
+	key = (category_path, str(raw.get('scrapedAt')))
+	schema = _schema_cache.get(key)
+	if schema is None:
+		schema = _schema_cache[key] = CategorySchema(raw['fields'])
+	return schema
+
+
+async def scrape_form_schema(page) -> Dict:
+	"""Read the attribute fields of the ad form that is currently open."""
+	fields = await page.evaluate(SCRAPE_FORM_JS, sorted(BASIC_FIELD_NAMES))
+	return {'fields': fields, 'scrapedAt': datetime.now(timezone.utc).isoformat()}
+
+
+def _leaf_categories(tree: List[Dict]) -> List[Dict]:
+	leaves: List[Dict] = []
+	stack = list(tree)
+	while stack:
+		node = stack.pop()
+		children = node.get('children') or []
+		if children:
+			stack.extend(children)
+		else:
+			leaves.append(node)
+	return sorted(leaves, key=lambda c: c.get('path') or '')
+
+
+async def scrape_schemas(category_paths: Optional[List[str]], include_existing: bool, limit: Optional[int]) -> None:
+	sys.path.insert(0, os.path.dirname(__file__))
+	from dotenv import load_dotenv
+	from playwright.async_api import async_playwright
+	from api_client import AsyncApiClient
+	from post_ads import click_place_ad, ensure_logged_in, launch_browser, new_worker_page, select_product_category
+	from rate_limiter import get_limiter, raise_on_captcha
+
+	load_dotenv()
+	base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+	user_data_dir = os.getenv('USER_DATA_DIR', './user_data')
+	client = AsyncApiClient()
+	try:
+		if category_paths:
+			targets = [{'path': path} for path in category_paths]
+		else:
+			targets = [
+				c for c in _leaf_categories(await client.get_json('/api/categories'))
+				if include_existing or not c.get('attributeSchema')
+			]
+		if limit:
+			targets = targets[:limit]
+		print(f"[OK] {len(targets)} categorie(ën) te scannen")
+
+		limiter = get_limiter(os.path.abspath(user_data_dir))
+		pending: List[Dict] = []
+		async with async_playwright() as p:
+			browser = await launch_browser(p, user_data_dir)
+			page = await new_worker_page(browser)
+			await ensure_logged_in(page, base_url, user_data_dir)
+			for index, category in enumerate(targets, 1):
+				path = category['path']
+				try:
+					async with limiter.slot('navigation'):
+						await click_place_ad(page, base_url)
+						await raise_on_captcha(page)
+					await select_product_category(page, path, path.split(' > ')[-1])
+					schema = await scrape_form_schema(page)
+					pending.append({'id': category.get('id'), 'path': path, 'schema': schema})
+					print(f"[OK] {index}/{len(targets)} {path}: {len(schema['fields'])} veld(en)")
+				except Exception as e:
+					print(f"[ERROR] {index}/{len(targets)} {path}: {e}")
+				if len(pending) >= 25:
+					await client.post_json('/api/categories/schema', {'schemas': pending}, idempotent=True)
+					pending = []
+			if pending:
+				await client.post_json('/api/categories/schema', {'schemas': pending}, idempotent=True)
+			await browser.close()
+	finally:
+		await client.aclose()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Scan de attribuutvelden van Marktplaats categorieën")
+	sub = parser.add_subparsers(dest="command", required=True)
+	scrape = sub.add_parser("scrape", help="Open per categorie het plaats-formulier en sla het schema op")
+	scrape.add_argument("--category", action="append", help="Categoriepad (meerdere keren mogelijk)")
+	scrape.add_argument("--all", action="store_true", help="Ook categorieën die al een schema hebben")
+	scrape.add_argument("--limit", type=int, default=None)
+	args = parser.parse_args()
+	asyncio.run(scrape_schemas(args.category, args.all, args.limit))
+
+
+if __name__ == "__main__":
+	main()
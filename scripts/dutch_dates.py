@@ -0,0 +1,130 @@
+"""
+Parser voor Nederlandse datums zoals Marktplaats ze toont.
+Ondersteunt o.a. "Sinds 6 nov '25", "6 november 2025", "12 mrt", "vandaag",
+"gisteren", "eergisteren", "3 dagen geleden", "een week" en "2 uur geleden".
+Resultaat is een ISO 8601 timestamp (lokale tijdzone) of None.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+MONTHS = {
+	'jan': 1, 'januari': 1,
+	'feb': 2, 'febr': 2, 'februari': 2,
+	'mrt': 3, 'maa': 3, 'maart': 3,
+	'apr': 4, 'april': 4,
+	'mei': 5,
+	'jun': 6, 'juni': 6,
+	'jul': 7, 'juli': 7,
+	'aug': 8, 'augustus': 8,
+	'sep': 9, 'sept': 9, 'september': 9,
+	'okt': 10, 'oktober': 10,
+	'nov': 11, 'november': 11,
+	'dec': 12, 'december': 12,
+}
+
+DAY_WORDS = {
+	'vandaag': 0,
+	'gisteren': 1,
+	'eergisteren': 2,
+}
+
+UNIT_DELTAS = {
+	'minuut': timedelta(minutes=1), 'minuten': timedelta(minutes=1), 'min': timedelta(minutes=1),
+	'uur': timedelta(hours=1), 'uren': timedelta(hours=1),
+	'dag': timedelta(days=1), 'dagen': timedelta(days=1),
+	'week': timedelta(weeks=1), 'weken': timedelta(weeks=1),
+}
+
+_PREFIX_RE = re.compile(r"^(?:sinds|geplaatst(?:\s+op)?|op)\s+", re.IGNORECASE)
+_ABSOLUTE_RE = re.compile(r"^(\d{1,2})\s+([a-z]+)\.?(?:\s+'?(\d{2}|\d{4}))?(?:[\s,]+(\d{1,2})[:.](\d{2}))?$")
+_NUMERIC_RE = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})$")
+_DAY_WORD_RE = re.compile(r"^(vandaag|gisteren|eergisteren)(?:[\s,]+(?:om\s+)?(\d{1,2})[:.](\d{2}))?$")
+_RELATIVE_RE = re.compile(r"^(\d+|een|één)\s+(minuut|minuten|min|uur|uren|dag|dagen|week|weken)(?:\s+geleden)?$")
+
+
+def _normalize(text: str) -> str:
+	text = ' '.join(text.replace('’', "'").split()).strip().lower()
+	return _PREFIX_RE.sub('', text)
+
+
+def _expand_year(year: str) -> int:
+	value = int(year)
+	return 2000 + value if value < 100 else value
+
+
+def _parse_normalized(text: str, now: datetime) -> Optional[datetime]:
+	midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+	match = _DAY_WORD_RE.match(text)
+	if match:
+		day = midnight - timedelta(days=DAY_WORDS[match.group(1)])
+		if match.group(2):
+			day = day.replace(hour=int(match.group(2)), minute=int(match.group(3)))
+		return day
+
+	match = _RELATIVE_RE.match(text)
+	if match:
+		amount = 1 if match.group(1) in ('een', 'één') else int(match.group(1))
+		delta = UNIT_DELTAS[match.group(2)] * amount
+		# Day granularity and up is shown per calendar day, so anchor to midnight
+		return (midnight if delta >= timedelta(days=1) else now) - delta
+
+	match = _ABSOLUTE_RE.match(text)
+	if match:
+		month = MONTHS.get(match.group(2))
+		if not month:
+			return None
+		day = int(match.group(1))
+		if match.group(3):
+			year = _expand_year(match.group(3))
+		else:
+			# Without a year Marktplaats means the most recent occurrence
+			year = now.year if (month, day) <= (now.month, now.day) else now.year - 1
+		hour = int(match.group(4)) if match.group(4) else 0
+		minute = int(match.group(5)) if match.group(5) else 0
+		try:
+			return midnight.replace(year=year, month=month, day=day, hour=hour, minute=minute)
+		except ValueError:
+			return None
+
+	match = _NUMERIC_RE.match(text)
+	if match:
+		try:
+			return midnight.replace(
+				year=_expand_year(match.group(3)), month=int(match.group(2)), day=int(match.group(1))
+			)
+		except ValueError:
+			return None
+
+	return None
+
+
+def parse_dutch_date(text: Optional[str], now: Optional[datetime] = None) -> Optional[str]:
+	"""Parse a single Dutch date string into an ISO timestamp, or None if unrecognised."""
+	if not text:
+		return None
+	now = now or datetime.now().astimezone()
+	parsed = _parse_normalized(_normalize(text), now)
+	return parsed.isoformat() if parsed else None
+
+
+def parse_dutch_dates(texts: Iterable[Optional[str]], now: Optional[datetime] = None) -> List[Optional[str]]:
+	"""
+	Parse many date strings at once (e.g. all ads of a stats refresh).
+	Uses a single reference time and parses each distinct string only once.
+	"""
+	now = now or datetime.now().astimezone()
+	cache: Dict[str, Optional[str]] = {}
+	results: List[Optional[str]] = []
+	for text in texts:
+		if not text:
+			results.append(None)
+			continue
+		key = _normalize(text)
+		if key not in cache:
+			parsed = _parse_normalized(key, now)
+			cache[key] = parsed.isoformat() if parsed else None
+		results.append(cache[key])
+	return results
@@ -0,0 +1,195 @@
+"""
+Formulieren invullen in één page.evaluate.
+De gewenste eindtoestand van het formulier wordt in Python opgebouwd als lijst
+operaties (veld zoeken, waarde zetten); de browser past ze in één keer toe met de
+input/change events die het React formulier nodig heeft, en één tweede evaluate
+leest alles terug ter controle. Velden die niet kloppen meldt fill_form() terug,
+zodat de aanroeper die alsnog per locator kan invullen.
+
+Operatie (dict):
+	key       naam voor logging / fallback
+	kind      text | richtext | select | radio | checkbox
+	find      {'css': [...], 'label': 'Titel', 'placeholder': 'Titel'}, in die volgorde geprobeerd
+	value     waarde (text/richtext), option label/value (select/radio), bool (checkbox)
+	match     'label' (default) of 'value' voor select/radio
+	if_empty  alleen invullen als het veld nog leeg is
+"""
+from typing import Dict, List, Set
+
+
+_FIND_JS = """
+const findControl = (find) => {
+	for (const css of find.css || []) {
+		const el = document.querySelector(css);
+		if (el) return el;
+	}
+	const controlOf = (label) => label.htmlFor
+		? document.getElementById(label.htmlFor)
+		: label.querySelector('input, textarea, select, [contenteditable]');
+	if (find.label) {
+		const text = find.label.toLowerCase();
+		for (const label of document.querySelectorAll('label')) {
+			if (label.textContent.toLowerCase().includes(text)) {
+				const el = controlOf(label);
+				if (el) return el;
+			}
+		}
+		for (const el of document.querySelectorAll('[aria-label]')) {
+			if (el.getAttribute('aria-label').toLowerCase().includes(text)) return el;
+		}
+	}
+	if (find.placeholder) {
+		const text = find.placeholder.toLowerCase();
+		for (const el of document.querySelectorAll('[placeholder]')) {
+			if (el.getAttribute('placeholder').toLowerCase().includes(text)) return el;
+		}
+	}
+	return null;
+};
+const labelText = (el) => {
+	const label = (el.id && document.querySelector(`label[for="${CSS.escape(el.id)}"]`)) || el.closest('label');
+	return label ? label.textContent.trim() : '';
+};
+const groupOf = (el) => el.name ? [...document.querySelectorAll(`input[name="${CSS.escape(el.name)}"]`)] : [el];
+const pickOption = (candidates, op, textOf) => {
+	const wanted = String(op.value);
+	const byValue = op.match === 'value';
+	const text = (c) => byValue ? c.value : textOf(c);
+	return candidates.find(c => text(c) === wanted)
+		|| candidates.find(c => text(c).toLowerCase() === wanted.toLowerCase())
+		|| null;
+};
+"""
+
+FILL_FORM_JS = "(ops) => {" + _FIND_JS + """
+	const setNative = (el, value) => {
+		const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+			: el instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+		Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+	};
+	const fire = (el) => {
+		el.dispatchEvent(new Event('input', { bubbles: true }));
+		el.dispatchEvent(new Event('change', { bubbles: true }));
+		el.dispatchEvent(new FocusEvent('focusout', { bubbles: true }));
+	};
+	const results = {};
+	for (const op of ops) {
+		const el = findControl(op.find);
+		if (!el) { results[op.key] = 'missing'; continue; }
+		try {
+			if (op.kind === 'richtext' || el.isContentEditable) {
+				el.focus();
+				const range = document.createRange();
+				range.selectNodeContents(el);
+				const selection = window.getSelection();
+				selection.removeAllRanges();
+				selection.addRange(range);
+				if (!document.execCommand('insertText', false, op.value)) {
+					el.textContent = op.value;
+					el.dispatchEvent(new InputEvent('input', { bubbles: true, inputType: 'insertText', data: op.value }));
+				}
+				el.blur();
+			} else if (op.kind === 'select') {
+				const option = pickOption([...el.options], op, o => o.textContent.trim());
+				if (!option) { results[op.key] = 'no-option'; continue; }
+				setNative(el, option.value);
+				fire(el);
+			} else if (op.kind === 'radio') {
+				const radios = groupOf(el);
+				// Without a matching label the first option is taken, as the locator path did
+				const radio = pickOption(radios, op, labelText) || radios[0];
+				if (!radio.checked) radio.click();
+			} else if (op.kind === 'checkbox') {
+				if (el.checked !== Boolean(op.value)) el.click();
+			} else {
+				if (op.if_empty && el.value) { results[op.key] = 'kept'; continue; }
+				el.focus();
+				setNative(el, String(op.value));
+				fire(el);
+			}
+			results[op.key] = 'set';
+		} catch (e) {
+			results[op.key] = 'error: ' + e.message;
+		}
+	}
+	return results;
+}"""
+
+READ_FORM_JS = "(ops) => {" + _FIND_JS + """
+	const values = {};
+	for (const op of ops) {
+		const el = findControl(op.find);
+		if (!el) { values[op.key] = null; continue; }
+		if (op.kind === 'richtext' || el.isContentEditable) {
+			values[op.key] = el.innerText.trim();
+		} else if (op.kind === 'select') {
+			const option = el.options[el.selectedIndex];
+			values[op.key] = option ? { value: option.value, label: option.textContent.trim() } : null;
+		} else if (op.kind === 'radio') {
+			const checked = groupOf(el).find(r => r.checked);
+			values[op.key] = checked ? { value: checked.value, label: labelText(checked) } : null;
+		} else if (op.kind === 'checkbox') {
+			values[op.key] = el.checked;
+		} else {
+			values[op.key] = el.value;
+		}
+	}
+	return values;
+}"""
+
+
+def _digits(value: str) -> str:
+	return ''.join(ch for ch in value if ch.isdigit())
+
+
+def _verified(op: Dict, actual) -> bool:
+	kind = op['kind']
+	expected = op['value']
+	if actual is None:
+		return False
+	if kind in ('select', 'radio'):
+		if kind == 'radio' and op.get('any_option'):
+			return True
+		field = 'value' if op.get('match') == 'value' else 'label'
+		return str(actual.get(field, '')).lower() == str(expected).lower()
+	if kind == 'checkbox':
+		return actual is bool(expected)
+	if kind == 'richtext':
+		# Editors may normalize whitespace/newlines
+		return ' '.join(str(expected).split())[:40] in ' '.join(str(actual).split())
+	if op.get('if_empty'):
+		return bool(actual)
+	if op.get('numeric'):
+		# The site formats prices ("99" -> "99,00"); compare the digits that were typed
+		return _digits(str(actual)).startswith(_digits(str(expected)))
+	return str(actual).strip() == str(expected).strip()
+
+
+async def fill_form(page, ops: List[Dict], log=None) -> Set[str]:
+	"""
+	Apply all operations in one evaluate and verify them in one readback.
+	Returns the keys that are not in the expected state; controls that are simply
+	absent from this form are only reported for ops with required=True.
+	"""
+	if not ops:
+		return set()
+	outcome: Dict[str, str] = await page.evaluate(FILL_FORM_JS, ops)
+	actual = await page.evaluate(READ_FORM_JS, ops)
+	failed: Set[str] = set()
+	for op in ops:
+		key = op['key']
+		status = outcome.get(key)
+		if status == 'missing':
+			if op.get('required'):
+				failed.add(key)
+			elif log:
+				log(f"  [SKIP] {key}: veld niet op dit formulier")
+			continue
+		if status in ('set', 'kept') and _verified(op, actual.get(key)):
+			if log:
+				log(f"  [OK] {key}: {op['value']}")
+			continue
+		if log:
+			log(f"  [WARNING] {key}: {status}, teruggelezen {actual.get(key)!r}")
+		failed.add(key)
+	return failed
@@ -0,0 +1,223 @@
+"""
+Record/replay van Marktplaats sessies als HAR archief, zodat de scrapers offline
+(en deterministisch) getest en gebenchmarkt kunnen worden.
+
+Opnemen (live, met ingelogd profiel uit USER_DATA_DIR):
+	python scripts/har_replay.py record --scraper ad_stats --url https://www.marktplaats.nl/v/.../a123-...
+	python scripts/har_replay.py record --scraper user_ads --url https://www.marktplaats.nl/u/naam/123/
+
+Afspelen (offline via page.route_from_har):
+	python scripts/har_replay.py replay --name ad_stats_a123
+
+Benchmark over alle opnames in de corpus map:
+	python scripts/har_replay.py bench --repeat 3
+
+De categorie scrapers gebruiken dezelfde opnames via MP_HAR_MODE=record|replay en MP_HAR_NAME.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from ad_capture import ad_id_from_url
+
+DEFAULT_HAR_DIR = os.path.join(os.path.dirname(__file__), "..", "fixtures", "har")
+
+SCRAPERS = ("ad_stats", "user_ads")
+
+# Fields that must survive a replay unchanged; anything else may legitimately differ
+COMPARE_FIELDS = {
+	"ad_stats": ("ad_id", "views", "saves", "posted_at_raw"),
+	"user_ads": ("ad_id", "views", "saves", "posted_at_raw", "title"),
+}
+
+
+def har_dir() -> str:
+	return os.path.abspath(os.getenv("MP_HAR_DIR", DEFAULT_HAR_DIR))
+
+
+def har_paths(name: str):
+	base = os.path.join(har_dir(), name)
+	return f"{base}.har", f"{base}.json"
+
+
+async def apply_har_mode(target, name: str, mode: Optional[str] = None) -> Optional[str]:
+	"""
+	Attach HAR record/replay routing to a page or browser context.
+	mode defaults to MP_HAR_MODE ("record", "replay" or empty for live).
+	Recording is flushed to disk when the context closes.
+	"""
+	mode = (mode or os.getenv("MP_HAR_MODE", "")).lower()
+	if mode not in ("record", "replay"):
+		return None
+	har_path, _ = har_paths(name)
+	if mode == "record":
+		os.makedirs(os.path.dirname(har_path), exist_ok=True)
+		await target.route_from_har(har_path, update=True, update_content="embed")
+	else:
+		if not os.path.exists(har_path):
+			raise FileNotFoundError(f"HAR opname niet gevonden: {har_path}")
+		await target.route_from_har(har_path, not_found="abort")
+	return har_path
+
+
+async def run_scraper(page, scraper: str, url: str):
+	sys.path.insert(0, os.path.dirname(__file__))
+	if scraper == "ad_stats":
+		from scrape_ad_stats import scrape_ad_stats
+		return await scrape_ad_stats(page, url)
+	from scrape_user_ads import scrape_user_ads
+	return await scrape_user_ads(page, url)
+
+
+def default_name(scraper: str, url: str) -> str:
+	# Live ad ids are m123..., older URLs and the stand-in use a123...
+	ad_id = ad_id_from_url(url)
+	match = None if ad_id else re.search(r"/u/([^/]+)", url)
+	return f"{scraper}_{ad_id or (match.group(1) if match else datetime.now().strftime('%Y%m%d%H%M%S'))}"
+
+
+async def record(scraper: str, url: str, name: Optional[str]) -> str:
+	from dotenv import load_dotenv
+	from playwright.async_api import async_playwright
+
+	load_dotenv()
+	name = name or default_name(scraper, url)
+	user_data_dir = os.getenv("USER_DATA_DIR", "./user_data")
+	os.makedirs(user_data_dir, exist_ok=True)
+
+	async with async_playwright() as p:
+		context = await p.chromium.launch_persistent_context(
+			user_data_dir=user_data_dir,
+			headless=os.getenv("HEADLESS", "true").lower() in ("1", "true", "yes", "on"),
+			viewport={"width": 1280, "height": 900},
+			args=["--disable-blink-features=AutomationControlled"],
+		)
+		har_path = await apply_har_mode(context, name, "record")
+		page = await context.new_page()
+		result = await run_scraper(page, scraper, url)
+		await context.close()
+
+	_, meta_path = har_paths(name)
+	with open(meta_path, "w", encoding="utf-8") as f:
+		json.dump({
+			"scraper": scraper,
+			"url": url,
+			"recordedAt": datetime.now().isoformat(),
+			"result": result,
+		}, f, indent=2, ensure_ascii=False)
+	print(f"[OK] Opname opgeslagen: {har_path}")
+	return name
+
+
+async def replay(browser, name: str):
+	"""Replay one recording in a fresh context; returns (result, seconds, meta)."""
+	_, meta_path = har_paths(name)
+	with open(meta_path, encoding="utf-8") as f:
+		meta = json.load(f)
+	context = await browser.new_context(viewport={"width": 1280, "height": 900})
+	try:
+		await apply_har_mode(context, name, "replay")
+		page = await context.new_page()
+		start = time.perf_counter()
+		result = await run_scraper(page, meta["scraper"], meta["url"])
+		return result, time.perf_counter() - start, meta
+	finally:
+		await context.close()
+
+
+def diff_results(scraper: str, expected, actual) -> List[str]:
+	fields = COMPARE_FIELDS[scraper]
+	if scraper == "ad_stats":
+		expected, actual = [expected or {}], [actual or {}]
+	expected, actual = expected or [], actual or []
+	problems = []
+	if len(expected) != len(actual):
+		problems.append(f"aantal resultaten {len(actual)} != {len(expected)}")
+	for i, (exp, act) in enumerate(zip(expected, actual)):
+		for field in fields:
+			if field in exp and exp.get(field) != act.get(field):
+				problems.append(f"[{i}] {field}: {act.get(field)!r} != {exp.get(field)!r}")
+	return problems
+
+
+def list_recordings() -> List[str]:
+	if not os.path.isdir(har_dir()):
+		return []
+	return sorted(name[:-4] for name in os.listdir(har_dir())
+		if name.endswith(".har") and os.path.exists(os.path.join(har_dir(), name[:-4] + ".json")))
+
+
+async def bench(names: List[str], repeat: int) -> int:
+	from playwright.async_api import async_playwright
+
+	if not names:
+		print(f"Geen opnames gevonden in {har_dir()}")
+		return 1
+	failures = 0
+	async with async_playwright() as p:
+		browser = await p.chromium.launch(headless=True)
+		print(f"{'opname':<40}{'gem. ms':>10}{'min ms':>10}{'status':>10}")
+		for name in names:
+			timings, problems = [], []
+			for _ in range(repeat):
+				result, seconds, meta = await replay(browser, name)
+				timings.append(seconds * 1000)
+				problems = diff_results(meta["scraper"], meta.get("result"), result)
+			status = "OK" if not problems else "AFWIJKING"
+			failures += bool(problems)
+			print(f"{name:<40}{statistics.mean(timings):>10.1f}{min(timings):>10.1f}{status:>10}")
+			for problem in problems[:10]:
+				print(f"    {problem}")
+		await browser.close()
+	return 1 if failures else 0
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="HAR record/replay voor de Marktplaats scrapers")
+	sub = parser.add_subparsers(dest="command", required=True)
+
+	rec = sub.add_parser("record", help="Neem een live sessie op")
+	rec.add_argument("--scraper", choices=SCRAPERS, required=True)
+	rec.add_argument("--url", required=True)
+	rec.add_argument("--name", default=None, help="Naam van de opname (default afgeleid van de URL)")
+
+	rep = sub.add_parser("replay", help="Speel een opname offline af en toon het resultaat")
+	rep.add_argument("--name", required=True)
+
+	ben = sub.add_parser("bench", help="Time extractie over alle opnames en vergelijk met de opgenomen resultaten")
+	ben.add_argument("--name", action="append", help="Beperk tot deze opname(s)")
+	ben.add_argument("--repeat", type=int, default=3)
+
+	args = parser.parse_args()
+	# Replay serves pages instantly, so the scrapers' render waits are pure overhead
+	if args.command in ("replay", "bench"):
+		os.environ.setdefault("MP_SCRAPE_SETTLE_MS", "0")
+
+	if args.command == "record":
+		asyncio.run(record(args.scraper, args.url, args.name))
+	elif args.command == "replay":
+		async def _replay_one():
+			from playwright.async_api import async_playwright
+			async with async_playwright() as p:
+				browser = await p.chromium.launch(headless=True)
+				result, seconds, meta = await replay(browser, args.name)
+				await browser.close()
+			print(json.dumps(result, indent=2, ensure_ascii=False))
+			problems = diff_results(meta["scraper"], meta.get("result"), result)
+			print(f"[{'OK' if not problems else 'AFWIJKING'}] {seconds * 1000:.1f} ms")
+			for problem in problems:
+				print(f"    {problem}")
+		asyncio.run(_replay_one())
+	else:
+		sys.exit(asyncio.run(bench(args.name or list_recordings(), args.repeat)))
+
+
+if __name__ == "__main__":
+	main()
@@ -3,19 +3,37 @@ Import gescrapete categorieën naar de database via de API.
 """
 import json
 import os
+import time
 import requests
 from dotenv import load_dotenv
 from typing import List, Dict
 
 
-def import_categories_to_db(categories_file: str = None, api_url: str = None, api_key: str = None):
+# Rows per request; the API accepts at most 10000 (MAX_CATEGORY_ROWS)
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def chunk_by_level(categories: List[Dict], chunk_size: int) -> List[List[Dict]]:
+    """
+    Sorteer op level en knip in chunks, zodat ouders altijd in een eerdere
+    (of dezelfde) chunk zitten dan hun kinderen.
+    """
+    ordered = sorted(categories, key=lambda c: int(c.get('level') or 0))
+    return [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+
+
+def import_categories_to_db(categories_file: str = None, api_url: str = None, api_key: str = None,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
     """
     Import categorieën van een JSON bestand naar de database via de API.
+    Stopt bij de eerste chunk die niet geschreven is, zodat kinderen nooit zonder
+    hun ouders worden verstuurd. Geeft True terug als alles geïmporteerd is.
     
     Args:
         categories_file: Pad naar het JSON bestand met categorieën (default: categories_scraped.json)
         api_url: Base URL van de API (default: uit .env)
         api_key: API key voor authenticatie (default: uit .env)
+        chunk_size: Aantal categorieën per request (default: 2000)
     """
     load_dotenv()
     
@@ -33,7 +51,7 @@ def import_categories_to_db(categories_file: str = None, api_url: str = None, ap
     if not os.path.exists(categories_file):
         print(f"❌ Bestand niet gevonden: {categories_file}")
         print("\n💡 Tip: Run eerst scrape_categories_from_homepage.py om categorieën te scrapen")
-        return
+        return False
     
     # Lees categorieën
     print(f"📖 Lezen van {categories_file}...")
@@ -42,11 +60,11 @@ def import_categories_to_db(categories_file: str = None, api_url: str = None, ap
             categories = json.load(f)
     except Exception as e:
         print(f"❌ Fout bij lezen van bestand: {e}")
-        return
+        return False
     
     if not categories or len(categories) == 0:
         print("❌ Geen categorieën gevonden in bestand!")
-        return
+        return False
     
     print(f"✅ {len(categories)} categorieën geladen")
     
@@ -56,37 +74,55 @@ def import_categories_to_db(categories_file: str = None, api_url: str = None, ap
     print(f"\n📤 Verzenden naar: {api_endpoint}")
     print(f"   (API key: {'*' * (len(api_key) - 4)}{api_key[-4:]})")
     
-    # Verstuur naar API
+    # Verstuur naar API in chunks, ouders eerst; één sessie voor alle requests
+    chunks = chunk_by_level(categories, max(int(chunk_size), 1))
+    totals = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    errors: List[str] = []
+    session = requests.Session()
+    session.headers.update({"x-api-key": api_key})
+    started = time.perf_counter()
     try:
-        response = requests.post(
-            api_endpoint,
-            json={"categories": categories},
-            headers={
-                "Content-Type": "application/json",
-                "x-api-key": api_key,
-            },
-            timeout=60,
-        )
-        
-        response.raise_for_status()
-        result = response.json()
+        for index, chunk in enumerate(chunks, 1):
+            response = session.post(
+                api_endpoint,
+                json={"categories": chunk},
+                timeout=60,
+            )
+            try:
+                result = response.json()
+            except ValueError:
+                result = {}
+            # The API rolls a failed chunk back as a whole; deeper levels would lose their parents
+            if not response.ok or result.get('success') is False:
+                levels = sorted({str(c.get('level') or 0) for c in chunk}, key=int)
+                print(f"\n❌ Chunk {index}/{len(chunks)} (level {', '.join(levels)}) niet geschreven, status {response.status_code}")
+                for error in (result.get('errors') or [result.get('error') or response.text])[:10]:
+                    print(f"   - {error}")
+                print(f"   Import gestopt: {len(chunks) - index} volgende chunk(s) niet verzonden")
+                return False
+            for key in totals:
+                totals[key] += result.get(key, 0)
+            errors.extend(result.get('errors') or [])
+            print(f"   📦 Chunk {index}/{len(chunks)}: {len(chunk)} categorieën")
         
         print("\n" + "=" * 70)
-        print("✅ Categorieën succesvol geïmporteerd!")
+        print(f"✅ Categorieën succesvol geïmporteerd in {time.perf_counter() - started:.1f}s!")
         print("=" * 70)
         print(f"\n📊 Resultaten:")
-        print(f"   ✅ Aangemaakt: {result.get('created', 0)}")
-        print(f"   🔄 Bijgewerkt: {result.get('updated', 0)}")
-        print(f"   ⏭️  Overgeslagen: {result.get('skipped', 0)}")
+        print(f"   ✅ Aangemaakt: {totals['created']}")
+        print(f"   🔄 Bijgewerkt: {totals['updated']}")
+        print(f"   ⏸️  Ongewijzigd: {totals['unchanged']}")
+        print(f"   ⏭️  Overgeslagen: {totals['skipped']}")
         
-        if result.get('errors') and len(result['errors']) > 0:
-            print(f"\n⚠️  Fouten ({len(result['errors'])}):")
-            for error in result['errors'][:10]:  # Toon eerste 10 fouten
+        if errors:
+            print(f"\n⚠️  Fouten ({len(errors)}):")
+            for error in errors[:10]:  # Toon eerste 10 fouten
                 print(f"   - {error}")
-            if len(result['errors']) > 10:
-                print(f"   ... en {len(result['errors']) - 10} meer fouten")
+            if len(errors) > 10:
+                print(f"   ... en {len(errors) - 10} meer fouten")
         
         print("\n" + "=" * 70)
+        return True
         
     except requests.exceptions.RequestException as e:
         print(f"\n❌ Fout bij verzenden naar API: {e}")
@@ -98,6 +134,9 @@ def import_categories_to_db(categories_file: str = None, api_url: str = None, ap
                 pass
     except Exception as e:
         print(f"\n❌ Onverwachte fout: {e}")
+    finally:
+        session.close()
+    return False
 
 
 def main():
@@ -113,8 +152,10 @@ def main():
     categories_file = sys.argv[1] if len(sys.argv) > 1 else None
     api_url = sys.argv[2] if len(sys.argv) > 2 else None
     api_key = sys.argv[3] if len(sys.argv) > 3 else None
+    chunk_size = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_CHUNK_SIZE
     
-    import_categories_to_db(categories_file, api_url, api_key)
+    if not import_categories_to_db(categories_file, api_url, api_key, chunk_size):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
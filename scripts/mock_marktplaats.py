@@ -0,0 +1,278 @@
+"""
+Lokale nabootsing van de Marktplaats "plaats advertentie" flow voor benchmarks.
+Bevat de elementen waar post_ads.py op leunt: "Vind categorie", categorie radio's,
+"Verder", singleSelectAttribute[...] selects, #imageUploader-hiddenInput,
+#feature-FREE, #syi-place-ad-button en een advertentiepagina met "x bekeken".
+
+Gebruik:
+	python scripts/mock_marktplaats.py --port 8765 --latency-ms 50
+	MARKTPLAATS_BASE_URL=http://127.0.0.1:8765 python scripts/post_ads.py --csv products.csv
+"""
+import argparse
+import html
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+SUGGESTIONS = ["Huis en Inrichting", "Doe-het-zelf en Verbouw", "Tuin en Terras"]
+SUBCATEGORIES = {
+	"Huis en Inrichting": ["Banken", "Stoelen", "Kasten"],
+	"Doe-het-zelf en Verbouw": ["Isolatie en Afdichting", "Bouwmaterialen", "Gereedschap"],
+	"Tuin en Terras": ["Tuinmeubelen", "Planten", "Overkappingen"],
+}
+SELECTS = {
+	"condition": ["Nieuw", "Zo goed als nieuw", "Gebruikt", "Niet werkend"],
+	"material": ["Hardschuim (Pir)", "Glaswol", "Steenwol", "EPS"],
+	"thickness": ["Tot 4 cm", "4 tot 8 cm", "8 tot 12 cm", "12 cm of meer"],
+	"totalSurface": ["Tot 5 m²", "5 tot 10 m²", "10 tot 20 m²", "20 m² of meer"],
+}
+MONTHS = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"]
+
+
+def _page(title: str, body: str, script: str = "") -> str:
+	return f"""<!doctype html>
+<html lang="nl"><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<script src="/static/app.js"></script>
+<link rel="stylesheet" href="/static/app.css"></head>
+<body>
+<header><a href="/plaats">Plaats advertentie</a>
+<span data-testid="user-menu">bench@example.com</span></header>
+<div id="cookie-banner"><button onclick="this.parentNode.remove()">Accepteren</button></div>
+{body}
+<script>{script}</script>
+</body></html>"""
+
+
+def _select(name: str, options) -> str:
+	opts = "".join(f'<option value="{html.escape(o)}">{html.escape(o)}</option>' for o in options)
+	return (
+		f'<label for="{name}">{name}</label>'
+		f'<select id="{name}" name="singleSelectAttribute[{name}]"><option value="">Kies...</option>{opts}</select>'
+	)
+
+
+def render_home() -> str:
+	return _page("Marktplaats", "<main><h1>Welkom</h1></main>")
+
+
+def render_place_ad() -> str:
+	radios = "".join(
+		f'<div><input type="radio" name="category" id="cat-{i}" value="{html.escape(name)}">'
+		f'<label for="cat-{i}">{html.escape(name)}</label></div>'
+		for i, name in enumerate(SUGGESTIONS)
+	)
+	selects = "".join(_select(name, options) for name, options in SELECTS.items())
+	body = f"""
+<main>
+<section id="step-title">
+	<label for="title">Titel</label><input id="title" name="title">
+	<button type="button" id="find-category" data-testid="findCategory">Vind categorie</button>
+</section>
+<section id="step-suggestions" hidden>
+	{radios}
+	<a href="#" id="select-self">Of selecteer zelf een categorie</a>
+	<button type="button" id="suggestions-next">Verder</button>
+</section>
+<section id="step-subcategory" hidden>
+	<ul class="category-list" id="subcategories"></ul>
+</section>
+<form id="step-details" hidden onsubmit="return false">
+	<label for="description">Beschrijving</label>
+	<div id="description" contenteditable="true" data-testid="text-editor-input_nl-NL"></div>
+	<label for="price.value">Prijs</label><input id="price.value" name="price.value">
+	{selects}
+	<div><input type="Radio" name="deliveryMethod" id="delivery-both" value="both">
+	<label for="delivery-both">Ophalen of Verzenden</label></div>
+	<div><input type="Radio" name="deliveryMethod" id="delivery-pickup" value="pickup">
+	<label for="delivery-pickup">Ophalen</label></div>
+	<label for="location">Plaatsnaam</label><input id="location" name="location">
+	<input type="file" id="imageUploader-hiddenInput" multiple accept="image/*" style="display:none">
+	<div id="previews"></div>
+	<div id="feature-FREE"><span>Gratis</span><button type="button">Kiezen</button></div>
+	<button type="button" id="syi-place-ad-button">Plaats je advertentie</button>
+</form>
+</main>"""
+	subcategories = json.dumps(SUBCATEGORIES)
+	script = f"""
+const SUB = {subcategories};
+const show = (id) => {{ document.getElementById(id).hidden = false; }};
+const hide = (id) => {{ document.getElementById(id).hidden = true; }};
+document.getElementById('find-category').onclick = () => show('step-suggestions');
+const showSubcategories = () => {{
+	const checked = document.querySelector('input[name=category]:checked');
+	if (!checked) return;
+	const list = document.getElementById('subcategories');
+	list.innerHTML = '';
+	for (const name of SUB[checked.value]) {{
+		const li = document.createElement('li');
+		const btn = document.createElement('button');
+		btn.type = 'button';
+		btn.textContent = name;
+		btn.onclick = () => {{ hide('step-suggestions'); hide('step-subcategory'); show('step-details'); }};
+		li.appendChild(btn);
+		list.appendChild(li);
+	}}
+	show('step-subcategory');
+}};
+// Choosing a suggestion reveals its subcategories; "Verder" only moves on
+for (const radio of document.querySelectorAll('input[name=category]')) {{
+	radio.onchange = showSubcategories;
+}}
+document.getElementById('suggestions-next').onclick = () => {{
+	if (!document.querySelector('input[name=category]:checked')) return;
+	showSubcategories();
+	hide('step-suggestions');
+}};
+document.getElementById('imageUploader-hiddenInput').onchange = (e) => {{
+	const previews = document.getElementById('previews');
+	for (const file of e.target.files) {{
+		const img = document.createElement('img');
+		img.src = URL.createObjectURL(file);
+		img.width = 64;
+		previews.appendChild(img);
+	}}
+}};
+document.getElementById('syi-place-ad-button').onclick = async () => {{
+	const response = await fetch('/plaats/api/place-ad', {{
+		method: 'POST',
+		headers: {{ 'Content-Type': 'application/json' }},
+		body: JSON.stringify({{
+			title: document.getElementById('title').value,
+			price: document.getElementById('price.value').value,
+		}}),
+	}});
+	const data = await response.json();
+	window.location.assign(data.adUrl);
+}};
+"""
+	return _page("Plaats advertentie", body, script)
+
+
+def render_ad(ad_id: str, title: str, posted: datetime) -> str:
+	posted_text = f"{posted.day} {MONTHS[posted.month - 1]} '{posted.year % 100:02d}"
+	body = f"""
+<main>
+<h1>{html.escape(title)}</h1>
+<div class="stats">
+	<span>0x bekeken</span> <span>0x bewaard</span> <span>Sinds {posted_text}</span>
+</div>
+<p>Advertentienummer: {ad_id}</p>
+<a href="/u/bench/1/">Van deze adverteerder</a>
+</main>"""
+	return _page(title, body)
+
+
+def render_user(ads: Dict[str, Tuple[str, datetime]]) -> str:
+	items = "".join(
+		f'<article data-testid="ad"><a href="/v/bench/{ad_id}-advertentie"><h3>{html.escape(title)}</h3></a>'
+		f'<span>0x bekeken</span> <span>0x bewaard</span> <span>Vandaag</span></article>'
+		for ad_id, (title, _) in ads.items()
+	)
+	return _page("Advertenties", f"<main>{items}</main>")
+
+
+class MockState:
+	def __init__(self, latency_ms: int = 0, asset_kb: int = 256):
+		self.latency_ms = latency_ms
+		self.asset_kb = asset_kb
+		self.lock = threading.Lock()
+		self.next_ad = 1000000
+		self.ads: Dict[str, Tuple[str, datetime]] = {}
+		self.requests = 0
+
+	def place_ad(self, title: str) -> str:
+		with self.lock:
+			self.next_ad += 1
+			ad_id = f"a{self.next_ad}"
+			self.ads[ad_id] = (title or "Advertentie", datetime.now())
+			return ad_id
+
+
+class MockHandler(BaseHTTPRequestHandler):
+	state: MockState
+
+	def log_message(self, format, *args) -> None:
+		pass
+
+	def _delay(self) -> None:
+		self.state.requests += 1
+		if self.state.latency_ms:
+			time.sleep(self.state.latency_ms / 1000)
+
+	def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8", headers: Optional[Dict] = None) -> None:
+		data = body.encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(data)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_GET(self) -> None:
+		self._delay()
+		path = urlparse(self.path).path
+		if path == "/":
+			return self._send(200, render_home())
+		if path.rstrip("/") == "/plaats":
+			return self._send(200, render_place_ad())
+		if path == "/static/app.js":
+			# Filler bundle so page loads pay a realistic asset cost
+			filler = "// bundle\n" + ("void 0;\n" * (self.state.asset_kb * 128))
+			return self._send(200, filler, "application/javascript", {"Cache-Control": "public, max-age=31536000, immutable"})
+		if path == "/static/app.css":
+			return self._send(200, "body{font-family:sans-serif}", "text/css", {"Cache-Control": "public, max-age=31536000, immutable"})
+		match = re.match(r"^/v/.+/(a\d+)-", path)
+		if match and match.group(1) in self.state.ads:
+			title, posted = self.state.ads[match.group(1)]
+			return self._send(200, render_ad(match.group(1), title, posted))
+		if path.startswith("/u/"):
+			return self._send(200, render_user(self.state.ads))
+		return self._send(404, _page("Niet gevonden", "<main>404</main>"))
+
+	def do_POST(self) -> None:
+		self._delay()
+		path = urlparse(self.path).path
+		length = int(self.headers.get("Content-Length") or 0)
+		payload = json.loads(self.rfile.read(length) or b"{}")
+		if path == "/plaats/api/place-ad":
+			ad_id = self.state.place_ad(payload.get("title", ""))
+			body = json.dumps({"adId": ad_id, "adUrl": f"/v/bench/{ad_id}-advertentie"})
+			return self._send(200, body, "application/json")
+		return self._send(404, "{}", "application/json")
+
+
+def start_mock_server(port: int = 0, latency_ms: int = 0, asset_kb: int = 256) -> Tuple[ThreadingHTTPServer, str, MockState]:
+	"""Start the mock site on a background thread; returns (server, base_url, state)."""
+	state = MockState(latency_ms=latency_ms, asset_kb=asset_kb)
+	handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+	server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Lokale Marktplaats stand-in voor benchmarks")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--latency-ms", type=int, default=0, help="Vertraging per request")
+	parser.add_argument("--asset-kb", type=int, default=256, help="Grootte van de nep JS bundle")
+	args = parser.parse_args()
+
+	server, base_url, _ = start_mock_server(args.port, args.latency_ms, args.asset_kb)
+	print(f"Mock Marktplaats draait op {base_url} (Ctrl+C om te stoppen)")
+	try:
+		while True:
+			time.sleep(3600)
+	except KeyboardInterrupt:
+		server.shutdown()
+
+
+if __name__ == "__main__":
+	main()
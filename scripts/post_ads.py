@@ -1,22 +1,28 @@
 import asyncio
-import csv
 import os
-import time
 import json
-from dataclasses import dataclass
-from typing import List, Optional, Dict
+import re
+import weakref
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Dict, Set, Tuple
 
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright, BrowserContext, Page
 
-try:
-	import requests
-except ImportError:
-	requests = None
+from ad_capture import AdCapture, PublishedAd, ad_id_from_url
+from api_client import AsyncApiClient
+from asset_cache import AssetCache, asset_cache_enabled
+from browser_session import LAUNCH_ARGS, VIEWPORT, browser_mode, new_session_context, save_storage_state, uses_storage_state
+from browser_watchdog import BrowserWatchdog
+from category_schema import CategorySchema
+from form_fill import fill_form
+from preflight import PreflightReport, preflight_csv, print_report as print_preflight_report
+from product_model import Product, RowError, iter_csv_products, product_from_row, resolve_photo_paths
+from rate_limiter import AccountRateLimiter, get_limiter, raise_on_captcha
+from session_health import SessionStatus, get_session_health, session_check_enabled
+from stats_queue import DeferredStats, collect_ad_stats
 
 
-ALLOWED_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".heic"}
-
 VERBOSE = os.getenv("MP_VERBOSE", "true").lower() in ("1", "true", "yes", "on")
 FAST_MODE = os.getenv("MP_FAST", "true").lower() in ("1", "true", "yes", "on")  # Fast mode reduces wait times
 
@@ -30,124 +36,86 @@ WAIT_MEDIUM = 300 if FAST_MODE else 600
 WAIT_LONG = 500 if FAST_MODE else 1000
 WAIT_NAVIGATION = 800 if FAST_MODE else 1500
 
+# How the form is filled: 'locators' (per field) or 'evaluate' (one round-trip). The evaluate
+# path stays opt-in until bench_post_ads.py --form-fill has measured it against the stand-in
+FORM_FILL = os.getenv("MP_FORM_FILL", "locators").lower()
 
-@dataclass
-class Product:
-	title: str
-	description: str
-	price: str
-	category_path: Optional[str]
-	location: Optional[str]
-	photos: List[str]
-	article_number: Optional[str] = None
-	condition: Optional[str] = None
-	delivery_methods: List[str] = None
-	material: Optional[str] = None  # Deprecated: use category_fields instead
-	thickness: Optional[str] = None  # Deprecated: use category_fields instead
-	total_surface: Optional[str] = None  # Deprecated: use category_fields instead
-	delivery_option: Optional[str] = None
-	category_fields: Optional[Dict] = None  # Category-specific fields from database
-
-
-def read_products_from_api(api_url: str) -> List[Product]:
-	"""Read product data from API endpoint. Can return single product or list of products."""
-	if not requests:
-		raise ImportError("requests library is required for API mode. Install with: pip install requests")
-	
-	# Extract API key from URL or environment
-	api_key = os.getenv('INTERNAL_API_KEY') or 'internal-key-change-in-production'
-	
-	# Prepare headers with API key
-	headers = {
-		'x-api-key': api_key,
-		'Content-Type': 'application/json'
-	}
-	
+# Open the next ad form through the site's own link while the page state is clean
+FORM_REUSE = os.getenv("MP_FORM_REUSE", "true").lower() in ("1", "true", "yes", "on")
+_dirty_pages: "weakref.WeakSet[Page]" = weakref.WeakSet()
+
+# Upper bound for the place-ad response/redirect after the publish click (not a fixed sleep)
+PUBLISH_TIMEOUT_MS = int(os.getenv("MP_PUBLISH_TIMEOUT_MS", "15000"))
+# How long a redirect may take to start after the place-ad response (and vice versa)
+PUBLISH_REDIRECT_MS = int(os.getenv("MP_PUBLISH_REDIRECT_MS", "3000"))
+
+
+def product_from_api_item(item: Dict) -> Product:
+	"""Build a Product from one item of the pending/export API format."""
+	return product_from_row(item)
+
+
+async def read_products_from_api(api_url: str, api: Optional[AsyncApiClient] = None) -> List[Product]:
+	"""
+	Read product data from API endpoint. Can return single product or list of products.
+	The request runs on the API client's thread pool, so the event loop keeps running.
+	"""
+	# The caller's URL may sit on another host than API_BASE_URL; it still gets the key
+	headers = {'x-api-key': os.getenv('INTERNAL_API_KEY') or 'internal-key-change-in-production'}
+	own_client = api is None
+	api = api or AsyncApiClient(timeout=30)
 	try:
-		response = requests.get(api_url, headers=headers, timeout=30)
-		response.raise_for_status()
-		data = response.json()
+		data = await api.get_json(api_url, headers=headers)
 		
 		# Check if it's a list or single object
 		products_data = data if isinstance(data, list) else [data]
 		
-		products = []
-		for item in products_data:
-			photos = item.get('photos', []) or []
-			delivery_methods = item.get('delivery_methods', []) or []
-			category_fields = item.get('category_fields') or {}
-			
-			product = Product(
-				title=item.get('title', '').strip(),
-				description=item.get('description', '').strip(),
-				price=str(item.get('price', '')).strip(),
-				category_path=item.get('category_path') or None,
-				location=item.get('location') or None,
-				photos=photos,
-				article_number=item.get('article_number') or None,
-				condition=item.get('condition') or None,
-				delivery_methods=delivery_methods,
-				material=item.get('material') or None,  # Keep for backward compatibility
-				thickness=item.get('thickness') or None,  # Keep for backward compatibility
-				total_surface=item.get('total_surface') or None,  # Keep for backward compatibility
-				delivery_option=item.get('delivery_option') or None,
-				category_fields=category_fields if isinstance(category_fields, dict) else {},
-			)
-			products.append(product)
+		products = [product_from_api_item(item) for item in products_data]
 		
 		print(f"[OK] {len(products)} product(en) opgehaald van API")
 		return products
 	except Exception as e:
 		print(f"Error fetching products from API: {e}")
 		raise
+	finally:
+		if own_client:
+			await api.aclose()
 
 
 def read_products(csv_path: Optional[str] = None) -> List[Product]:
-	"""Read products from CSV file."""
+	"""Read products from CSV file (.csv or .csv.gz); rows that cannot be posted are skipped with a warning."""
 	if not csv_path:
 		raise ValueError("CSV path is required")
-	
-	products: List[Product] = []
-	with open(csv_path, newline='', encoding='utf-8') as f:
-		reader = csv.DictReader(f)
-		for row in reader:
-			photos = [p.strip() for p in (row.get('photos') or '').split(';') if p.strip()]
-			article_number = (row.get('article_number') or '').strip() or None
-			delivery_methods = [m.strip() for m in (row.get('delivery_methods') or '').split(',') if m.strip()]
-			products.append(Product(
-				title=(row.get('title') or '').strip(),
-				description=(row.get('description') or '').strip(),
-				price=str(row.get('price', '')).strip(),
-				category_path=(row.get('category_path') or '').strip() or None,
-				location=(row.get('location') or '').strip() or None,
-				photos=photos,
-				article_number=article_number,
-				condition=(row.get('condition') or '').strip() or None,
-				delivery_methods=delivery_methods,
-				material=(row.get('material') or '').strip() or None,
-				thickness=(row.get('thickness') or '').strip() or None,
-				total_surface=(row.get('total_surface') or '').strip() or None,
-				delivery_option=(row.get('delivery_option') or '').strip() or None,
-			))
-	return products
-
-
-def find_photos_for_article(media_root: str, article_number: str) -> List[str]:
-	folder = os.path.join(media_root, str(article_number))
-	if not os.path.isdir(folder):
-		return []
-	files: List[str] = []
-	for name in sorted(os.listdir(folder)):
-		path = os.path.join(folder, name)
-		if not os.path.isfile(path):
-			continue
-		ext = os.path.splitext(name)[1].lower()
-		if ext in ALLOWED_IMAGE_EXTS:
-			files.append(os.path.abspath(path))
-	return files
+	return list(iter_csv_products(csv_path, on_error=print_row_error))
+
+
+def print_row_error(error: RowError) -> None:
+	print(f"[WARNING] Rij {error.line} overgeslagen: {error.message}")
+
+
+def check_csv(csv_path: str, media_root: Optional[str] = None) -> PreflightReport:
+	"""
+	Pre-flight over a CSV file before the browser starts: every row that cannot be posted
+	(parse errors, unknown category, invalid attribute, missing photo) is reported up front.
+	"""
+	report = preflight_csv(csv_path, media_root or os.getenv('MEDIA_ROOT', './public/media'))
+	print_preflight_report(report)
+	return report
 
 
-async def ensure_logged_in(page: Page, base_url: str) -> None:
+async def ensure_logged_in(page: Page, base_url: str, user_data_dir: Optional[str] = None, fast: bool = True) -> SessionStatus:
+	"""
+	Make sure the page's session is usable and return the verdict. With fast (and MP_SESSION_CHECK)
+	a valid session is recognised from its cookies in milliseconds; only an expired session,
+	or fast=False (logging in by hand, refreshing), loads the homepage.
+	"""
+	health = get_session_health(user_data_dir)
+	if fast and session_check_enabled():
+		session = await health.check(base_url, page.context)
+		if session.logged_in:
+			log_step(f"Sessie {session.describe()}")
+			return session
+		log_step(f"Sessie {session.describe()}; homepage laden")
 	for attempt in range(2):
 		try:
 			await page.goto(f"{base_url}/", wait_until="domcontentloaded")
@@ -181,9 +149,50 @@ async def ensure_logged_in(page: Page, base_url: str) -> None:
 				log_step("Waarschuwing: Kan niet bepalen welk account is ingelogd")
 	except Exception as e:
 		log_step(f"Kon account info niet ophalen: {e}")
+	session = await health.check(base_url, page.context)
+	if not session.logged_in:
+		print(f"[WARNING] Sessie {session.describe()}; log opnieuw in (python scripts/accounts.py login <naam>)")
+	return session
+
+
+def mark_page_dirty(page: Page) -> None:
+	"""The page's form state cannot be trusted (failed post, captcha); the next form is a full goto."""
+	_dirty_pages.add(page)
+
+
+async def open_form_in_app(page: Page, base_url: str) -> bool:
+	"""
+	Reach the ad form through the site's own "Plaats advertentie" link, so a single-page app
+	keeps its loaded bundles instead of booting again. True only if the form came up empty.
+	"""
+	current = page.url.split('#')[0].split('?')[0].rstrip('/')
+	if not current.startswith(base_url) or current.endswith('/plaats'):
+		# Another site, or the (filled) form itself: nothing to reuse
+		return False
+	try:
+		link = page.locator(f"a[href='/plaats'], a[href='/plaats/'], a[href='{base_url}/plaats']").first
+		if await link.count() == 0:
+			return False
+		await link.click()
+		await page.wait_for_url(re.compile(r"/plaats/?(?:[?#].*)?$"), wait_until="domcontentloaded", timeout=WAIT_NAVIGATION * 5)
+		title = page.locator("input[name='title'], #title").first
+		await title.wait_for(state="visible", timeout=WAIT_NAVIGATION * 5)
+		return not await title.input_value()
+	except Exception as e:
+		log_step(f"Formulier via de site openen mislukt ({e}); volledig laden")
+		return False
 
 
 async def click_place_ad(page: Page, base_url: str) -> None:
+	"""
+	Open an empty ad form. After a successful post this goes through the site's own link
+	(MP_FORM_REUSE, default on); a dirty page, or a form that does not come up empty,
+	gets a full page.goto() instead.
+	"""
+	if FORM_REUSE and page not in _dirty_pages and await open_form_in_app(page, base_url):
+		log_step("Formulier geopend via de site (geen volledige reload)")
+		return
+	_dirty_pages.discard(page)
 	await page.goto(f"{base_url}/plaats", wait_until="domcontentloaded")
 	if page.url.rstrip('/') not in (f"{base_url}/plaats", f"{base_url}/plaats/"):
 		link = page.get_by_role("link", name="Plaats advertentie")
@@ -549,46 +558,99 @@ async def choose_category(page: Page, category_path: Optional[str]) -> None:
 				return
 
 
-async def fill_basic_fields(page: Page, product: Product) -> None:
+async def select_product_category(page: Page, category_path: Optional[str], title: str) -> None:
+	"""Pick the category on an open place-ad page: by path when known, otherwise via auto-suggest on the title."""
+	# Use category_path if available, otherwise use auto-suggest
+	if category_path:
+		log_step(f"Gebruik categorie uit product: {category_path}")
+		# Fill title first (needed for category selection on some pages)
+		try:
+			title_input = page.get_by_label("Titel", exact=False)
+			if await title_input.count() == 0:
+				title_input = page.get_by_placeholder("Titel", exact=False)
+			if await title_input.count() > 0:
+				value = await title_input.first.input_value()
+				if not value:
+					await title_input.first.fill(title)
+					await page.wait_for_timeout(WAIT_SHORT)
+		except Exception:
+			pass
+
+		# Navigate to category selection
+		try:
+			find_button = page.get_by_role("button", name="Vind categorie")
+			if await find_button.count() == 0:
+				find_button = page.locator("[data-testid='findCategory']")
+			if await find_button.count() > 0:
+				await find_button.first.click()
+				await page.wait_for_timeout(WAIT_MEDIUM)
+		except Exception as e:
+			log_step(f"Waarschuwing: Kon 'Vind categorie' niet vinden: {e}")
+
+		# Now choose the specific category
+		await choose_category(page, category_path)
+
+		# Click "Verder" if needed
+		try:
+			next_button = page.get_by_role("button", name="Verder")
+			if await next_button.count() > 0:
+				await next_button.first.click()
+				await page.wait_for_load_state("domcontentloaded")
+				await page.wait_for_timeout(WAIT_SHORT)
+		except Exception:
+			pass
+	else:
+		log_step("Geen categorie opgegeven, gebruik auto-suggest")
+		await auto_suggest_category(page, title)
+
+
+async def fill_basic_fields_locators(page: Page, product: Product, only: Optional[Set[str]] = None) -> None:
+	"""Fill the basic fields one locator at a time (the fallback for fill_basic_fields); only limits it to some keys."""
+	def wanted(key: str) -> bool:
+		return only is None or key in only
+
 	log_step(f"Titel invullen: {product.title}")
 	# Title
-	try:
-		title_input = page.get_by_label("Titel", exact=False)
-		if await title_input.count() == 0:
-			title_input = page.get_by_placeholder("Titel", exact=False)
-		value = await title_input.first.input_value()
-		if not value:
-			await title_input.first.fill(product.title)
-	except Exception:
-		pass
+	if wanted('title'):
+		try:
+			title_input = page.get_by_label("Titel", exact=False)
+			if await title_input.count() == 0:
+				title_input = page.get_by_placeholder("Titel", exact=False)
+			value = await title_input.first.input_value()
+			if not value:
+				await title_input.first.fill(product.title)
+		except Exception:
+			pass
 	log_step("Omschrijving invullen")
 	# Description: rich text editor
-	try:
-		rte = page.locator("[data-testid='text-editor-input_nl-NL']").first
-		if await rte.count() > 0:
-			await rte.fill(product.description)
-		else:
-			desc_input = page.get_by_label("Beschrijving", exact=False)
-			if await desc_input.count() == 0:
-				desc_input = page.get_by_placeholder("Beschrijving", exact=False)
-			await desc_input.first.fill(product.description)
-	except Exception:
-		pass
+	if wanted('description'):
+		try:
+			rte = page.locator("[data-testid='text-editor-input_nl-NL']").first
+			if await rte.count() > 0:
+				await rte.fill(product.description)
+			else:
+				desc_input = page.get_by_label("Beschrijving", exact=False)
+				if await desc_input.count() == 0:
+					desc_input = page.get_by_placeholder("Beschrijving", exact=False)
+				await desc_input.first.fill(product.description)
+		except Exception:
+			pass
 	log_step(f"Prijs invullen: {product.price}")
 	# Price (string input like 0,00). We fill a plain integer; site formats it.
-	try:
-		price_input = page.locator("#price\\.value, input#price\\.value")
-		if await price_input.count() == 0:
-			price_input = page.get_by_label("Prijs", exact=False)
-		if await price_input.count() == 0:
-			price_input = page.locator("input[name='price.value']")
-		await price_input.first.fill(str(product.price or ""))
-	except Exception:
-		pass
+	if wanted('price'):
+		try:
+			price_input = page.locator("#price\\.value, input#price\\.value")
+			if await price_input.count() == 0:
+				price_input = page.get_by_label("Prijs", exact=False)
+			if await price_input.count() == 0:
+				price_input = page.locator("input[name='price.value']")
+			await price_input.first.fill(str(product.price or ""))
+		except Exception:
+			pass
 	if product.condition:
 		log_step(f"Staat kiezen: {product.condition}")
 	# Condition (select)
-	if product.condition:
+	if product.condition and wanted('condition'):
 		try:
 			select = page.locator("select[name='singleSelectAttribute[condition]']")
 			if await select.count() > 0:
@@ -598,7 +660,7 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 	if product.material:
 		log_step(f"Materiaal kiezen: {product.material}")
 	# Material (select)
-	if product.material:
+	if product.material and wanted('material'):
 		try:
 			select = page.locator("select[name='singleSelectAttribute[material]']")
 			if await select.count() > 0:
@@ -608,7 +670,7 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 	if product.thickness:
 		log_step(f"Dikte kiezen: {product.thickness}")
 	# Thickness (select)
-	if product.thickness:
+	if product.thickness and wanted('thickness'):
 		try:
 			select = page.locator("select[name='singleSelectAttribute[thickness]']")
 			if await select.count() > 0:
@@ -618,7 +680,7 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 	if product.total_surface:
 		log_step(f"Oppervlakte kiezen: {product.total_surface}")
 	# Total surface (select)
-	if product.total_surface:
+	if product.total_surface and wanted('total_surface'):
 		try:
 			select = page.locator("select[name='singleSelectAttribute[totalSurface]']")
 			if await select.count() > 0:
@@ -628,7 +690,7 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 	if product.delivery_option:
 		log_step(f"Levering kiezen: {product.delivery_option}")
 	# Delivery radio combined option
-	if product.delivery_option:
+	if product.delivery_option and wanted('delivery'):
 		try:
 			radio = page.locator("input[name='deliveryMethod'][type='Radio']")
 			if await radio.count() == 0:
@@ -640,7 +702,7 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 	if product.location:
 		log_step(f"Locatie invullen: {product.location}")
 	# Location (optional)
-	if product.location:
+	if product.location and wanted('location'):
 		try:
 			loc_input = page.get_by_label("Plaatsnaam", exact=False)
 			if await loc_input.count() == 0:
@@ -648,19 +710,101 @@ async def fill_basic_fields(page: Page, product: Product) -> None:
 			await loc_input.first.fill(product.location)
 		except Exception:
 			pass
+
+
+def basic_form_ops(product: Product) -> List[Dict]:
+	"""Target state of the basic fields as form_fill operations (same controls as fill_basic_fields_locators)."""
+	ops: List[Dict] = [
+		# The title is usually typed already during category selection
+		{'key': 'title', 'kind': 'text', 'find': {'label': 'Titel', 'placeholder': 'Titel'}, 'value': product.title, 'if_empty': True, 'required': True},
+		{'key': 'description', 'kind': 'richtext', 'find': {'css': ["[data-testid='text-editor-input_nl-NL']"], 'label': 'Beschrijving', 'placeholder': 'Beschrijving'}, 'value': product.description, 'required': True},
+		{'key': 'price', 'kind': 'text', 'find': {'css': ['#price\\.value', "input[name='price.value']"], 'label': 'Prijs'}, 'value': str(product.price or ''), 'numeric': True, 'required': True},
+	]
+	for key, attribute, value in (
+		('condition', 'condition', product.condition),
+		('material', 'material', product.material),
+		('thickness', 'thickness', product.thickness),
+		('total_surface', 'totalSurface', product.total_surface),
+	):
+		if value:
+			ops.append({'key': key, 'kind': 'select', 'find': {'css': [f"select[name='singleSelectAttribute[{attribute}]']"]}, 'value': value})
+	if product.delivery_option:
+		ops.append({'key': 'delivery', 'kind': 'radio', 'find': {'css': ["input[name='deliveryMethod']"], 'label': product.delivery_option}, 'value': product.delivery_option, 'any_option': True, 'required': True})
+	if product.location:
+		ops.append({'key': 'location', 'kind': 'text', 'find': {'label': 'Plaatsnaam', 'placeholder': 'Plaatsnaam'}, 'value': product.location, 'required': True})
+	return ops
+
+
+async def fill_basic_fields(page: Page, product: Product) -> None:
+	"""
+	Fill title, description, price, selects, delivery and location per locator (default).
+	MP_FORM_FILL=evaluate fills them in one evaluate plus one readback instead; fields
+	that do not verify are then filled again per locator.
+	"""
+	if FORM_FILL != 'evaluate':
+		await fill_basic_fields_locators(page, product)
+	else:
+		log_step(f"Formulier invullen: {product.title}")
+		try:
+			failed = await fill_form(page, basic_form_ops(product), log_step)
+		except Exception as e:
+			log_step(f"  [WARNING] Formulier in één keer invullen mislukt: {e}")
+			failed = None
+		if failed is None or failed:
+			log_step(f"  Per veld invullen: {', '.join(sorted(failed)) if failed else 'alles'}")
+			await fill_basic_fields_locators(page, product, only=failed)
 	
 	# Fill category-specific fields
 	if product.category_fields:
-		await fill_category_fields(page, product.category_fields)
+		await fill_category_fields(page, product.category_fields, product.category_schema)
 
 
-async def fill_category_fields(page: Page, category_fields: Dict) -> None:
-	"""Fill category-specific fields on Marktplaats form."""
+async def fill_schema_fields(page: Page, resolved: List[Tuple[str, str, Any]]) -> None:
+	"""
+	Fill fields that were resolved against the category schema: one direct action per field,
+	or with MP_FORM_FILL=evaluate all in one evaluate.
+	"""
+	if FORM_FILL != 'evaluate':
+		for name, kind, value in resolved:
+			selector_name = json.dumps(name)
+			try:
+				if kind == 'select':
+					await page.locator(f"select[name={selector_name}]").select_option(value=value)
+				elif kind == 'radio':
+					await page.locator(f"input[name={selector_name}][value={json.dumps(value)}]").check()
+				elif kind == 'checkbox':
+					await page.locator(f"input[name={selector_name}]").first.set_checked(value)
+				else:
+					await page.locator(f"[name={selector_name}]").first.fill(value)
+				log_step(f"  [OK] {name}: {value}")
+			except Exception as e:
+				log_step(f"  [ERROR] Fout bij invullen veld '{name}': {e}")
+		return
+	ops = [
+		{'key': name, 'kind': kind, 'find': {'css': [f"[name={json.dumps(name)}]"]}, 'value': value, 'match': 'value', 'required': True}
+		for name, kind, value in resolved
+	]
+	failed = await fill_form(page, ops, log_step)
+	for name in sorted(failed):
+		log_step(f"  [ERROR] Kon veld '{name}' niet invullen")
+
+
+async def fill_category_fields(page: Page, category_fields: Dict, schema: Optional[CategorySchema] = None) -> None:
+	"""
+	Fill category-specific fields on Marktplaats form.
+	With a scraped schema the fields go straight to the right control; fields the
+	schema does not know (or no schema at all) fall back to probing by name and label.
+	"""
 	if not category_fields or not isinstance(category_fields, dict):
 		return
 	
 	log_step("Categorie-specifieke velden invullen...")
 	
+	if schema is not None:
+		# Values were validated when the product was parsed
+		resolved, category_fields = schema.resolve(category_fields)
+		await fill_schema_fields(page, resolved)
+	
 	for field_name, field_value in category_fields.items():
 		if not field_value or field_value == '':
 			continue
@@ -828,56 +972,8 @@ async def fill_category_fields(page: Page, category_fields: Dict) -> None:
 
 
 async def upload_photos(page: Page, product: Product, media_root: str) -> None:
-	# Get photos from product, convert to absolute paths
-	photos: List[str] = []
-	
 	log_step(f"Foto's ophalen voor product (media_root: {media_root})")
-	
-	if product.photos:
-		log_step(f"  Product heeft {len(product.photos)} foto path(s) in product.photos")
-		for i, p in enumerate(product.photos, 1):
-			if not p:
-				log_step(f"  Foto {i}: (leeg)")
-				continue
-			
-			# Try as absolute path first
-			if os.path.isabs(p):
-				if os.path.exists(p):
-					photos.append(p)
-					log_step(f"  Foto {i}: {p} (gevonden als absolute path)")
-				else:
-					log_step(f"  Foto {i}: {p} (niet gevonden als absolute path)")
-			else:
-				# Try relative to current directory
-				abs_path = os.path.abspath(p)
-				if os.path.exists(abs_path):
-					photos.append(abs_path)
-					log_step(f"  Foto {i}: {abs_path} (gevonden als relative path)")
-				else:
-					# Try relative to media_root
-					abs_path = os.path.abspath(os.path.join(media_root, p))
-					if os.path.exists(abs_path):
-						photos.append(abs_path)
-						log_step(f"  Foto {i}: {abs_path} (gevonden in media_root)")
-					else:
-						log_step(f"  Foto {i}: {p} (niet gevonden)")
-	
-	# If no photos from product.photos, try to find by article number
-	if not photos and product.article_number:
-		log_step(f"  Geen foto's in product.photos, zoeken op artikelnummer: {product.article_number}")
-		found_photos = find_photos_for_article(media_root, product.article_number)
-		if found_photos:
-			photos = [os.path.abspath(p) for p in found_photos]
-			log_step(f"  {len(photos)} foto(s) gevonden op artikelnummer")
-	
-	# Filter to only existing files and normalize paths
-	existing_photos = []
-	for p in photos:
-		normalized = os.path.normpath(os.path.abspath(p))
-		if os.path.exists(normalized):
-			existing_photos.append(normalized)
-		else:
-			log_step(f"  [WARNING] Foto bestaat niet: {normalized}")
+	existing_photos = resolve_photo_paths(product, media_root, log_step)
 	
 	if not existing_photos:
 		log_step("Geen foto's gevonden voor product; overslaan upload")
@@ -990,11 +1086,11 @@ async def select_free_bundle(page: Page) -> None:
 
 
 async def get_posted_ad_url(page: Page) -> Optional[str]:
-	"""Extract the URL of the posted ad from the current page."""
+	"""
+	Extract the URL of the posted ad from the current page. Fallback for when publish_ad()
+	saw neither a place-ad response nor a redirect; it has already waited for those.
+	"""
 	try:
-		# Wait a bit for redirect or page load (shorter in fast mode)
-		await page.wait_for_timeout(2000 if FAST_MODE else 4000)
-		
 		# Check current URL - if it's an ad page, return it
 		current_url = page.url
 		log_step(f"Current URL na plaatsen: {current_url}")
@@ -1082,7 +1178,8 @@ async def get_posted_ad_url(page: Page) -> Optional[str]:
 		return None
 
 
-async def publish_ad(page: Page) -> Optional[str]:
+async def click_publish_button(page: Page) -> bool:
+	"""Click the place-ad button (or the closest thing to it); True once a click or submit went out."""
 	# Try specific id first
 	try:
 		btn = page.locator("#syi-place-ad-button")
@@ -1095,13 +1192,11 @@ async def publish_ad(page: Page) -> Optional[str]:
 				pass
 			try:
 				await btn.first.click(force=True)
-				await page.wait_for_load_state('domcontentloaded')
-				return await get_posted_ad_url(page)
+				return True
 			except Exception:
 				try:
 					await btn.first.evaluate("(b)=>b.click()")
-					await page.wait_for_load_state('domcontentloaded')
-					return await get_posted_ad_url(page)
+					return True
 				except Exception:
 					pass
 	except Exception:
@@ -1119,8 +1214,7 @@ async def publish_ad(page: Page) -> Optional[str]:
 			if await locator.count() > 0:
 				await locator.first.scroll_into_view_if_needed()
 				await locator.first.click(force=True)
-				await page.wait_for_load_state('domcontentloaded')
-				return await get_posted_ad_url(page)
+				return True
 		except Exception:
 			continue
 	# Variants of 'Plaats je advertentie'
@@ -1138,8 +1232,7 @@ async def publish_ad(page: Page) -> Optional[str]:
 			if await loc.count() > 0:
 				await loc.first.scroll_into_view_if_needed()
 				await loc.first.click(force=True)
-				await page.wait_for_load_state('domcontentloaded')
-				return await get_posted_ad_url(page)
+				return True
 		except Exception:
 			continue
 	# Form submit fallback and Enter
@@ -1147,29 +1240,53 @@ async def publish_ad(page: Page) -> Optional[str]:
 		form = page.locator("form").last
 		if await form.count() > 0:
 			await form.evaluate("(f)=>f.submit()")
-			await page.wait_for_load_state('domcontentloaded')
-			return await get_posted_ad_url(page)
+			return True
 	except Exception:
 		pass
 	try:
 		await page.keyboard.press("Enter")
-		await page.wait_for_timeout(WAIT_MEDIUM)
-		return await get_posted_ad_url(page)
+		return True
 	except Exception:
 		pass
-	return None
+	return False
 
 
-async def run(csv_path: Optional[str], api_url: Optional[str], product_id: Optional[str], login_only: bool, keep_open: bool=False) -> Optional[List[Dict]]:
-	load_dotenv(override=True)
-	base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
-	user_data_dir = os.getenv('USER_DATA_DIR', './user_data')
-	media_root = os.getenv('MEDIA_ROOT', './public/media')
-	action_delay_ms = int(os.getenv('ACTION_DELAY_MS', '200'))
+async def publish_ad(page: Page) -> Optional[PublishedAd]:
+	"""
+	Publish the filled form and return the ad's URL and id, taken from the place-ad API
+	response or the redirect to the ad, whichever comes first. Only when neither arrives
+	is the resulting page searched for a link to the ad.
+	"""
+	form_url = page.url
+	async with AdCapture(page, settle_ms=PUBLISH_REDIRECT_MS) as capture:
+		if not await click_publish_button(page):
+			return None
+		published = await capture.wait(PUBLISH_TIMEOUT_MS)
+	if capture.error:
+		log_step(f"Waarschuwing: {capture.error}")
+	if published and published.source == 'response':
+		# Let the site's own redirect start, so the next navigation does not race it
+		try:
+			await page.wait_for_url(lambda url: url != form_url, wait_until='commit', timeout=PUBLISH_REDIRECT_MS)
+		except Exception:
+			pass
+	if published and published.ad_url:
+		log_step(f"Ad gevonden via {published.source}: {published.ad_id} {published.ad_url}")
+		return published
 
-	os.makedirs(user_data_dir, exist_ok=True)
+	try:
+		await page.wait_for_load_state('domcontentloaded')
+	except Exception:
+		pass
+	ad_url = await get_posted_ad_url(page)
+	if not ad_url:
+		return None
+	# The URL's id is the ad's own; a captured id field may belong to something else
+	ad_id = ad_id_from_url(ad_url) or (published.ad_id if published else None)
+	return PublishedAd(ad_url, ad_id, 'page')
 
-	# Determine if we should run headless
+
+def should_run_headless() -> bool:
 	# Run headless if: explicitly set, in CI/serverless environment, or no DISPLAY
 	headless_env = os.getenv('HEADLESS', '').lower()
 	has_display = os.getenv('DISPLAY') is not None
@@ -1189,195 +1306,228 @@ async def run(csv_path: Optional[str], api_url: Optional[str], product_id: Optio
 		should_be_headless = False
 	
 	print(f"[DEBUG] Headless mode: {should_be_headless} (HEADLESS={headless_env}, DISPLAY={has_display}, CI={is_ci}, RAILWAY={is_railway})")
+	return should_be_headless
 
-	async with async_playwright() as p:
+
+async def launch_browser(p, user_data_dir: str) -> BrowserContext:
+	"""
+	A logged-in browser context for the profile. With a saved storage_state this is a cheap
+	new_context() on the process's one shared browser, so every account or lane can have its
+	own; without one (or MP_BROWSER_MODE=profile) the persistent profile is launched.
+	Static assets are served from the profile's asset cache (MP_ASSET_CACHE, default on).
+	"""
+	if uses_storage_state(user_data_dir):
+		browser = await new_session_context(p, user_data_dir, should_run_headless())
+	else:
+		if browser_mode() != 'profile':
+			print(f"[WARNING] Geen storage_state in {user_data_dir}, persistent profiel gebruikt (python scripts/accounts.py refresh)")
+		browser = await launch_profile(p, user_data_dir)
+	if asset_cache_enabled():
+		await AssetCache(os.path.join(user_data_dir, 'mp_asset_cache')).attach(browser)
+	return browser
+
+
+async def launch_profile(p, user_data_dir: str) -> BrowserContext:
+	os.makedirs(user_data_dir, exist_ok=True)
+	try:
+		return await p.chromium.launch_persistent_context(
+			user_data_dir=user_data_dir,
+			headless=should_run_headless(),
+			viewport=VIEWPORT,
+			args=LAUNCH_ARGS,
+		)
+	except Exception as e:
+		print(f"[ERROR] Failed to launch browser: {e}")
+		print(f"[ERROR] Trying with headless=True as fallback...")
 		try:
 			browser = await p.chromium.launch_persistent_context(
 				user_data_dir=user_data_dir,
-				headless=should_be_headless,
-				viewport={"width": 1280, "height": 900},
-				args=["--disable-blink-features=AutomationControlled"],
+				headless=True,
+				viewport=VIEWPORT,
+				args=LAUNCH_ARGS,
 			)
-		except Exception as e:
-			print(f"[ERROR] Failed to launch browser: {e}")
-			print(f"[ERROR] Trying with headless=True as fallback...")
-			try:
-				browser = await p.chromium.launch_persistent_context(
-					user_data_dir=user_data_dir,
-					headless=True,
-					viewport={"width": 1280, "height": 900},
-					args=["--disable-blink-features=AutomationControlled"],
-				)
-				print("[OK] Browser launched in headless mode (fallback)")
-			except Exception as e2:
-				print(f"[ERROR] Failed to launch browser even in headless mode: {e2}")
-				raise
-		page = await browser.new_page()
-		# Set default timeouts (shorter in fast mode)
-		nav_timeout = 30000 if FAST_MODE else 60000
-		action_timeout = 20000 if FAST_MODE else 45000
-		page.set_default_navigation_timeout(nav_timeout)
-		page.set_default_timeout(action_timeout)
-
-		await ensure_logged_in(page, base_url)
+			print("[OK] Browser launched in headless mode (fallback)")
+			return browser
+		except Exception as e2:
+			print(f"[ERROR] Failed to launch browser even in headless mode: {e2}")
+			raise
+
+
+async def new_worker_page(browser: BrowserContext) -> Page:
+	page = await browser.new_page()
+	# Set default timeouts (shorter in fast mode)
+	nav_timeout = 30000 if FAST_MODE else 60000
+	action_timeout = 20000 if FAST_MODE else 45000
+	page.set_default_navigation_timeout(nav_timeout)
+	page.set_default_timeout(action_timeout)
+	return page
+
+
+def failed_result(product: Product, error: str) -> Dict:
+	return failed_item_result({'article_number': product.article_number, 'title': product.title}, error)
+
+
+def failed_item_result(item: Dict, error: str) -> Dict:
+	"""Failed result for an API item, also when it never parsed into a Product."""
+	return {
+		'ad_url': None,
+		'ad_id': None,
+		'views': 0,
+		'saves': 0,
+		'posted_at': None,
+		'article_number': item.get('article_number'),
+		'title': item.get('title'),
+		'status': 'failed',
+		'error': error,
+	}
+
+
+async def post_product(
+	page: Page,
+	product: Product,
+	base_url: str,
+	media_root: str,
+	limiter: Optional[AccountRateLimiter] = None,
+	stats: Optional[DeferredStats] = None,
+) -> Dict:
+	"""
+	Post one product on an already logged-in page. The ad id comes from publishing itself;
+	when that yields none the ad page is scraped for it, by `stats` in the background if
+	given (the result dict is filled in later), otherwise right here.
+	Navigation, publish and stats calls are paced by the account's adaptive limiter.
+	Never raises: failures are returned as a result with status 'failed'.
+	"""
+	limiter = limiter or get_limiter()
+
+	try:
+		async with limiter.slot('navigation'):
+			await click_place_ad(page, base_url)
+			await raise_on_captcha(page)
+		
+		await select_product_category(page, product.category_path, product.title)
+		await fill_basic_fields(page, product)
+		await upload_photos(page, product, media_root)
+		await select_free_bundle(page)
+		async with limiter.slot('publish') as slot:
+			published = await publish_ad(page)
+			if not published:
+				mark_page_dirty(page)
+				await raise_on_captcha(page)
+				slot.fail()
+		ad_url = published.ad_url if published else None
+		
+		ad_stats = None
+		if published and published.ad_id:
+			# A new ad has no views or saves yet, so the id from publishing is all we need
+			print(f"Ad posted at: {ad_url} (id {published.ad_id})")
+			ad_stats = {
+				'ad_id': published.ad_id,
+				'views': 0,
+				'saves': 0,
+				'posted_at': datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+			}
+		elif ad_url and stats is None:
+			# No id in the response, redirect or URL: scrape it from the ad page
+			print(f"Ad posted at: {ad_url}")
+			print("Scraping ad statistics...")
+			ad_stats = await collect_ad_stats(page, ad_url, product.article_number, limiter)
+		
+		print(f"[OK] Succesvol verwerkt: {product.title}")
+		result = {
+			'ad_url': ad_url,
+			'ad_id': ad_stats.get('ad_id') if ad_stats else None,
+			'views': ad_stats.get('views', 0) if ad_stats else 0,
+			'saves': ad_stats.get('saves', 0) if ad_stats else 0,
+			'posted_at': ad_stats.get('posted_at') if ad_stats else None,
+			'article_number': product.article_number,
+			'title': product.title,
+			'status': 'completed' if ad_url else 'failed',
+		}
+		if ad_url and ad_stats is None and stats is not None:
+			print(f"Ad posted at: {ad_url} (id volgt via de stats-queue)")
+			stats.defer(result, product.article_number)
+		return result
+	except Exception as e:
+		mark_page_dirty(page)
+		print(f"[ERROR] Fout bij plaatsen product ({product.title}): {e}")
+		import traceback
+		traceback.print_exc()
+		return failed_result(product, str(e))
+
+
+async def run(csv_path: Optional[str], api_url: Optional[str], product_id: Optional[str], login_only: bool, keep_open: bool=False, products: Optional[List[Product]]=None, user_data_dir: Optional[str]=None) -> Optional[List[Dict]]:
+	load_dotenv(override=True)
+	base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+	# An explicit profile (one per account) wins over USER_DATA_DIR
+	user_data_dir = user_data_dir or os.getenv('USER_DATA_DIR', './user_data')
+	media_root = os.getenv('MEDIA_ROOT', './public/media')
+	action_delay_ms = int(os.getenv('ACTION_DELAY_MS', '200'))
+
+	# Pacing is per account; ACTION_DELAY_MS only applies with MP_ADAPTIVE_RATE=false
+	limiter = get_limiter(os.path.abspath(user_data_dir))
+
+	# CSV pre-flight before the browser starts, so only postable rows reach it
+	preflight = None
+	if csv_path and products is None and not api_url and not login_only:
+		preflight = check_csv(csv_path, media_root)
+		if not preflight.passed:
+			print("[ERROR] Geen plaatsbare producten in de CSV")
+			return []
+
+	async with async_playwright() as p:
+		browser = await launch_browser(p, user_data_dir)
+		page = await new_worker_page(browser)
+
+		await ensure_logged_in(page, base_url, user_data_dir, fast=not login_only)
+		# Keep the saved login current (rolled cookies), or export it from the persistent profile
+		await save_storage_state(browser, user_data_dir)
 		if login_only:
 			print("Login session prepared. You can close the browser.")
 			await browser.close()
 			return
 
-		# Read products from API or CSV
-		if api_url:
+		# Read products from API or CSV (unless the caller already claimed them)
+		if products is not None:
+			print(f"[OK] {len(products)} product(en) aangeleverd")
+		elif api_url:
 			print(f"Fetching product from API: {api_url}")
-			products = read_products_from_api(api_url)
+			products = await read_products_from_api(api_url)
 		elif csv_path:
-			products = read_products(csv_path)
+			# Stream the file: rows rejected by the pre-flight are skipped by line number
+			products = iter_csv_products(csv_path, skip=preflight.failed_refs())
 		else:
 			raise SystemExit("Either --csv or --api is required when not using --login")
-		# Import scrape function
-		import sys
-		sys.path.insert(0, os.path.dirname(__file__))
-		from scrape_ad_stats import scrape_ad_stats
+		total = preflight.passed if preflight is not None else len(products)
 		
+		# Ad ids that publishing did not yield are scraped on a second tab meanwhile;
+		# single product mode prints its result right away, so it scrapes inline
+		# Long batches get a fresh page/context every so many ads or above a memory limit
+		watchdog = BrowserWatchdog(browser, page, new_worker_page, lambda: launch_browser(p, user_data_dir), user_data_dir)
+		stats = None if product_id else DeferredStats(lambda: new_worker_page(watchdog.context), limiter)
 		all_results = []
 		for index, product in enumerate(products, start=1):
-			try:
-				print(f"Posting {index}/{len(products)}: {product.title}")
-				await click_place_ad(page, base_url)
-				
-				# Use category_path if available, otherwise use auto-suggest
-				if product.category_path:
-					log_step(f"Gebruik categorie uit product: {product.category_path}")
-					# Fill title first (needed for category selection on some pages)
-					try:
-						title_input = page.get_by_label("Titel", exact=False)
-						if await title_input.count() == 0:
-							title_input = page.get_by_placeholder("Titel", exact=False)
-						if await title_input.count() > 0:
-							value = await title_input.first.input_value()
-							if not value:
-								await title_input.first.fill(product.title)
-								await page.wait_for_timeout(WAIT_SHORT)
-					except Exception:
-						pass
-					
-					# Navigate to category selection
-					try:
-						find_button = page.get_by_role("button", name="Vind categorie")
-						if await find_button.count() == 0:
-							find_button = page.locator("[data-testid='findCategory']")
-						if await find_button.count() > 0:
-							await find_button.first.click()
-							await page.wait_for_timeout(WAIT_MEDIUM)
-					except Exception as e:
-						log_step(f"Waarschuwing: Kon 'Vind categorie' niet vinden: {e}")
-					
-					# Now choose the specific category
-					await choose_category(page, product.category_path)
-					
-					# Click "Verder" if needed
-					try:
-						next_button = page.get_by_role("button", name="Verder")
-						if await next_button.count() > 0:
-							await next_button.first.click()
-							await page.wait_for_load_state("domcontentloaded")
-							await page.wait_for_timeout(WAIT_SHORT)
-					except Exception:
-						pass
-				else:
-					log_step("Geen categorie opgegeven, gebruik auto-suggest")
-					await auto_suggest_category(page, product.title)
-				
-				await fill_basic_fields(page, product)
-				await upload_photos(page, product, media_root)
-				await select_free_bundle(page)
-				ad_url = await publish_ad(page)
-				
-				# Scrape stats if ad was posted successfully
-				ad_stats = None
-				if ad_url:
-					print(f"Ad posted at: {ad_url}")
-					print("Scraping ad statistics...")
-					
-					# Try to scrape from individual ad page first
-					ad_stats = await scrape_ad_stats(page, ad_url)
-					
-					# If that fails or doesn't get all data, try user page
-					if not ad_stats or not ad_stats.get('ad_id'):
-						try:
-							from scrape_user_ads import get_user_url_from_ad, scrape_user_ads
-							user_url = await get_user_url_from_ad(page, ad_url)
-							if user_url:
-								print(f"Found user page: {user_url}")
-								print("Scraping all ads from user page...")
-								user_ads = await scrape_user_ads(page, user_url)
-								
-								# Find matching ad by article number or title
-								for user_ad in user_ads:
-									if user_ad.get('ad_id') and product.article_number:
-										# Try to match by checking if article number might be in title or URL
-										if product.article_number in (user_ad.get('title', '') or ''):
-											ad_stats = user_ad
-											break
-									elif user_ad.get('ad_url') == ad_url:
-										ad_stats = user_ad
-										break
-						except Exception as e:
-							print(f"Fout bij scrapen user page: {e}")
-					
-					if ad_stats:
-						print(f"Stats scraped: Ad ID={ad_stats.get('ad_id')}, Views={ad_stats.get('views')}, Saves={ad_stats.get('saves')}")
-				
+			print(f"Posting {index}/{total}: {product.title}")
+			product_result = await post_product(page, product, base_url, media_root, limiter, stats)
+			all_results.append(product_result)
+			
+			# For single product mode (has product_id), return immediately
+			if product_id:
+				print(f"RESULT_JSON:{json.dumps(product_result)}")
+				break
+			if not limiter.enabled and 'error' not in product_result:
 				await page.wait_for_timeout(action_delay_ms)
-				print(f"[OK] Succesvol verwerkt: {product.title}")
-				
-				# Store result for API mode
-				product_result = {
-					'ad_url': ad_url,
-					'ad_id': ad_stats.get('ad_id') if ad_stats else None,
-					'views': ad_stats.get('views', 0) if ad_stats else 0,
-					'saves': ad_stats.get('saves', 0) if ad_stats else 0,
-					'posted_at': ad_stats.get('posted_at') if ad_stats else None,
-					'article_number': product.article_number,
-					'title': product.title,
-					'status': 'completed' if ad_url else 'failed',
-				}
-				
-				# For single product mode (has product_id), return immediately
-				if product_id:
-					import json
-					print(f"RESULT_JSON:{json.dumps(product_result)}")
-					all_results.append(product_result)
-					break
-				
-				# For batch mode, collect results
-				all_results.append(product_result)
-			except Exception as e:
-				print(f"[ERROR] Fout bij plaatsen product {index}/{len(products)} ({product.title}): {e}")
-				import traceback
-				traceback.print_exc()
-				# Store failed result
-				failed_result = {
-					'ad_url': None,
-					'ad_id': None,
-					'views': 0,
-					'saves': 0,
-					'posted_at': None,
-					'article_number': product.article_number,
-					'title': product.title,
-					'status': 'failed',
-					'error': str(e),
-				}
-				if product_id:
-					import json
-					print(f"RESULT_JSON:{json.dumps(failed_result)}")
-					all_results.append(failed_result)
-					break
-				else:
-					all_results.append(failed_result)
-				# Continue with next product in batch mode
-				continue
+			page = await watchdog.after_ad(stats.drain)
+		browser = watchdog.context
 
+		if stats is not None:
+			if stats.pending:
+				print(f"Wachten op stats van {stats.pending} advertentie(s)...")
+			await stats.drain()
 		print("Done.")
+		if limiter.enabled:
+			log_step(f"Tempo per actie: {limiter.snapshot()}")
+		if watchdog.ads:
+			log_step(f"Geheugen en recycling: {watchdog.snapshot()}")
 		if keep_open:
 			print("Keep-open enabled. Browser will stay open for inspection.")
 			await page.wait_for_timeout(3600000)
@@ -1395,7 +1545,12 @@ def parse_args() -> tuple[Optional[str], Optional[str], Optional[str], bool, boo
 	parser.add_argument("--product-id", type=str, help="Product ID (used with --api)", default=None)
 	parser.add_argument("--login", action="store_true", help="Prepare login session only")
 	parser.add_argument("--keep-open", action="store_true", help="Keep browser open after run for debugging")
+	parser.add_argument("--check", action="store_true", help="Only run the pre-flight on the --csv file, without opening a browser")
 	args = parser.parse_args()
+	if args.check:
+		if not args.csv:
+			raise SystemExit("--check requires --csv")
+		raise SystemExit(1 if check_csv(args.csv).failed else 0)
 	return args.csv, args.api, args.product_id, args.login, args.keep_open
 
 
@@ -5,12 +5,13 @@ This replaces the old CSV-based batch processing.
 import asyncio
 import os
 import sys
-import requests
 from dotenv import load_dotenv
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
-from post_ads import run
+from api_client import AsyncApiClient
+from post_ads import failed_item_result, product_from_api_item, run
+from product_model import ProductParseError
 
 async def main():
 	load_dotenv(override=True)
@@ -19,9 +20,17 @@ async def main():
 	base_url = os.getenv('NEXTAUTH_URL') or os.getenv('API_BASE_URL') or 'http://localhost:3000'
 	api_key = os.getenv('INTERNAL_API_KEY') or 'internal-key-change-in-production'
 	
-	# Use the pending products endpoint
-	api_url = f"{base_url}/api/products/pending?api_key={api_key}"
-	
+	# Use the pending products endpoint (the key goes in the x-api-key header)
+	api_url = f"{base_url}/api/products/pending"
+	api = AsyncApiClient(base_url, api_key, timeout=30)
+	try:
+		await post_pending(api, api_url)
+	finally:
+		await api.aclose()
+
+
+async def post_pending(api: AsyncApiClient, api_url: str):
+	"""Fetch the pending products once, post them and report the results, all without blocking the loop."""
 	print("=" * 70)
 	print("Marktplaats Batch Posting - Alle Pending Producten")
 	print("=" * 70)
@@ -30,9 +39,10 @@ async def main():
 	
 	# First, fetch pending products to get their IDs
 	try:
-		response = requests.get(api_url, timeout=30, headers={'x-api-key': api_key})
-		response.raise_for_status()
-		pending_products = response.json()
+		pending_products = await api.get_json(api_url)
+		# With debug info the endpoint wraps the list: {products: [...], debug: {...}}
+		if isinstance(pending_products, dict):
+			pending_products = pending_products.get('products') or []
 		
 		if not pending_products or len(pending_products) == 0:
 			print("Geen pending producten gevonden.")
@@ -46,68 +56,57 @@ async def main():
 			print(f"Response: {e.response.text}")
 		return
 	
-	# Run the main script with API URL (no product_id for batch mode)
-	# This will process all products from the API
-	results = await run(
-		csv_path=None,
-		api_url=api_url,
-		product_id=None,  # None means batch mode
-		login_only=False,
-		keep_open=False
-	)
+	# Items that do not parse are reported as failed; one bad item must not stop the batch
+	postable = []
+	updates = []
+	for item in pending_products:
+		try:
+			postable.append((item, product_from_api_item(item)))
+		except ProductParseError as e:
+			print(f"[ERROR] Product {item.get('id', 'Unknown')} ({item.get('title', 'Geen titel')}) overgeslagen: {e}")
+			updates.append(product_update(item, failed_item_result(item, f"Ongeldig product: {e}")))
 	
-	# Update all products via batch endpoint
-	if results and len(results) > 0:
-		# Match results to products by article_number or title
-		updates = []
-		for result in results:
-			# Find matching product
-			matching_product = None
-			for product in pending_products:
-				# Match by article number (most reliable)
-				if result.get('article_number') and product.get('articleNumber') == result.get('article_number'):
-					matching_product = product
-					break
-				# Match by title
-				elif result.get('title') and product.get('title') == result.get('title'):
-					matching_product = product
-					break
-			
-			if matching_product:
-				updates.append({
-					'productId': matching_product['id'],
-					'status': 'completed',
-					'ad_url': result.get('ad_url'),
-					'ad_id': result.get('ad_id'),
-					'views': result.get('views', 0),
-					'saves': result.get('saves', 0),
-					'posted_at': result.get('posted_at'),
-				})
-		
+	# Run the main script with the fetched products, instead of letting it fetch them again
+	# (no product_id for batch mode). It returns one result per product, in order.
+	results = []
+	if postable:
+		results = await run(
+			csv_path=None,
+			api_url=None,
+			product_id=None,  # None means batch mode
+			login_only=False,
+			keep_open=False,
+			products=[product for _, product in postable],
+		) or []
+	updates.extend(product_update(item, result) for (item, _), result in zip(postable, results))
+	
+	if updates:
 		# Update all products via batch endpoint
-		if updates:
-			update_url = f"{base_url}/api/products/batch-update"
-			try:
-				update_response = requests.post(
-					update_url,
-					json={'updates': updates},
-					headers={'x-api-key': api_key},
-					timeout=30
-				)
-				if update_response.ok:
-					print(f"\n[SUCCESS] {len(updates)} product(en) bijgewerkt in database")
-					print(f"   Status: completed")
-					print(f"   Advertenties geplaatst: {len(updates)}")
-				else:
-					print(f"\n[WARNING] Fout bij bijwerken producten: {update_response.status_code}")
-					print(f"   Response: {update_response.text}")
-			except Exception as e:
-				print(f"\n[WARNING] Fout bij bijwerken producten: {e}")
-		else:
-			print("\n[WARNING] Geen producten gevonden om bij te werken")
+		completed = sum(1 for u in updates if u['status'] == 'completed')
+		try:
+			# Chunked, so large result sets stay within the endpoint's row limit
+			await api.send_batch_updates(updates)
+			print(f"\n[SUCCESS] {len(updates)} product(en) bijgewerkt in database")
+			print(f"   Advertenties geplaatst: {completed}")
+			print(f"   Mislukt: {len(updates) - completed}")
+		except Exception as e:
+			print(f"\n[WARNING] Fout bij bijwerken producten: {e}")
 	else:
 		print("\n[WARNING] Geen resultaten om bij te werken")
 
+
+def product_update(item, result):
+	"""batch-update row for a pending item, with the status the posting result reports."""
+	return {
+		'productId': item['id'],
+		'status': result.get('status') or ('completed' if result.get('ad_url') else 'failed'),
+		'ad_url': result.get('ad_url'),
+		'ad_id': result.get('ad_id'),
+		'views': result.get('views', 0),
+		'saves': result.get('saves', 0),
+		'posted_at': result.get('posted_at'),
+	}
+
 if __name__ == "__main__":
 	asyncio.run(main())
 
@@ -6,12 +6,15 @@ import asyncio
 import os
 import sys
 import tempfile
-import requests
+import urllib.parse
 from pathlib import Path
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
+import post_ads
+from api_client import AsyncApiClient
 from post_ads import run
+from product_model import ProductParseError
 
 # Configuration - kan worden aangepast via environment variables of hier direct
 # Voor productie gebruik: https://marktplaats-bp5bbsuk5-media2net-apps-projects.vercel.app
@@ -21,54 +24,53 @@ API_KEY = os.getenv('INTERNAL_API_KEY', 'internal-key-change-in-production')
 # Als de API URL verandert, pas deze regel aan:
 # API_BASE_URL = 'https://jouw-nieuwe-url.vercel.app'
 
-async def download_product_images(product_id: str, article_number: str, temp_dir: str) -> list:
-    """Download product images from API to temporary directory."""
-    images_url = f"{API_BASE_URL}/api/products/{product_id}/images?api_key={API_KEY}"
-    
+def _image_extension(image_url: str, content_type: str) -> str:
+    ext = '.jpg'  # default
+    if '.png' in image_url.lower():
+        ext = '.png'
+    elif '.jpeg' in image_url.lower() or '.jpg' in image_url.lower():
+        ext = '.jpg'
+    elif 'image/png' in content_type:
+        ext = '.png'
+    return ext
+
+
+def _download_image(client, image_url: str, base_path: str) -> tuple:
+    """Download one image and save it next to base_path (blocking; runs on the API client's pool)."""
+    content, content_type = client.get_bytes(image_url)
+    filepath = base_path + _image_extension(image_url, content_type)
+    with open(filepath, 'wb') as f:
+        f.write(content)
+    return filepath, len(content)
+
+
+async def download_product_images(api: AsyncApiClient, photo_api_url: str, article_number: str, temp_dir: str, api_key: str = API_KEY) -> list:
+    """Download product images from API to temporary directory, all photos of the product at once."""
     try:
-        response = requests.get(images_url, headers={'x-api-key': API_KEY}, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        image_urls = data.get('images', [])
-        if not image_urls:
-            print(f"  Geen foto's gevonden voor product {article_number}")
-            return []
-        
-        downloaded_paths = []
-        for idx, image_url in enumerate(image_urls):
-            try:
-                # Download image
-                img_response = requests.get(image_url, timeout=30)
-                img_response.raise_for_status()
-                
-                # Determine file extension from URL or content type
-                ext = '.jpg'  # default
-                if '.png' in image_url.lower():
-                    ext = '.png'
-                elif '.jpeg' in image_url.lower() or '.jpg' in image_url.lower():
-                    ext = '.jpg'
-                elif 'image/png' in img_response.headers.get('content-type', ''):
-                    ext = '.png'
-                
-                # Save to temp directory
-                filename = f"{article_number}_{idx+1}{ext}"
-                filepath = os.path.join(temp_dir, filename)
-                
-                with open(filepath, 'wb') as f:
-                    f.write(img_response.content)
-                
-                downloaded_paths.append(filepath)
-                print(f"  [OK] Foto gedownload: {filename}")
-            except Exception as e:
-                print(f"  [WARNING] Fout bij downloaden foto {idx+1}: {e}")
-                continue
-        
-        return downloaded_paths
+        data = await api.get_json(photo_api_url, headers={'x-api-key': api_key})
     except Exception as e:
         print(f"  [ERROR] Fout bij ophalen foto's: {e}")
         return []
 
+    image_urls = data.get('images', [])
+    if not image_urls:
+        print(f"  Geen foto's gevonden voor product {article_number}")
+        return []
+
+    downloads = await asyncio.gather(*(
+        api.call(_download_image, api.sync, image_url, os.path.join(temp_dir, f"{article_number}_{idx+1}"))
+        for idx, image_url in enumerate(image_urls)
+    ), return_exceptions=True)
+    downloaded_paths = []
+    for idx, download in enumerate(downloads):
+        if isinstance(download, Exception):
+            print(f"  [WARNING] Fout bij downloaden foto {idx+1}: {download}")
+            continue
+        filepath, size = download
+        downloaded_paths.append(filepath)
+        print(f"  [OK] Foto gedownload: {os.path.basename(filepath)} ({size} bytes)")
+    return downloaded_paths
+
 async def main():
     print("=" * 70)
     print("Marktplaats Automator - Standalone Versie")
@@ -81,14 +83,12 @@ async def main():
     print(f"Tijdelijke map voor foto's: {temp_dir}")
     print()
     
+    # One pooled client for every API call and photo download; the key goes in the header
+    api = AsyncApiClient(API_BASE_URL, API_KEY, timeout=30)
     try:
         # Fetch pending products
-        api_url = f"{API_BASE_URL}/api/products/pending?api_key={API_KEY}"
         print(f"Ophalen pending producten...")
-        
-        response = requests.get(api_url, headers={'x-api-key': API_KEY}, timeout=30)
-        response.raise_for_status()
-        pending_products = response.json()
+        pending_products = await api.get_json('/api/products/pending')
         
         if not pending_products or len(pending_products) == 0:
             print("[OK] Geen pending producten gevonden.")
@@ -105,131 +105,62 @@ async def main():
             if product_id and article_number:
                 print(f"Downloaden foto's voor: {product.get('title', 'Onbekend')}")
                 # Prefer API-provided photo_api_url (contains correct key/base)
-                photo_api_url = product.get('photo_api_url') or f"{API_BASE_URL}/api/products/{product_id}/images?api_key={API_KEY}"
+                photo_api_url = product.get('photo_api_url') or f"{API_BASE_URL}/api/products/{product_id}/images"
                 
-                # Extract API key from photo_api_url if it contains one, otherwise use default
-                import urllib.parse
-                parsed_url = urllib.parse.urlparse(photo_api_url)
-                query_params = urllib.parse.parse_qs(parsed_url.query)
-                url_api_key = query_params.get('api_key', [None])[0]
-                # Use API key from URL if available, otherwise use the default
-                request_api_key = url_api_key or API_KEY
+                # Use the API key from photo_api_url if it contains one, otherwise the default
+                query_params = urllib.parse.parse_qs(urllib.parse.urlparse(photo_api_url).query)
+                request_api_key = query_params.get('api_key', [None])[0] or API_KEY
                 
-                # Fetch images
-                try:
-                    response = requests.get(photo_api_url, headers={'x-api-key': request_api_key}, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
-                    image_urls = data.get('images', [])
-                    downloaded_paths = []
-                    for idx, image_url in enumerate(image_urls):
-                        try:
-                            img_response = requests.get(image_url, timeout=30)
-                            img_response.raise_for_status()
-                            ext = '.jpg'
-                            if '.png' in image_url.lower():
-                                ext = '.png'
-                            elif '.jpeg' in image_url.lower() or '.jpg' in image_url.lower():
-                                ext = '.jpg'
-                            elif 'image/png' in img_response.headers.get('content-type', ''):
-                                ext = '.png'
-                            filename = f"{article_number}_{idx+1}{ext}"
-                            filepath = os.path.join(temp_dir, filename)
-                            with open(filepath, 'wb') as f:
-                                f.write(img_response.content)
-                            downloaded_paths.append(filepath)
-                            print(f"  [OK] Foto gedownload: {filename} ({len(img_response.content)} bytes)")
-                        except Exception as e:
-                            print(f"  [WARNING] Fout bij downloaden foto {idx+1}: {e}")
-                            continue
-                    
-                    if downloaded_paths:
-                        product['photos'] = downloaded_paths
-                        print(f"  [OK] Totaal {len(downloaded_paths)} foto(s) gedownload voor {article_number}")
-                    else:
-                        product['photos'] = []
-                        print(f"  [WARNING] Geen foto's gedownload voor {article_number}")
-                except Exception as e:
-                    print(f"  [ERROR] Fout bij ophalen foto's: {e}")
-                    import traceback
-                    print(f"  Traceback: {traceback.format_exc()}")
-                    product['photos'] = []
+                downloaded_paths = await download_product_images(api, photo_api_url, article_number, temp_dir, request_api_key)
+                product['photos'] = downloaded_paths
+                if downloaded_paths:
+                    print(f"  [OK] Totaal {len(downloaded_paths)} foto(s) gedownload voor {article_number}")
+                else:
+                    print(f"  [WARNING] Geen foto's gedownload voor {article_number}")
                 print()
         
-        # Create a modified API response that includes the downloaded images
-        # We need to pass the products with images to the run function
-        # The run function expects an API URL, but we need to modify the data
-        # So we'll create a temporary API-like response
-        
-        # Run the main posting script
-        # We need to modify post_ads.py to accept products directly, or create a wrapper
-        # For now, let's modify the products in the API response by creating a custom endpoint
-        # Actually, we can modify the read_products_from_api to use our modified data
-        
         print("Starten met plaatsen op Marktplaats...")
         print()
         
-        # Temporarily modify the read_products_from_api function to use our data
-        import post_ads
-        original_read = post_ads.read_products_from_api
-        
-        def custom_read(api_url_param):
-            # Return our modified products
-            products_list = []
-            for item in pending_products:
-                photos = item.get('photos', []) or []
-                delivery_methods = item.get('delivery_methods', []) or []
-                category_fields = item.get('category_fields') or {}
-                
-                # Log photo information for debugging
-                if photos:
-                    print(f"[DEBUG] Product {item.get('title', 'Unknown')} heeft {len(photos)} foto(s):")
-                    for i, photo_path in enumerate(photos, 1):
-                        exists = os.path.exists(photo_path) if photo_path else False
-                        print(f"  Foto {i}: {photo_path} (exists: {exists})")
-                else:
-                    print(f"[DEBUG] Product {item.get('title', 'Unknown')} heeft geen foto's")
-                
-                product = post_ads.Product(
-                    title=item.get('title', '').strip(),
-                    description=item.get('description', '').strip(),
-                    price=str(item.get('price', '')).strip(),
-                    category_path=item.get('category_path') or None,
-                    location=item.get('location') or None,
-                    photos=photos,  # Use downloaded photos
-                    article_number=item.get('article_number') or None,
-                    condition=item.get('condition') or 'Gebruikt',
-                    delivery_methods=delivery_methods,
-                    material=item.get('material') or None,  # Keep for backward compatibility
-                    thickness=item.get('thickness') or None,  # Keep for backward compatibility
-                    total_surface=item.get('total_surface') or None,  # Keep for backward compatibility
-                    delivery_option=item.get('delivery_option') or 'Ophalen of Verzenden',
-                    category_fields=category_fields if isinstance(category_fields, dict) else {},
-                )
-                products_list.append(product)
+        products_list = []
+        for item in pending_products:
+            photos = item.get('photos', []) or []
             
-            print(f"[OK] {len(products_list)} product(en) opgehaald (met gedownloade foto's)")
-            return products_list
+            # Log photo information for debugging
+            if photos:
+                print(f"[DEBUG] Product {item.get('title', 'Unknown')} heeft {len(photos)} foto(s):")
+                for i, photo_path in enumerate(photos, 1):
+                    exists = os.path.exists(photo_path) if photo_path else False
+                    print(f"  Foto {i}: {photo_path} (exists: {exists})")
+            else:
+                print(f"[DEBUG] Product {item.get('title', 'Unknown')} heeft geen foto's")
+            
+            try:
+                product = post_ads.product_from_api_item(item)
+            except ProductParseError as e:
+                print(f"[WARNING] Product {item.get('id', 'Unknown')} overgeslagen: {e}")
+                continue
+            product.photos = photos  # Use downloaded photos
+            product.condition = product.condition or 'Gebruikt'
+            product.delivery_option = product.delivery_option or 'Ophalen of Verzenden'
+            products_list.append(product)
         
-        # Replace the function temporarily
-        post_ads.read_products_from_api = custom_read
+        print(f"[OK] {len(products_list)} product(en) opgehaald (met gedownloade foto's)")
         
         # Set media_root to temp_dir so photos are found
-        import os
         original_media_root = os.getenv('MEDIA_ROOT')
         os.environ['MEDIA_ROOT'] = temp_dir
         
         try:
             results = await run(
                 csv_path=None,
-                api_url=api_url,  # Will use our custom function
+                api_url=None,
                 product_id=None,
                 login_only=False,
-                keep_open=False
+                keep_open=False,
+                products=products_list,
             )
         finally:
-            # Restore original function
-            post_ads.read_products_from_api = original_read
             if original_media_root:
                 os.environ['MEDIA_ROOT'] = original_media_root
             elif 'MEDIA_ROOT' in os.environ:
@@ -260,21 +191,13 @@ async def main():
                     })
             
             if updates:
-                update_url = f"{API_BASE_URL}/api/products/batch-update"
                 try:
-                    update_response = requests.post(
-                        update_url,
-                        json={'updates': updates},
-                        headers={'x-api-key': API_KEY},
-                        timeout=30
-                    )
-                    if update_response.ok:
-                        print(f"\n[OK] {len(updates)} product(en) bijgewerkt in database")
-                    else:
-                        print(f"\n[WARNING] Fout bij bijwerken: {update_response.status_code}")
+                    await api.send_batch_updates(updates)
+                    print(f"\n[OK] {len(updates)} product(en) bijgewerkt in database")
                 except Exception as e:
                     print(f"\n[WARNING] Fout bij bijwerken: {e}")
     finally:
+        await api.aclose()
         # Cleanup temporary directory
         try:
             import shutil
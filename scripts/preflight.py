@@ -0,0 +1,382 @@
+"""
+Offline pre-flight controle van de wachtrij.
+Voordat er een browser opent wordt elk product gecontroleerd op wat Marktplaats
+anders pas halverwege het formulier afwijst: verplichte velden, het categoriepad
+(tegen de lokale categorieboom), attribuutwaarden (tegen de opties uit het
+gescrapete categorieschema) en of de foto's bestaan en leesbaar zijn.
+Grote wachtrijen worden over alle CPU cores verdeeld; alleen producten zonder
+fouten gaan door naar de browser.
+
+Gebruik:
+	python scripts/preflight.py --csv products.csv
+	python scripts/preflight.py --pending --json preflight.json
+	python scripts/preflight.py --fetch-categories     # categorieboom met schema's uit de API cachen
+
+De categorieboom komt uit MP_CATEGORY_TREE (default marktplaats_categories_flat.json);
+--fetch-categories vult dat bestand met de categorieën en schema's uit de database.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from category_schema import CategorySchemaError
+from product_model import (
+	ALLOWED_IMAGE_EXTS, Product, ProductParseError, find_photos_for_article, iter_csv_rows, locate_photo, product_from_row,
+)
+
+
+DEFAULT_CATEGORY_TREE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'marktplaats_categories_flat.json')
+CHUNK_SIZE = 500
+
+# Select attributes that fill_basic_fields() sets from the product's own columns
+BASIC_ATTRIBUTES = (
+	('condition', 'condition'),
+	('material', 'material'),
+	('thickness', 'thickness'),
+	('total_surface', 'totalSurface'),
+)
+
+
+def normalize_path(path: str) -> str:
+	"""'Huis en Inrichting >Banken ' -> 'huis en inrichting > banken'"""
+	return ' > '.join(part.strip().lower() for part in path.split('>') if part.strip())
+
+
+class CategoryTree:
+	"""Known category paths with their scraped attribute schemas, for lookups by normalized path."""
+
+	__slots__ = ('paths', 'schemas')
+
+	def __init__(self, categories: Iterable[Mapping[str, Any]]):
+		self.paths: Set[str] = set()
+		self.schemas: Dict[str, Any] = {}
+		# Both the flat export and the nested /api/categories tree are accepted
+		stack = list(categories)
+		while stack:
+			category = stack.pop()
+			stack.extend(category.get('children') or [])
+			if not category.get('path'):
+				continue
+			path = normalize_path(category['path'])
+			self.paths.add(path)
+			if category.get('attributeSchema'):
+				self.schemas[path] = category['attributeSchema']
+
+	def __bool__(self) -> bool:
+		return bool(self.paths)
+
+	def __contains__(self, path: str) -> bool:
+		return normalize_path(path) in self.paths
+
+	def schema(self, path: Optional[str]) -> Any:
+		return self.schemas.get(normalize_path(path)) if path else None
+
+
+@lru_cache(maxsize=4)
+def load_category_tree(path: Optional[str] = None) -> CategoryTree:
+	"""The local category tree; empty (no path checks) when the file is missing."""
+	path = path or os.getenv('MP_CATEGORY_TREE', DEFAULT_CATEGORY_TREE)
+	if not os.path.exists(path):
+		print(f"[WARNING] Categorieboom niet gevonden ({path}); categoriepaden worden niet gecontroleerd")
+		return CategoryTree([])
+	with open(path, encoding='utf-8') as f:
+		return CategoryTree(json.load(f))
+
+
+class PreflightIssue(NamedTuple):
+	field: Optional[str]
+	message: str
+	fatal: bool = True
+
+
+class PreflightResult(NamedTuple):
+	ref: Any  # CSV line number or product id
+	title: Optional[str]
+	issues: List[PreflightIssue]
+
+	@property
+	def ok(self) -> bool:
+		return not any(issue.fatal for issue in self.issues)
+
+	@property
+	def error(self) -> str:
+		return '; '.join(issue.message for issue in self.issues if issue.fatal)
+
+
+def _check_attributes(product: Product) -> List[PreflightIssue]:
+	schema = product.category_schema
+	if schema is None:
+		if product.category_fields:
+			return [PreflightIssue('category_fields', "Geen schema voor deze categorie; categorievelden niet gecontroleerd", False)]
+		return []
+	issues: List[PreflightIssue] = []
+	for attr, key in BASIC_ATTRIBUTES:
+		value = getattr(product, attr)
+		if not value or schema.field_name(key) is None:
+			continue
+		try:
+			schema.resolve({key: value})
+		except CategorySchemaError as e:
+			issues.append(PreflightIssue(attr, str(e)))
+	# category_fields were already resolved against the schema by product_from_row()
+	return issues
+
+
+def _check_photos(product: Product, media_root: str) -> List[PreflightIssue]:
+	if not product.photos:
+		if product.article_number and find_photos_for_article(media_root, product.article_number):
+			return []
+		return [PreflightIssue('photos', "Geen foto's; advertentie wordt zonder foto's geplaatst", False)]
+	issues: List[PreflightIssue] = []
+	for photo in product.photos:
+		found = locate_photo(photo, media_root)
+		if found is None:
+			issues.append(PreflightIssue('photos', f"Foto niet gevonden: {photo}"))
+		elif not os.path.isfile(found) or not os.access(found, os.R_OK):
+			issues.append(PreflightIssue('photos', f"Foto niet leesbaar: {photo}"))
+		elif os.path.splitext(found)[1].lower() not in ALLOWED_IMAGE_EXTS:
+			issues.append(PreflightIssue('photos', f"Geen ondersteund fotoformaat: {photo}"))
+	return issues
+
+
+def preflight_item(row: Mapping[str, Any], media_root: str, tree: Optional[CategoryTree] = None) -> Tuple[Optional[Product], List[PreflightIssue]]:
+	"""
+	Check one CSV row or API item. Returns the parsed Product (None if it does not parse)
+	and all issues found; the product is postable when none of them is fatal.
+	"""
+	tree = load_category_tree() if tree is None else tree
+	category_path = row.get('category_path')
+	if not row.get('category_schema') and tree.schema(category_path):
+		# CSV rows carry no schema; use the one cached with the local tree
+		row = {**row, 'category_schema': tree.schema(category_path)}
+	try:
+		product = product_from_row(row)
+	except ProductParseError as e:
+		return None, [PreflightIssue(e.field, str(e))]
+
+	issues: List[PreflightIssue] = []
+	if not product.price:
+		issues.append(PreflightIssue('price', "Prijs ontbreekt"))
+	if not product.description:
+		issues.append(PreflightIssue('description', "Beschrijving ontbreekt"))
+	if product.category_path:
+		if tree and product.category_path not in tree:
+			issues.append(PreflightIssue('category_path', f"Onbekende categorie: {product.category_path}"))
+	else:
+		issues.append(PreflightIssue('category_path', "Geen categorie; Marktplaats kiest er een op basis van de titel", False))
+	issues.extend(_check_attributes(product))
+	issues.extend(_check_photos(product, media_root))
+	return product, issues
+
+
+def check_rows(rows: Iterable[Tuple[Any, Mapping[str, Any]]], media_root: str, tree: Optional[CategoryTree] = None) -> List[PreflightResult]:
+	"""Check (ref, row) pairs in this process; only results with issues are returned."""
+	results: List[PreflightResult] = []
+	for ref, row in rows:
+		product, issues = preflight_item(row, media_root, tree)
+		if issues:
+			results.append(PreflightResult(ref, product.title if product else row.get('title'), issues))
+	return results
+
+
+_worker_media_root = ''
+_worker_tree: Optional[CategoryTree] = None
+
+
+def _init_worker(tree_path: Optional[str], media_root: str) -> None:
+	global _worker_media_root, _worker_tree
+	_worker_media_root = media_root
+	_worker_tree = load_category_tree(tree_path)
+
+
+def _check_chunk(chunk: List[Tuple[Any, Dict]]) -> List[PreflightResult]:
+	return check_rows(chunk, _worker_media_root, _worker_tree)
+
+
+def _chunks(rows: Iterable[Tuple[Any, Dict]], size: int) -> Iterator[List[Tuple[Any, Dict]]]:
+	chunk: List[Tuple[Any, Dict]] = []
+	for item in rows:
+		chunk.append(item)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+@dataclass
+class PreflightReport:
+	checked: int = 0
+	failed: List[PreflightResult] = field(default_factory=list)
+	warned: List[PreflightResult] = field(default_factory=list)
+	seconds: float = 0.0
+
+	@property
+	def passed(self) -> int:
+		return self.checked - len(self.failed)
+
+	def failed_refs(self) -> Set[Any]:
+		return {result.ref for result in self.failed}
+
+	def add(self, results: Iterable[PreflightResult]) -> None:
+		for result in results:
+			(self.warned if result.ok else self.failed).append(result)
+
+	def to_dict(self) -> Dict:
+		def issues(result: PreflightResult) -> Dict:
+			return {
+				'ref': result.ref,
+				'title': result.title,
+				'issues': [{'field': i.field, 'message': i.message, 'fatal': i.fatal} for i in result.issues],
+			}
+		return {
+			'checked': self.checked,
+			'passed': self.passed,
+			'failed': [issues(r) for r in self.failed],
+			'warnings': [issues(r) for r in self.warned],
+			'seconds': round(self.seconds, 2),
+		}
+
+
+def _ref_order(result: PreflightResult) -> Tuple[int, Any]:
+	return (0, result.ref) if isinstance(result.ref, int) else (1, str(result.ref))
+
+
+def preflight_rows(
+	rows: Iterable[Tuple[Any, Dict]],
+	media_root: str,
+	workers: Optional[int] = None,
+	tree_path: Optional[str] = None,
+) -> PreflightReport:
+	"""
+	Check all (ref, row) pairs. With more than one chunk of rows the chunks are spread over
+	`workers` processes (default: all cores), with a bounded number in flight so a large CSV
+	is never fully in memory.
+	"""
+	start = time.perf_counter()
+	report = PreflightReport()
+	workers = workers or os.cpu_count() or 1
+	chunks = _chunks(rows, CHUNK_SIZE)
+	head = list(islice(chunks, 2))
+	if workers == 1 or len(head) < 2:
+		# A worker's claimed batch or a small file: spawning processes costs more than it saves
+		tree = load_category_tree(tree_path)
+		for chunk in chain(head, chunks):
+			report.checked += len(chunk)
+			report.add(check_rows(chunk, media_root, tree))
+	else:
+		with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tree_path, media_root)) as executor:
+			in_flight = set()
+			for chunk in chain(head, chunks):
+				report.checked += len(chunk)
+				in_flight.add(executor.submit(_check_chunk, chunk))
+				if len(in_flight) >= workers * 2:
+					done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+					for future in done:
+						report.add(future.result())
+			for future in in_flight:
+				report.add(future.result())
+	# Chunks finish out of order; report in file / queue order
+	report.failed.sort(key=_ref_order)
+	report.warned.sort(key=_ref_order)
+	report.seconds = time.perf_counter() - start
+	return report
+
+
+def preflight_csv(path: str, media_root: str, workers: Optional[int] = None) -> PreflightReport:
+	"""Check every row of a CSV file; refs are the line numbers used by iter_csv_products(skip=...)."""
+	return preflight_rows(iter_csv_rows(path), media_root, workers)
+
+
+def print_report(report: PreflightReport, limit: int = 50) -> None:
+	print(f"[OK] Pre-flight: {report.checked} product(en) gecontroleerd in {report.seconds:.1f}s: "
+		f"{report.passed} plaatsbaar, {len(report.failed)} afgekeurd, {len(report.warned)} met waarschuwing")
+	for result in report.failed[:limit]:
+		print(f"[ERROR] {result.ref} {result.title or ''}: {result.error}")
+	if len(report.failed) > limit:
+		print(f"[ERROR] ... en nog {len(report.failed) - limit} afgekeurde product(en)")
+	for result in report.warned[:limit]:
+		print(f"[WARNING] {result.ref} {result.title or ''}: " + '; '.join(i.message for i in result.issues))
+	if len(report.warned) > limit:
+		print(f"[WARNING] ... en nog {len(report.warned) - limit} product(en) met waarschuwing")
+
+
+def fetch_category_tree(path: Optional[str] = None) -> int:
+	"""Save the categories (with attribute schemas) from the API as the local tree."""
+	from api_client import ApiClient
+
+	path = path or os.getenv('MP_CATEGORY_TREE', DEFAULT_CATEGORY_TREE)
+	client = ApiClient()
+	try:
+		tree = client.get_json('/api/categories')
+	finally:
+		client.close()
+	flat: List[Dict] = []
+	stack = list(tree)
+	while stack:
+		node = stack.pop()
+		stack.extend(node.get('children') or [])
+		flat.append({key: node.get(key) for key in ('id', 'name', 'level', 'parentId', 'path', 'attributeSchema')})
+	flat.sort(key=lambda c: (c.get('level') or 0, c.get('path') or ''))
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump(flat, f, ensure_ascii=False, indent=2)
+	load_category_tree.cache_clear()
+	print(f"[OK] {len(flat)} categorieën opgeslagen in {path}")
+	return len(flat)
+
+
+def fetch_pending_rows() -> List[Tuple[Any, Dict]]:
+	from api_client import ApiClient
+
+	client = ApiClient()
+	try:
+		items = client.get_json('/api/products/pending')
+	finally:
+		client.close()
+	return [(item.get('id'), item) for item in items]
+
+
+def main() -> None:
+	from dotenv import load_dotenv
+
+	load_dotenv()
+	parser = argparse.ArgumentParser(description="Controleer de wachtrij offline voordat er geplaatst wordt")
+	source = parser.add_mutually_exclusive_group()
+	source.add_argument("--csv", help="CSV bestand (ook .csv.gz)")
+	source.add_argument("--pending", action="store_true", help="Alle pending producten uit de API")
+	parser.add_argument("--fetch-categories", action="store_true", help="Categorieboom met schema's uit de API cachen")
+	parser.add_argument("--workers", type=int, default=None, help="Aantal processen (default: alle cores)")
+	parser.add_argument("--media-root", default=os.getenv('MEDIA_ROOT', './public/media'))
+	parser.add_argument("--json", dest="json_path", help="Schrijf het rapport ook als JSON")
+	args = parser.parse_args()
+
+	if args.fetch_categories:
+		fetch_category_tree()
+	if not args.csv and not args.pending:
+		if args.fetch_categories:
+			return
+		parser.error("--csv of --pending is verplicht")
+
+	if args.csv:
+		report = preflight_csv(args.csv, args.media_root, args.workers)
+	else:
+		report = preflight_rows(fetch_pending_rows(), args.media_root, args.workers)
+	print_report(report)
+	if args.json_path:
+		with open(args.json_path, 'w', encoding='utf-8') as f:
+			json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+		print(f"[OK] Rapport opgeslagen in {args.json_path}")
+	raise SystemExit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,307 @@
+"""
+Gedeeld productmodel voor de posting scripts.
+Eén compacte Product klasse (met __slots__) en één parse-pad voor zowel CSV rijen
+als items uit de pending/export API, zodat post_ads, de standalone runner en de
+workers dezelfde opschoning en validatie gebruiken.
+
+Grote CSV bestanden (ook .csv.gz) worden gestreamd: scan_csv() meldt vooraf alle
+foute rijen en iter_csv_products() levert daarna lazy de geldige producten.
+"""
+import csv
+import gzip
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Container, Dict, Iterator, List, Mapping, NamedTuple, Optional, TextIO, Tuple
+
+from category_schema import CategorySchema, CategorySchemaError, schema_for
+
+
+PRODUCT_FIELDS = (
+	'title', 'description', 'price', 'category_path', 'location', 'photos',
+	'article_number', 'condition', 'delivery_methods',
+	'material', 'thickness', 'total_surface',  # Deprecated: use category_fields instead
+	'delivery_option', 'category_fields',
+	'category_schema',  # Scraped attribute schema of the category, shared per category
+)
+
+ALLOWED_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".heic"}
+
+
+class ProductParseError(ValueError):
+	"""A row or API item that cannot be turned into a postable Product."""
+
+	def __init__(self, message: str, field: Optional[str] = None):
+		super().__init__(message)
+		self.field = field
+
+
+class Product:
+	"""One ad to post. Slotted, so a queue of 100k products carries no per-instance dict."""
+
+	__slots__ = PRODUCT_FIELDS
+
+	def __init__(
+		self,
+		title: str,
+		description: str,
+		price: str,
+		category_path: Optional[str],
+		location: Optional[str],
+		photos: List[str],
+		article_number: Optional[str] = None,
+		condition: Optional[str] = None,
+		delivery_methods: Optional[List[str]] = None,
+		material: Optional[str] = None,
+		thickness: Optional[str] = None,
+		total_surface: Optional[str] = None,
+		delivery_option: Optional[str] = None,
+		category_fields: Optional[Dict] = None,
+		category_schema: Optional[CategorySchema] = None,
+	):
+		self.title = title
+		self.description = description
+		self.price = price
+		self.category_path = category_path
+		self.location = location
+		self.photos = photos
+		self.article_number = article_number
+		self.condition = condition
+		self.delivery_methods = delivery_methods
+		self.material = material
+		self.thickness = thickness
+		self.total_surface = total_surface
+		self.delivery_option = delivery_option
+		self.category_fields = category_fields
+		self.category_schema = category_schema
+
+	def __repr__(self) -> str:
+		return f"Product(article_number={self.article_number!r}, title={self.title!r}, price={self.price!r})"
+
+	def __eq__(self, other: object) -> bool:
+		if not isinstance(other, Product):
+			return NotImplemented
+		return all(getattr(self, name) == getattr(other, name) for name in PRODUCT_FIELDS)
+
+	def to_dict(self) -> Dict[str, Any]:
+		return {name: getattr(self, name) for name in PRODUCT_FIELDS}
+
+
+def clean_text(value: Any) -> Optional[str]:
+	"""Strip a cell/JSON value; empty becomes None."""
+	if value is None:
+		return None
+	if type(value) is not str:
+		value = str(value)
+	return value.strip() or None
+
+
+def _shared_text(value: Any) -> Optional[str]:
+	# Values that repeat across a catalog (location, condition, ...) share one string object
+	text = clean_text(value)
+	return sys.intern(text) if text else None
+
+
+def split_list(value: Any, separator: str) -> List[str]:
+	"""Accept both a list (API) and a separated string (CSV)."""
+	if not value:
+		return []
+	items = value if isinstance(value, (list, tuple)) else str(value).split(separator)
+	return [str(item).strip() for item in items if item and str(item).strip()]
+
+
+def parse_price(value: Any) -> str:
+	"""Validate a price; returned as typed (the form takes Dutch notation too), raises on anything non-numeric."""
+	text = clean_text(value)
+	if text is None:
+		return ''
+	try:
+		amount = float(text)
+	except ValueError:
+		# Dutch notation: "€ 1.250,50"
+		normalized = text.replace('€', '').replace(' ', '')
+		if ',' in normalized:
+			normalized = normalized.replace('.', '').replace(',', '.')
+		try:
+			amount = float(normalized)
+		except ValueError:
+			raise ProductParseError(f"Ongeldige prijs: {text!r}", 'price')
+	if amount < 0:
+		raise ProductParseError(f"Negatieve prijs: {text!r}", 'price')
+	return text
+
+
+def parse_category_fields(value: Any) -> Optional[Dict]:
+	if isinstance(value, dict):
+		return value or None
+	if isinstance(value, str) and value.strip():
+		# CSV exports may carry the fields as a JSON object in one cell
+		try:
+			parsed = json.loads(value)
+		except ValueError:
+			raise ProductParseError("category_fields is geen geldige JSON", 'category_fields')
+		return parsed if isinstance(parsed, dict) and parsed else None
+	return None
+
+
+def product_from_row(row: Mapping[str, Any]) -> Product:
+	"""
+	Build a validated Product from a CSV row or an API item (same keys in both).
+	Raises ProductParseError for rows that could never be posted.
+	"""
+	get = row.get
+	title = clean_text(get('title'))
+	if title is None:
+		raise ProductParseError("Titel ontbreekt", 'title')
+
+	category_path = _shared_text(get('category_path'))
+	category_fields = parse_category_fields(get('category_fields'))
+	category_schema = schema_for(category_path, get('category_schema'))
+	if category_schema is not None and category_fields:
+		try:
+			category_schema.resolve(category_fields)
+		except CategorySchemaError as e:
+			raise ProductParseError(f"Ongeldige categorievelden: {e}", 'category_fields')
+
+	return Product(
+		title=title,
+		description=clean_text(get('description')) or '',
+		price=parse_price(get('price')),
+		category_path=category_path,
+		location=_shared_text(get('location')),
+		photos=split_list(get('photos'), ';'),
+		article_number=clean_text(get('article_number')),
+		condition=_shared_text(get('condition')),
+		delivery_methods=split_list(get('delivery_methods'), ','),
+		material=_shared_text(get('material')),
+		thickness=_shared_text(get('thickness')),
+		total_surface=_shared_text(get('total_surface')),
+		delivery_option=_shared_text(get('delivery_option')),
+		category_fields=category_fields,
+		category_schema=category_schema,
+	)
+
+
+def find_photos_for_article(media_root: str, article_number: str) -> List[str]:
+	folder = os.path.join(media_root, str(article_number))
+	if not os.path.isdir(folder):
+		return []
+	files: List[str] = []
+	for name in sorted(os.listdir(folder)):
+		path = os.path.join(folder, name)
+		if not os.path.isfile(path):
+			continue
+		ext = os.path.splitext(name)[1].lower()
+		if ext in ALLOWED_IMAGE_EXTS:
+			files.append(os.path.abspath(path))
+	return files
+
+
+def locate_photo(path: str, media_root: str) -> Optional[str]:
+	"""An absolute photo path, or one relative to the working directory or media_root, if it exists."""
+	if os.path.isabs(path):
+		candidates = [path]
+	else:
+		candidates = [os.path.abspath(path), os.path.abspath(os.path.join(media_root, path))]
+	return next((c for c in candidates if os.path.exists(c)), None)
+
+
+def resolve_photo_paths(product: Product, media_root: str, log: Optional[Callable[[str], None]] = None) -> List[str]:
+	"""
+	Absolute paths of the product's photos that exist: each entry of product.photos as an
+	absolute path, relative to the working directory or relative to media_root; without any,
+	the files in media_root/<article_number>.
+	"""
+	log = log or (lambda message: None)
+	photos: List[str] = []
+	if product.photos:
+		log(f"  Product heeft {len(product.photos)} foto path(s) in product.photos")
+		for i, p in enumerate(product.photos, 1):
+			if not p:
+				log(f"  Foto {i}: (leeg)")
+				continue
+			found = locate_photo(p, media_root)
+			if found:
+				photos.append(found)
+				log(f"  Foto {i}: {found} (gevonden)")
+			else:
+				log(f"  Foto {i}: {p} (niet gevonden)")
+
+	if not photos and product.article_number:
+		log(f"  Geen foto's in product.photos, zoeken op artikelnummer: {product.article_number}")
+		photos = find_photos_for_article(media_root, product.article_number)
+		if photos:
+			log(f"  {len(photos)} foto(s) gevonden op artikelnummer")
+
+	return [os.path.normpath(os.path.abspath(p)) for p in photos]
+
+
+class RowError(NamedTuple):
+	line: int
+	field: Optional[str]
+	message: str
+
+
+@dataclass
+class CsvScan:
+	rows: int = 0
+	valid: int = 0
+	errors: List[RowError] = field(default_factory=list)
+	more_errors: int = 0  # errors beyond the ones kept in `errors`
+
+	@property
+	def invalid(self) -> int:
+		return len(self.errors) + self.more_errors
+
+
+def open_csv(path: str) -> TextIO:
+	"""Open a (optionally gzip-compressed) CSV file for csv.DictReader."""
+	with open(path, 'rb') as f:
+		compressed = f.read(2) == b'\x1f\x8b'
+	# utf-8-sig also reads Excel exports that start with a BOM
+	if compressed:
+		return gzip.open(path, 'rt', newline='', encoding='utf-8-sig')
+	return open(path, newline='', encoding='utf-8-sig')
+
+
+def iter_csv_rows(path: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+	"""Yield (line number, row); the line number is where the row ends in the file."""
+	with open_csv(path) as f:
+		reader = csv.DictReader(f)
+		if reader.fieldnames is None or 'title' not in reader.fieldnames:
+			raise ProductParseError(f"{path}: kolom 'title' ontbreekt in de header", 'title')
+		for row in reader:
+			yield reader.line_num, row
+
+
+def iter_csv_products(
+	path: str,
+	on_error: Optional[Callable[[RowError], None]] = None,
+	skip: Optional[Container[int]] = None,
+) -> Iterator[Product]:
+	"""Lazily yield the valid products of a CSV file; invalid rows go to on_error, lines in skip are left out."""
+	for line, row in iter_csv_rows(path):
+		if skip and line in skip:
+			continue
+		try:
+			yield product_from_row(row)
+		except ProductParseError as e:
+			if on_error is not None:
+				on_error(RowError(line, e.field, str(e)))
+
+
+def scan_csv(path: str, max_errors: int = 1000) -> CsvScan:
+	"""Validate every row without keeping the products, so errors surface before posting starts."""
+	scan = CsvScan()
+	for line, row in iter_csv_rows(path):
+		scan.rows += 1
+		try:
+			product_from_row(row)
+			scan.valid += 1
+		except ProductParseError as e:
+			if len(scan.errors) < max_errors:
+				scan.errors.append(RowError(line, e.field, str(e)))
+			else:
+				scan.more_errors += 1
+	return scan
@@ -0,0 +1,198 @@
+"""
+Adaptieve rate limiter voor Marktplaats interacties.
+Per account en per actie (navigation, publish, stats) een token bucket waarvan
+het tempo zich aanpast (AIMD): langzaam omhoog bij succes, halveren bij fouten,
+afremmen bij trage responses en een pauze bij een captcha.
+
+Instellen (acties per minuut):
+	MP_RATE_PUBLISH=4 MP_RATE_PUBLISH_MIN=0.5 MP_RATE_PUBLISH_MAX=12
+	MP_ADAPTIVE_RATE=false   # terug naar de vaste ACTION_DELAY_MS pauze
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+# action: (start, min, max) per minute, burst, seconds after which a call counts as slow
+ACTION_DEFAULTS = {
+	'navigation': ((30.0, 6.0, 120.0), 3, 8.0),
+	'publish': ((4.0, 0.5, 12.0), 1, 15.0),
+	'stats': ((20.0, 4.0, 60.0), 3, 8.0),
+}
+
+CAPTCHA_PAUSE_S = 120.0
+MAX_CAPTCHA_PAUSE_S = 1800.0
+
+CAPTCHA_SELECTORS = (
+	"iframe[src*='captcha']",
+	"iframe[src*='recaptcha']",
+	"iframe[src*='hcaptcha']",
+	"iframe[src*='geo.captcha-delivery.com']",
+	"#px-captcha",
+	"[class*='captcha']",
+)
+
+
+def adaptive_enabled() -> bool:
+	return os.getenv('MP_ADAPTIVE_RATE', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+class CaptchaDetected(Exception):
+	pass
+
+
+class AdaptiveTokenBucket:
+	"""Token bucket whose refill rate follows additive-increase / multiplicative-decrease."""
+
+	def __init__(self, name: str, rate: float, min_rate: float, max_rate: float, burst: int = 1, slow_after_s: float = 10.0):
+		self.name = name
+		self.min_rate = min_rate
+		self.max_rate = max_rate
+		self.rate = min(max(rate, min_rate), max_rate)  # per minute
+		self.burst = burst
+		self.slow_after_s = slow_after_s
+		self.tokens = float(burst)
+		self.updated = time.monotonic()
+		self.paused_until = 0.0
+		self.captchas = 0
+		self.successes = 0
+		self.failures = 0
+		self._lock = asyncio.Lock()
+
+	def _refill(self, now: float) -> None:
+		self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate / 60.0)
+		self.updated = now
+
+	async def acquire(self) -> None:
+		async with self._lock:
+			while True:
+				now = time.monotonic()
+				if now < self.paused_until:
+					await asyncio.sleep(self.paused_until - now)
+					continue
+				self._refill(now)
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				await asyncio.sleep((1 - self.tokens) * 60.0 / self.rate)
+
+	def success(self, duration_s: float) -> None:
+		self.successes += 1
+		self.captchas = 0
+		if duration_s > self.slow_after_s:
+			# The site is slowing down: ease off before it starts failing
+			self.rate = max(self.min_rate, self.rate * 0.8)
+		else:
+			self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+	def failure(self) -> None:
+		self.failures += 1
+		self.rate = max(self.min_rate, self.rate / 2)
+
+	def captcha(self) -> float:
+		"""Drop to the minimum rate and pause; consecutive captchas double the pause."""
+		self.failures += 1
+		self.captchas += 1
+		self.rate = self.min_rate
+		pause = min(CAPTCHA_PAUSE_S * 2 ** (self.captchas - 1), MAX_CAPTCHA_PAUSE_S)
+		self.paused_until = time.monotonic() + pause
+		self.tokens = 0.0
+		return pause
+
+
+class _Slot:
+	def __init__(self, bucket: AdaptiveTokenBucket):
+		self.bucket = bucket
+		self.failed = False
+
+	def fail(self) -> None:
+		"""Count the call as failed even though it did not raise (e.g. no ad URL)."""
+		if not self.failed:
+			self.failed = True
+			self.bucket.failure()
+
+
+class AccountRateLimiter:
+	"""All buckets for one account (browser profile)."""
+
+	def __init__(self, account: str):
+		self.account = account
+		self.enabled = adaptive_enabled()
+		self.buckets: Dict[str, AdaptiveTokenBucket] = {}
+
+	def bucket(self, action: str) -> AdaptiveTokenBucket:
+		if action not in self.buckets:
+			(rate, min_rate, max_rate), burst, slow_after_s = ACTION_DEFAULTS[action]
+			prefix = f"MP_RATE_{action.upper()}"
+			self.buckets[action] = AdaptiveTokenBucket(
+				f"{self.account}:{action}",
+				float(os.getenv(prefix, rate)),
+				float(os.getenv(f"{prefix}_MIN", min_rate)),
+				float(os.getenv(f"{prefix}_MAX", max_rate)),
+				burst,
+				slow_after_s,
+			)
+		return self.buckets[action]
+
+	@asynccontextmanager
+	async def slot(self, action: str):
+		"""Wait for a token, then report the outcome of the wrapped call back to the bucket."""
+		bucket = self.bucket(action)
+		slot = _Slot(bucket)
+		if not self.enabled:
+			yield slot
+			return
+		await bucket.acquire()
+		start = time.monotonic()
+		try:
+			yield slot
+		except CaptchaDetected:
+			pause = bucket.captcha()
+			print(f"[WARNING] Captcha bij {bucket.name}, pauze van {pause:.0f}s en tempo naar {bucket.rate:.1f}/min")
+			raise
+		except Exception:
+			slot.fail()
+			raise
+		if not slot.failed:
+			bucket.success(time.monotonic() - start)
+
+	def snapshot(self) -> Dict[str, Dict]:
+		return {
+			action: {
+				'rate_per_min': round(b.rate, 2),
+				'successes': b.successes,
+				'failures': b.failures,
+				'paused_s': round(max(b.paused_until - time.monotonic(), 0), 1),
+			}
+			for action, b in self.buckets.items()
+		}
+
+
+_limiters: Dict[str, AccountRateLimiter] = {}
+
+
+def get_limiter(account: Optional[str] = None) -> AccountRateLimiter:
+	"""Shared limiter per account, so parallel lanes on one account share its budget."""
+	key = account or 'default'
+	if key not in _limiters:
+		_limiters[key] = AccountRateLimiter(key)
+	return _limiters[key]
+
+
+async def detect_captcha(page) -> bool:
+	try:
+		if 'captcha' in page.url.lower():
+			return True
+		for selector in CAPTCHA_SELECTORS:
+			if await page.locator(selector).count() > 0:
+				return True
+		return await page.get_by_text("Ik ben geen robot", exact=False).count() > 0
+	except Exception:
+		return False
+
+
+async def raise_on_captcha(page) -> None:
+	if await detect_captcha(page):
+		raise CaptchaDetected(f"Captcha op {page.url}")
@@ -2,29 +2,39 @@
 Scrape advertentie statistieken van een geplaatste Marktplaats advertentie.
 Haalt op: advertentienummer, aantal views, aantal saves, en geplaatst datum.
 """
+import os
 import re
 from typing import Dict, Optional
 from playwright.async_api import Page
 
+from dutch_dates import parse_dutch_date
+
+# Time to let the ad page render its stats; HAR replay sets MP_SCRAPE_SETTLE_MS=0
+SETTLE_MS = int(os.getenv('MP_SCRAPE_SETTLE_MS', '2000'))
+
+# "Sinds 6 nov '25", "Sinds 6 nov 2025", "Sinds 12 mrt"
+POSTED_AT_RE = re.compile(r"Sinds\s+(\d{1,2}\s+[a-z]+\.?(?:\s+['’]?\d{2,4})?)", re.IGNORECASE)
+
 
 async def scrape_ad_stats(page: Page, ad_url: str) -> Optional[Dict[str, any]]:
 	"""
 	Scrape statistieken van een Marktplaats advertentie pagina.
 	
 	Returns:
-		Dict met: ad_id, views, saves, posted_at
+		Dict met: ad_id, views, saves, posted_at (ISO timestamp) en posted_at_raw
 		None als scraping faalt
 	"""
 	try:
 		# Navigate to the ad page
 		await page.goto(ad_url, wait_until="domcontentloaded", timeout=30000)
-		await page.wait_for_timeout(2000)
+		await page.wait_for_timeout(SETTLE_MS)
 		
 		stats = {
 			'ad_id': None,
 			'views': 0,
 			'saves': 0,
 			'posted_at': None,
+			'posted_at_raw': None,
 		}
 		
 		# Extract ad ID from URL (format: a1519860984)
@@ -76,9 +86,8 @@ async def scrape_ad_stats(page: Page, ad_url: str) -> Optional[Dict[str, any]]:
 			if await date_text.count() > 0:
 				text = await date_text.first.text_content()
 				if text:
-					# Extract date - format can vary
-					# We'll store the raw text and parse it later if needed
-					stats['posted_at'] = text.replace('Sinds', '').strip()
+					date_match = POSTED_AT_RE.search(text)
+					stats['posted_at_raw'] = date_match.group(1) if date_match else text.replace('Sinds', '').strip()
 		except Exception:
 			pass
 		
@@ -100,12 +109,15 @@ async def scrape_ad_stats(page: Page, ad_url: str) -> Optional[Dict[str, any]]:
 						stats['saves'] = int(saves_match.group(1))
 					
 					# Extract date
-					date_match = re.search(r'Sinds\s+(.+)', container_text, re.IGNORECASE)
+					date_match = POSTED_AT_RE.search(container_text)
 					if date_match:
-						stats['posted_at'] = date_match.group(1).strip()
+						stats['posted_at_raw'] = date_match.group(1).strip()
 		except Exception:
 			pass
 		
+		# Convert "6 nov '25" / "Vandaag" etc. to an ISO timestamp at scrape time
+		stats['posted_at'] = parse_dutch_date(stats['posted_at_raw'])
+		
 		return stats
 		
 	except Exception as e:
@@ -6,6 +6,7 @@ import asyncio
 import json
 import os
 from playwright.async_api import async_playwright
+from har_replay import apply_har_mode
 from typing import Dict, List, Optional, Set
 
 
@@ -58,6 +59,8 @@ async def scrape_all_categories_complete() -> List[Dict]:
                 )
                 print("✅ Chromium gebruikt (met user_data directory)")
         page = await browser.new_page()
+        # Opnemen/offline afspelen via HAR (MP_HAR_MODE=record|replay, zie har_replay.py)
+        await apply_har_mode(page, os.getenv("MP_HAR_NAME", "categories_complete"))
         
         page.set_default_navigation_timeout(60000)
         page.set_default_timeout(45000)
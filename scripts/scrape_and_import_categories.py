@@ -47,12 +47,15 @@ async def main():
     
     try:
         # Import via de import functie
-        import_categories_to_db(temp_file)
+        imported = import_categories_to_db(temp_file)
     finally:
         # Verwijder tijdelijk bestand
         if os.path.exists(temp_file):
             os.remove(temp_file)
     
+    if not imported:
+        print("\n❌ Import niet voltooid")
+        sys.exit(1)
     print("\n✅ Klaar!")
 
 
@@ -6,6 +6,7 @@ import asyncio
 import json
 import os
 from playwright.async_api import async_playwright
+from har_replay import apply_har_mode
 from typing import Dict, List, Set
 
 
@@ -26,6 +27,8 @@ async def scrape_categories_from_url() -> List[Dict]:
             args=["--disable-blink-features=AutomationControlled"],
         )
         page = await browser.new_page()
+        # Opnemen/offline afspelen via HAR (MP_HAR_MODE=record|replay, zie har_replay.py)
+        await apply_har_mode(page, os.getenv("MP_HAR_NAME", "categories_from_url"))
         
         # Verhoog timeouts voor betere stabiliteit
         page.set_default_navigation_timeout(60000)
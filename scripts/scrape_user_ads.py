@@ -2,10 +2,17 @@
 Scrape alle advertenties en statistieken van een Marktplaats gebruiker pagina.
 Bijvoorbeeld: https://www.marktplaats.nl/u/chiel/23777446/
 """
+import os
 import re
 from typing import Dict, List, Optional
 from playwright.async_api import Page
 
+from dutch_dates import parse_dutch_dates
+
+# Render waits for the user page and ad pages; HAR replay sets MP_SCRAPE_SETTLE_MS=0
+USER_PAGE_SETTLE_MS = int(os.getenv('MP_SCRAPE_SETTLE_MS', '3000'))
+AD_PAGE_SETTLE_MS = int(os.getenv('MP_SCRAPE_SETTLE_MS', '2000'))
+
 
 async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 	"""
@@ -17,7 +24,7 @@ async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 	try:
 		# Navigate to the user page
 		await page.goto(user_url, wait_until="domcontentloaded", timeout=30000)
-		await page.wait_for_timeout(3000)
+		await page.wait_for_timeout(USER_PAGE_SETTLE_MS)
 		
 		ads = []
 		
@@ -106,7 +113,7 @@ async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 						ad_data['saves'] = int(saves_match.group(1))
 					
 					# Extract date
-					date_match = re.search(r'(Vandaag|Gisteren|Een week|Sinds \d+)', element_text, re.IGNORECASE)
+					date_match = re.search(r"(Vandaag|Gisteren|Een week|Sinds \d{1,2}(?: [a-z]+\.?(?: ['’]?\d{2,4})?)?)", element_text, re.IGNORECASE)
 					if date_match:
 						ad_data['posted_at'] = date_match.group(1)
 				
@@ -122,8 +129,8 @@ async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 								ad_data['saves'] = ad_stats.get('saves', 0)
 							if ad_stats.get('ad_id') and not ad_data['ad_id']:
 								ad_data['ad_id'] = ad_stats.get('ad_id')
-							if ad_stats.get('posted_at') and not ad_data['posted_at']:
-								ad_data['posted_at'] = ad_stats.get('posted_at')
+							if ad_stats.get('posted_at_raw') and not ad_data['posted_at']:
+								ad_data['posted_at'] = ad_stats.get('posted_at_raw')
 					except Exception as e:
 						print(f"Fout bij scrapen individuele ad stats: {e}")
 				
@@ -183,7 +190,7 @@ async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 							const saves = savesMatch ? parseInt(savesMatch[1]) : 0;
 							
 							// Extract date
-							const dateMatch = allText.match(/(Vandaag|Gisteren|Een week|Sinds \\d+)/i);
+							const dateMatch = allText.match(/(Vandaag|Gisteren|Een week|Sinds \\d{1,2}(?: [a-z]+\\.?(?: ['’]?\\d{2,4})?)?)/i);
 							const postedAt = dateMatch ? dateMatch[1] : null;
 							
 							if (adId || title) {
@@ -209,6 +216,12 @@ async def scrape_user_ads(page: Page, user_url: str) -> List[Dict[str, any]]:
 			except Exception as e:
 				print(f"Fout bij JavaScript extractie: {e}")
 		
+		# Convert all raw Dutch dates in one pass; keep the original text alongside
+		raw_dates = [ad.get('posted_at') for ad in ads]
+		for ad, raw, iso in zip(ads, raw_dates, parse_dutch_dates(raw_dates)):
+			ad['posted_at_raw'] = raw
+			ad['posted_at'] = iso
+		
 		return ads
 		
 	except Exception as e:
@@ -222,7 +235,7 @@ async def get_user_url_from_ad(page: Page, ad_url: str) -> Optional[str]:
 	"""
 	try:
 		await page.goto(ad_url, wait_until="domcontentloaded", timeout=30000)
-		await page.wait_for_timeout(2000)
+		await page.wait_for_timeout(AD_PAGE_SETTLE_MS)
 		
 		# Look for user profile link
 		user_link = page.locator('a[href*="/u/"]').first
@@ -284,6 +297,7 @@ async def main():
 	
 	parser = argparse.ArgumentParser(description="Scrape Marktplaats user ads")
 	parser.add_argument("--url", type=str, required=True, help="User profile URL")
+	parser.add_argument("--push", action="store_true", help="Send scraped stats to /api/products/sync-stats/bulk")
 	args = parser.parse_args()
 	
 	user_data_dir = os.getenv('USER_DATA_DIR', './user_data')
@@ -312,6 +326,20 @@ async def main():
 		
 		await browser.close()
 	
+	if args.push and ads:
+		sys.path.insert(0, os.path.dirname(__file__))
+		from api_client import AsyncApiClient, StatsBatcher
+		async with AsyncApiClient() as api:
+			batcher = StatsBatcher(api.sync)
+
+			def push():
+				with batcher:
+					batcher.add_many(ads)
+
+			# The batcher posts every full batch; run all of it on the client's pool, off the event loop
+			await api.call(push)
+		print(f"Stats verzonden: {batcher.sent} rijen, {batcher.updated} producten bijgewerkt, {batcher.unmatched} zonder match")
+	
 	return ads
 
 
@@ -0,0 +1,278 @@
+"""
+Snelle controle of de Marktplaats sessie nog geldig is, zonder de homepage te laden.
+De sessiecookies (uit de browsercontext of uit storage_state.json) en hun vervaldatum
+bepalen het oordeel; optioneel bevestigt één goedkope, ingelogde request dat de server
+de sessie nog accepteert. Dat antwoord wordt per profiel bewaard (session_health.json)
+zolang de sessiecookies niet veranderen en de cachetijd niet om is.
+
+Instellen:
+	MP_SESSION_CHECK=false        # altijd de homepage laden (oude gedrag)
+	MP_SESSION_COOKIES=regex      # namen van de sessiecookies (default: sess|auth|token|login)
+	MP_SESSION_MIN_TTL_S=300      # cookies die binnen deze tijd verlopen tellen als verlopen
+	MP_SESSION_PROBE_URL=/pad     # ingelogde endpoint voor de bevestiging (default: geen)
+	MP_SESSION_CACHE_S=600        # hoe lang het antwoord van die endpoint geldt
+
+Gebruik:
+	python scripts/session_health.py              # alle accounts, alleen cookies
+	python scripts/session_health.py --probe      # plus de endpoint
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from browser_session import storage_state_path
+
+
+HEALTH_FILE = 'session_health.json'
+PROBE_TIMEOUT_MS = 5000
+
+
+def session_check_enabled() -> bool:
+	return os.getenv('MP_SESSION_CHECK', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _session_cookie_pattern() -> str:
+	return os.getenv('MP_SESSION_COOKIES', r'sess|auth|token|login')
+
+
+class SessionStatus(NamedTuple):
+	status: str  # 'logged_in' or 'expired'
+	reason: str
+	source: str  # 'cookies', 'probe' or 'cache'
+	elapsed_ms: float
+	expires_at: Optional[float] = None  # earliest expiry of the valid session cookies; None for browser-session cookies
+
+	@property
+	def logged_in(self) -> bool:
+		return self.status == 'logged_in'
+
+	def describe(self) -> str:
+		text = f"{self.status} ({self.reason}; {self.source}, {self.elapsed_ms:.1f} ms"
+		if self.logged_in and self.expires_at:
+			text += f", verloopt over {format_duration(self.expires_at - time.time())}"
+		return text + ")"
+
+
+def format_duration(seconds: float) -> str:
+	if seconds >= 86400:
+		return f"{seconds / 86400:.0f}d"
+	if seconds >= 3600:
+		return f"{seconds / 3600:.0f}u"
+	return f"{max(seconds, 0) / 60:.0f}m"
+
+
+def _domain_matches(cookie_domain: str, host: str) -> bool:
+	domain = cookie_domain.lstrip('.')
+	return bool(domain) and (host == domain or host.endswith('.' + domain))
+
+
+def session_cookies(cookies: List[Dict], base_url: str) -> List[Dict]:
+	"""The cookies of the site (and its parent domains) whose name marks them as session/auth cookies."""
+	pattern = re.compile(_session_cookie_pattern(), re.IGNORECASE)
+	host = urlparse(base_url).hostname or ''
+	return [c for c in cookies if pattern.search(c.get('name', '')) and _domain_matches(c.get('domain', ''), host)]
+
+
+def inspect_cookies(cookies: List[Dict], base_url: str, now: Optional[float] = None) -> Tuple[str, str, Optional[float]]:
+	"""(status, reason, expires_at) from the session cookies alone."""
+	now = now or time.time()
+	min_ttl_s = float(os.getenv('MP_SESSION_MIN_TTL_S', '300'))
+	found = session_cookies(cookies, base_url)
+	if not found:
+		return 'expired', 'geen sessiecookie', None
+	# expires -1 is a browser-session cookie, kept as long as the stored state
+	valid = [c for c in found if c.get('expires', -1) <= 0 or c['expires'] - now > min_ttl_s]
+	if not valid:
+		names = ', '.join(sorted({c['name'] for c in found}))
+		return 'expired', f"sessiecookies verlopen ({names})", None
+	expiries = [c['expires'] for c in valid if c.get('expires', -1) > 0]
+	return 'logged_in', f"{len(valid)} geldige sessiecookie(s)", min(expiries) if expiries else None
+
+
+def cookie_fingerprint(cookies: List[Dict]) -> str:
+	"""Changes when the session cookies do (new login, rolled token), so a cached probe verdict is dropped."""
+	values = sorted(f"{c.get('domain')}|{c.get('name')}={c.get('value')}" for c in cookies)
+	return hashlib.sha1('\n'.join(values).encode('utf-8')).hexdigest()
+
+
+async def probe_session(request, url: str) -> Tuple[str, str]:
+	"""Hit one authenticated endpoint without following redirects; a redirect or 401/403 means logged out."""
+	response = await request.get(url, max_redirects=0, timeout=PROBE_TIMEOUT_MS)
+	if 200 <= response.status < 300:
+		return 'logged_in', f"{urlparse(url).path} gaf {response.status}"
+	if 300 <= response.status < 400:
+		return 'expired', f"{urlparse(url).path} stuurt door naar {response.headers.get('location', '?')}"
+	if response.status in (401, 403):
+		return 'expired', f"{urlparse(url).path} gaf {response.status}"
+	raise RuntimeError(f"onverwacht antwoord {response.status}")
+
+
+class SessionHealth:
+	"""
+	Session verdict for one browser profile. Cookies are inspected on every check (microseconds);
+	the optional probe verdict is cached in memory and in the profile's session_health.json.
+	"""
+
+	def __init__(self, user_data_dir: Optional[str] = None, cache_s: Optional[float] = None):
+		self.user_data_dir = user_data_dir
+		self.cache_s = cache_s if cache_s is not None else float(os.getenv('MP_SESSION_CACHE_S', '600'))
+		self.probe_url = os.getenv('MP_SESSION_PROBE_URL', '').strip()
+		self._probe_cache: Optional[Dict] = None
+
+	def _health_path(self) -> Optional[str]:
+		return os.path.join(self.user_data_dir, HEALTH_FILE) if self.user_data_dir else None
+
+	def stored_cookies(self) -> List[Dict]:
+		"""Cookies of the profile's storage_state file, without any browser."""
+		if not self.user_data_dir:
+			return []
+		try:
+			with open(storage_state_path(self.user_data_dir), encoding='utf-8') as f:
+				return json.load(f).get('cookies', [])
+		except (OSError, ValueError):
+			return []
+
+	def _cached_probe(self, fingerprint: str) -> Optional[Dict]:
+		entry = self._probe_cache
+		path = self._health_path()
+		if entry is None and path:
+			try:
+				with open(path, encoding='utf-8') as f:
+					entry = self._probe_cache = json.load(f)
+			except (OSError, ValueError):
+				return None
+		if not entry or entry.get('fingerprint') != fingerprint or entry.get('url') != self.probe_url:
+			return None
+		if time.time() - entry.get('checked_at', 0) > self.cache_s:
+			return None
+		return entry
+
+	def _store_probe(self, entry: Dict) -> None:
+		self._probe_cache = entry
+		path = self._health_path()
+		if not path:
+			return
+		try:
+			os.makedirs(self.user_data_dir, exist_ok=True)
+			fd, tmp = tempfile.mkstemp(dir=self.user_data_dir, prefix='.session_health')
+			with os.fdopen(fd, 'w', encoding='utf-8') as f:
+				json.dump(entry, f)
+			os.replace(tmp, path)
+		except OSError:
+			pass
+
+	def invalidate(self) -> None:
+		self._probe_cache = None
+		path = self._health_path()
+		if path and os.path.exists(path):
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+	async def check(self, base_url: str, context=None, request=None, probe: Optional[bool] = None) -> SessionStatus:
+		"""
+		Verdict for the context's cookies, or for the stored storage_state without a context.
+		probe (default: when MP_SESSION_PROBE_URL is set) confirms a cookie-valid session
+		through request, or else context.request.
+		"""
+		started = time.perf_counter()
+		cookies = await context.cookies() if context is not None else self.stored_cookies()
+		status, reason, expires_at = inspect_cookies(cookies, base_url)
+		source = 'cookies'
+		request = request if request is not None else (context.request if context is not None else None)
+		if probe is None:
+			probe = bool(self.probe_url)
+		if status == 'logged_in' and probe and self.probe_url and request is not None:
+			fingerprint = cookie_fingerprint(session_cookies(cookies, base_url))
+			cached = self._cached_probe(fingerprint)
+			if cached is not None:
+				status, reason, source = cached['status'], cached['reason'], 'cache'
+			else:
+				try:
+					status, reason = await probe_session(request, urljoin(base_url + '/', self.probe_url.lstrip('/')))
+					source = 'probe'
+					self._store_probe({
+						'fingerprint': fingerprint,
+						'url': self.probe_url,
+						'status': status,
+						'reason': reason,
+						'checked_at': time.time(),
+					})
+				except Exception as e:
+					# The cookies still stand; an unreachable endpoint is no verdict
+					reason += f"; probe mislukt: {e}"
+		return SessionStatus(status, reason, source, (time.perf_counter() - started) * 1000, expires_at)
+
+
+_health: Dict[str, SessionHealth] = {}
+
+
+def get_session_health(user_data_dir: Optional[str] = None) -> SessionHealth:
+	"""Shared checker per profile, so lanes on one account share the cached verdict."""
+	key = os.path.abspath(user_data_dir) if user_data_dir else ''
+	if key not in _health:
+		_health[key] = SessionHealth(key or None)
+	return _health[key]
+
+
+async def _check_accounts(names: List[str], probe: bool) -> List[Tuple[str, SessionStatus]]:
+	from accounts import load_accounts
+
+	base_url = os.getenv('MARKTPLAATS_BASE_URL', 'https://www.marktplaats.nl').rstrip('/')
+	accounts = [a for a in load_accounts() if not names or a.name in names]
+	results = []
+	if not probe:
+		for account in accounts:
+			results.append((account.name, await get_session_health(account.user_data_dir).check(base_url, probe=False)))
+		return results
+
+	from playwright.async_api import async_playwright
+	async with async_playwright() as p:
+		for account in accounts:
+			health = get_session_health(account.user_data_dir)
+			state = storage_state_path(account.user_data_dir)
+			if not os.path.exists(state):
+				results.append((account.name, await health.check(base_url, probe=False)))
+				continue
+			# An API request context carries the stored cookies without starting a browser
+			request = await p.request.new_context(storage_state=state)
+			try:
+				results.append((account.name, await health.check(base_url, request=request, probe=True)))
+			finally:
+				await request.dispose()
+	return results
+
+
+def main() -> None:
+	from dotenv import load_dotenv
+
+	parser = argparse.ArgumentParser(description="Controleer of de opgeslagen Marktplaats sessies nog geldig zijn")
+	parser.add_argument("names", nargs="*", help="Accounts (default: alle)")
+	parser.add_argument("--probe", action="store_true", help="Bevestig via MP_SESSION_PROBE_URL")
+	parser.add_argument("--json", action="store_true", help="Uitvoer als JSON")
+	args = parser.parse_args()
+	load_dotenv(override=True)
+	if args.probe and not os.getenv('MP_SESSION_PROBE_URL'):
+		raise SystemExit("--probe vereist MP_SESSION_PROBE_URL")
+
+	results = asyncio.run(_check_accounts(args.names, args.probe))
+	if not results:
+		raise SystemExit("Geen accounts gevonden")
+	if args.json:
+		print(json.dumps({name: status._asdict() for name, status in results}, indent=2))
+	else:
+		for name, status in results:
+			print(f"{name:<20} {status.describe()}")
+	raise SystemExit(0 if all(status.logged_in for _, status in results) else 1)
+
+
+if __name__ == "__main__":
+	main()
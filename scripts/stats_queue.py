@@ -0,0 +1,130 @@
+"""
+Statistieken van net geplaatste advertenties buiten het plaats-pad ophalen.
+Normaal levert publish_ad() het advertentie-id al; alleen als dat ontbreekt moet
+de advertentie (of de gebruikerspagina) gescrapet worden. DeferredStats doet dat
+op een eigen tabblad in dezelfde browser, terwijl de plaats-lane al met het
+volgende product bezig is. Het resultaat van post_product() wordt ter plekke
+aangevuld; drain() wacht tot alles binnen is.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from playwright.async_api import Page
+
+from rate_limiter import AccountRateLimiter
+
+
+async def collect_ad_stats(page: Page, ad_url: str, article_number: Optional[str], limiter: AccountRateLimiter) -> Optional[Dict]:
+	"""Scrape id and stats of one ad: its own page first, then the seller's page."""
+	from scrape_ad_stats import scrape_ad_stats
+
+	async with limiter.slot('stats') as slot:
+		ad_stats = await scrape_ad_stats(page, ad_url)
+		if not ad_stats:
+			slot.fail()
+
+	# If that fails or doesn't get all data, try user page
+	if not ad_stats or not ad_stats.get('ad_id'):
+		try:
+			from scrape_user_ads import get_user_url_from_ad, scrape_user_ads
+			user_url = await get_user_url_from_ad(page, ad_url)
+			if user_url:
+				print(f"Found user page: {user_url}")
+				print("Scraping all ads from user page...")
+				user_ads = await scrape_user_ads(page, user_url)
+
+				# Find matching ad by article number or title
+				for user_ad in user_ads:
+					if user_ad.get('ad_id') and article_number:
+						# Try to match by checking if article number might be in title or URL
+						if article_number in (user_ad.get('title', '') or ''):
+							ad_stats = user_ad
+							break
+					elif user_ad.get('ad_url') == ad_url:
+						ad_stats = user_ad
+						break
+		except Exception as e:
+			print(f"Fout bij scrapen user page: {e}")
+
+	if ad_stats:
+		print(f"Stats scraped: Ad ID={ad_stats.get('ad_id')}, Views={ad_stats.get('views')}, Saves={ad_stats.get('saves')}")
+	return ad_stats
+
+
+class DeferredStats:
+	"""
+	Background queue that fills in ad_id/views/saves/posted_at of posted results on its
+	own page. open_page creates that page on first use; on_done (async) is called with
+	every result once it has been handled, found or not.
+	"""
+
+	def __init__(
+		self,
+		open_page: Callable[[], Awaitable[Page]],
+		limiter: AccountRateLimiter,
+		on_done: Optional[Callable[[Dict], Awaitable[None]]] = None,
+	):
+		self.open_page = open_page
+		self.limiter = limiter
+		self.on_done = on_done
+		self.collected = 0
+		self.missed = 0
+		self._queue: asyncio.Queue = asyncio.Queue()
+		self._task: Optional[asyncio.Task] = None
+		self._page: Optional[Page] = None
+
+	def defer(self, result: Dict, article_number: Optional[str] = None) -> None:
+		"""Queue a posted result whose ad id is still unknown; returns immediately."""
+		self._queue.put_nowait((result, article_number))
+		if self._task is None or self._task.done():
+			self._task = asyncio.create_task(self._run())
+
+	async def _run(self) -> None:
+		while True:
+			result, article_number = await self._queue.get()
+			try:
+				if self._page is None or self._page.is_closed():
+					self._page = await self.open_page()
+				ad_stats = await collect_ad_stats(self._page, result['ad_url'], article_number, self.limiter)
+				if ad_stats and ad_stats.get('ad_id'):
+					result.update({
+						'ad_id': ad_stats.get('ad_id'),
+						'views': ad_stats.get('views', 0),
+						'saves': ad_stats.get('saves', 0),
+						'posted_at': ad_stats.get('posted_at'),
+					})
+					self.collected += 1
+				else:
+					self.missed += 1
+				if self.on_done is not None:
+					await self.on_done(result)
+			except Exception as e:
+				self.missed += 1
+				print(f"[WARNING] Stats van {result.get('ad_url')} niet opgehaald: {e}")
+			finally:
+				self._queue.task_done()
+
+	@property
+	def pending(self) -> int:
+		return self._queue.qsize()
+
+	async def drain(self) -> None:
+		"""Wait until every deferred result is handled, then close the stats page."""
+		if self._task is not None:
+			await self._queue.join()
+		await self.close()
+
+	async def close(self) -> None:
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+			self._task = None
+		if self._page is not None:
+			try:
+				await self._page.close()
+			except Exception:
+				pass
+			self._page = None
@@ -0,0 +1,23 @@
+import pytest
+
+from ad_capture import PublishedAd, ad_from_payload
+
+
+PAGE_URL = 'https://www.marktplaats.nl/plaats/bevestiging'
+
+
+@pytest.mark.parametrize('payload, expected', [
+	({'id': 'm1', 'url': '/v/huis/m1-bank'}, ('https://www.marktplaats.nl/v/huis/m1-bank', 'm1')),
+	({'ad': {'id': 'm2'}}, (None, 'm2')),
+	({'listing': {'adId': 'm3'}}, (None, 'm3')),
+	# A bare id in any other object is not the ad's
+	({'category': {'id': 504}, 'user': {'id': 77}}, None),
+	({'category': {'id': 504}, 'ad': {'vipUrl': '/v/huis/m4-bank'}}, ('https://www.marktplaats.nl/v/huis/m4-bank', 'm4')),
+	# The id in the ad URL wins over an id field
+	({'id': 504, 'adUrl': '/v/huis/m5-bank'}, ('https://www.marktplaats.nl/v/huis/m5-bank', 'm5')),
+	({'ok': True}, None),
+	(['m6'], None),
+])
+def test_ad_from_payload(payload, expected):
+	ad = ad_from_payload(payload, PAGE_URL)
+	assert ad == (PublishedAd(*expected, 'response') if expected else None)
@@ -0,0 +1,41 @@
+import os
+
+import asset_cache
+from asset_cache import AssetCache
+
+
+URL = 'https://www.marktplaats.nl/static/app-{}.js'
+
+
+def test_store_keeps_running_total_without_listing(tmp_path, monkeypatch):
+	cache = AssetCache(str(tmp_path), max_bytes=1000)
+	listings = []
+	listdir = os.listdir
+	monkeypatch.setattr(asset_cache.os, 'listdir', lambda path: listings.append(path) or listdir(path))
+
+	cache.store(URL.format(1), 200, {}, b'x' * 300, 3600)
+	cache.store(URL.format(2), 200, {}, b'x' * 300, 3600)
+	# Rewriting an entry replaces its size instead of adding to it
+	cache.store(URL.format(1), 200, {}, b'x' * 100, 3600)
+
+	assert cache.total_bytes == 400
+	assert listings == []
+
+
+def test_evicts_oldest_once_over_max_bytes(tmp_path):
+	cache = AssetCache(str(tmp_path), max_bytes=1000)
+	for i in range(3):
+		cache.store(URL.format(i), 200, {}, b'x' * 400, 3600)
+		# Distinct mtimes, oldest first
+		os.utime(os.path.join(str(tmp_path), cache.key(URL.format(i)) + '.body'), (i, i))
+
+	# 1200 bytes crossed the limit: the oldest goes, down to 80% of max_bytes
+	assert cache.total_bytes == 800
+	assert cache.lookup(URL.format(0)) is None
+	assert cache.lookup(URL.format(1)) is not None
+	assert cache.lookup(URL.format(2)) is not None
+
+
+def test_total_seeded_from_existing_directory(tmp_path):
+	AssetCache(str(tmp_path), max_bytes=1000).store(URL.format(1), 200, {}, b'x' * 250, 3600)
+	assert AssetCache(str(tmp_path), max_bytes=1000).total_bytes == 250
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dutch_dates import parse_dutch_date, parse_dutch_dates
+
+
+CET = timezone(timedelta(hours=1))
+# Early January, so dates without a year and relative dates cross into the previous year
+NOW = datetime(2026, 1, 5, 14, 30, tzinfo=CET)
+
+
+@pytest.mark.parametrize('text, expected', [
+	# Day words, optionally with a time
+	('vandaag', '2026-01-05T00:00:00+01:00'),
+	('Gisteren', '2026-01-04T00:00:00+01:00'),
+	('eergisteren', '2026-01-03T00:00:00+01:00'),
+	('gisteren om 13:45', '2026-01-04T13:45:00+01:00'),
+	('vandaag, 9.05', '2026-01-05T09:05:00+01:00'),
+	# Relative: days and up anchor to midnight, hours and minutes to now
+	('3 dagen geleden', '2026-01-02T00:00:00+01:00'),
+	('1 dag geleden', '2026-01-04T00:00:00+01:00'),
+	('2 uur geleden', '2026-01-05T12:30:00+01:00'),
+	('5 minuten geleden', '2026-01-05T14:25:00+01:00'),
+	('een week', '2025-12-29T00:00:00+01:00'),
+	('2 weken geleden', '2025-12-22T00:00:00+01:00'),
+	# Abbreviated month names, with and without year
+	("Sinds 6 nov '25", '2025-11-06T00:00:00+01:00'),
+	('12 mrt 2024', '2024-03-12T00:00:00+01:00'),
+	('Geplaatst op 1 sept. 2025', '2025-09-01T00:00:00+01:00'),
+	('2 jan', '2026-01-02T00:00:00+01:00'),
+	('12 mrt', '2025-03-12T00:00:00+01:00'),
+	# Full month names, with and without year
+	('6 november 2025', '2025-11-06T00:00:00+01:00'),
+	('5 januari', '2026-01-05T00:00:00+01:00'),
+	('31 december', '2025-12-31T00:00:00+01:00'),
+	('12 maart 2024, 09:15', '2024-03-12T09:15:00+01:00'),
+	# Without a year a date after today is last year's
+	('6 jan', '2025-01-06T00:00:00+01:00'),
+	# Numeric
+	('06-11-2025', '2025-11-06T00:00:00+01:00'),
+	('1/2/26', '2026-02-01T00:00:00+01:00'),
+])
+def test_parse_dutch_date(text, expected):
+	assert parse_dutch_date(text, NOW) == expected
+
+
+@pytest.mark.parametrize('text', [
+	None,
+	'',
+	'morgen',
+	'Bieden',
+	'6 foo 2025',
+	'32 jan 2025',
+	'30 februari',
+	'31-02-2025',
+])
+def test_parse_dutch_date_unparseable(text):
+	assert parse_dutch_date(text, NOW) is None
+
+
+def test_parse_dutch_dates_matches_single_parse():
+	texts = ['vandaag', None, '12 mrt', 'Vandaag', 'morgen', '12 mrt']
+	assert parse_dutch_dates(texts, NOW) == [parse_dutch_date(text, NOW) for text in texts]
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import post_ads
+from ad_capture import PublishedAd
+from product_model import Product
+from rate_limiter import AccountRateLimiter
+
+
+AD_URL = 'https://www.marktplaats.nl/v/huis/banken/bank-zonder-id'
+
+
+class FakePage:
+	url = 'https://www.marktplaats.nl/plaats'
+
+
+async def _noop(*args, **kwargs):
+	return None
+
+
+@pytest.fixture
+def posted_without_id(monkeypatch):
+	"""Every page step succeeds; publishing yields the ad URL but no ad id."""
+	for name in ('click_place_ad', 'raise_on_captcha', 'select_product_category', 'fill_basic_fields', 'upload_photos', 'select_free_bundle'):
+		monkeypatch.setattr(post_ads, name, _noop)
+
+	async def publish_ad(page):
+		return PublishedAd(AD_URL, None, 'page')
+
+	monkeypatch.setattr(post_ads, 'publish_ad', publish_ad)
+	# No adaptive pacing between the fake steps
+	monkeypatch.setenv('MP_ADAPTIVE_RATE', 'false')
+	return AccountRateLimiter('test')
+
+
+def _product():
+	return Product('Bank', 'Mooie bank', '100', 'Huis en Inrichting > Banken', 'Utrecht', [], article_number='A1')
+
+
+def test_inline_stats_not_found_still_completed(posted_without_id, monkeypatch):
+	monkeypatch.setattr(post_ads, 'collect_ad_stats', _noop)
+	result = asyncio.run(post_ads.post_product(FakePage(), _product(), 'https://www.marktplaats.nl', '.', posted_without_id))
+	assert result['status'] == 'completed'
+	assert result['ad_url'] == AD_URL
+	assert result['ad_id'] is None
+	assert 'error' not in result
+
+
+def test_inline_stats_found(posted_without_id, monkeypatch):
+	async def collect(page, ad_url, article_number, limiter):
+		return {'ad_id': 'm123', 'views': 4, 'saves': 1, 'posted_at': '2026-10-19T12:00:00+00:00'}
+
+	monkeypatch.setattr(post_ads, 'collect_ad_stats', collect)
+	result = asyncio.run(post_ads.post_product(FakePage(), _product(), 'https://www.marktplaats.nl', '.', posted_without_id))
+	assert result['status'] == 'completed'
+	assert (result['ad_id'], result['views'], result['saves']) == ('m123', 4, 1)
+
+
+def test_missing_id_deferred_to_queue(posted_without_id):
+	class Queue:
+		def __init__(self):
+			self.deferred = []
+
+		def defer(self, result, article_number=None):
+			self.deferred.append((result, article_number))
+
+	queue = Queue()
+	result = asyncio.run(post_ads.post_product(FakePage(), _product(), 'https://www.marktplaats.nl', '.', posted_without_id, queue))
+	assert result['status'] == 'completed'
+	assert queue.deferred == [(result, 'A1')]